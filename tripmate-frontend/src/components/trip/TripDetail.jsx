@@ -71,7 +71,7 @@ const TripDetail = () => {
 
   const fetchTripDetail = async () => {
     try {
-      const response = await api.get(`/trips/${id}/`);
+      const response = await api.get(`/trips/${id}/`, { params: { include: 'route' } });
       const tripData = response.data;
       setTrip(tripData);
       
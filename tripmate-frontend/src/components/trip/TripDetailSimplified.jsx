@@ -127,7 +127,7 @@ const TripDetailSimplified = () => {
 
   const fetchTripDetail = async () => {
     try {
-      const response = await api.get(`/trips/${id}/`);
+      const response = await api.get(`/trips/${id}/`, { params: { include: 'route' } });
       const tripData = response.data;
       setTrip(tripData);
       
@@ -40,7 +40,7 @@ const TripEditWithChecklist = () => {
 
   const fetchTripData = async () => {
     try {
-      const response = await api.get(`/trips/${id}/`);
+      const response = await api.get(`/trips/${id}/`, { params: { include: 'route' } });
       const trip = response.data;
       
       setOriginalTrip(trip);
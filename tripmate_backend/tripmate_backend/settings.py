@@ -119,10 +119,59 @@ AUTH_USER_MODEL = 'accounts.User'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Photo renditions (thumbnail / screen-sized variants, requires Pillow)
+MEDIA_RENDITION_FORMAT = 'WEBP'  # or 'JPEG'
+MEDIA_RENDITION_QUALITY = 80
+
+# Background media jobs (run `python manage.py run_media_jobs` as a worker).
+# Set MEDIA_JOBS_RUN_EAGERLY = True to process uploads in-request during development.
+MEDIA_JOBS_RUN_EAGERLY = False
+MEDIA_JOBS_LOCK_TIMEOUT = 15 * 60  # seconds before a running job is considered abandoned
+
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 
+# zlib level for route_data stored in the TripRoute table (1 = fastest, 9 = smallest)
+TRIP_ROUTE_COMPRESSION_LEVEL = 6
+
+# Route geometry (/api/trips/<id>/route/geometry/): simplified polylines per map
+# zoom level, with a tolerance of this many screen pixels
+ROUTE_GEOMETRY_ZOOM_LEVELS = (5, 8, 11, 14)
+ROUTE_GEOMETRY_PIXEL_TOLERANCE = 1.0
+
+# Offline route estimates (/api/trips/<id>/route/estimate/, recompute_route_totals):
+# driving legs are the great-circle distance times the detour factor
+ROUTE_ESTIMATE_DETOUR_FACTOR = 1.25
+ROUTE_ESTIMATE_DRIVING_SPEED_KMH = 70
+ROUTE_ESTIMATE_FLIGHT_SPEED_KMH = 900  # matches the planner's flight routes
+
+# Waypoint order optimization (/api/trips/<id>/route/optimize/): default and
+# maximum search time per request, in milliseconds
+STOP_ORDER_TIME_BUDGET_MS = 200
+STOP_ORDER_MAX_TIME_BUDGET_MS = 2000
+
+# Per-process LRU in front of the GeocodeEntry table (number of location strings)
+GEOCODE_CACHE_LRU_SIZE = 4096
+GEOCODE_CACHE_LRU_TTL = 300  # seconds before a process re-reads an entry another may have moved
+
+# Windowed timeline (/api/trips/<id>/timeline/items/?cursor=&days=)
+TIMELINE_DAYS_PER_PAGE = 3
+TIMELINE_MAX_DAYS_PER_PAGE = 31
+
+# Authenticated media serving (/api/trips/<id>/media/<media_id>/file/)
+MEDIA_SIGNED_URL_MAX_AGE = 24 * 60 * 60  # lifetime of *_stream_url links, in seconds
+MEDIA_CACHE_MAX_AGE = 24 * 60 * 60  # browser cache lifetime for served files
+# Let the web server send the bytes: 'X-Accel-Redirect' (nginx, with an internal
+# location at MEDIA_ACCEL_REDIRECT_PREFIX aliased to MEDIA_ROOT) or 'X-Sendfile'.
+MEDIA_SENDFILE_HEADER = None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Resumable chunked uploads (/api/trips/<id>/media/uploads/) stream to disk here
+MEDIA_UPLOAD_TEMP_DIR = os.path.join(BASE_DIR, 'upload_tmp')
+MEDIA_UPLOAD_MAX_SIZE = 2 * 1024 * 1024 * 1024  # 2GB per file
+MEDIA_UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB per PUT
+
 # Allowed file types for uploads
 ALLOWED_UPLOAD_EXTENSIONS = [
     'jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp',  # Images
@@ -144,6 +193,36 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Trip list cursor pagination (opt-in via ?page_size= or ?cursor=)
+TRIP_LIST_PAGE_SIZE = 20
+TRIP_LIST_MAX_PAGE_SIZE = 100
+
+# Cache backend. Defaults to per-process local memory; set TRIPMATE_CACHE_BACKEND
+# to 'file' or 'redis' (with TRIPMATE_CACHE_LOCATION) to share it between workers.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHE_DEFAULT_LOCATIONS = {
+    'locmem': 'tripmate',
+    'file': os.path.join(BASE_DIR, 'cache'),
+    'redis': 'redis://127.0.0.1:6379/1',
+}
+CACHE_BACKEND_NAME = os.environ.get('TRIPMATE_CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND_NAME],
+        'LOCATION': os.environ.get('TRIPMATE_CACHE_LOCATION', CACHE_DEFAULT_LOCATIONS[CACHE_BACKEND_NAME]),
+        'TIMEOUT': 60 * 60,
+    }
+}
+
+# Read-through cache for trip payloads (see trips/cache.py)
+TRIPS_CACHE_ALIAS = 'default'
+TRIPS_CACHE_TIMEOUT = 60 * 60  # 1 hour
+TRIP_STATS_CACHE_TIMEOUT = 60 * 60  # 1 hour
+
 # Email settings - Gmail Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
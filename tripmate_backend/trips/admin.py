@@ -1,13 +1,13 @@
 # trips/admin.py - UPDATED with memory optimization
 from django.contrib import admin
-from .models import Trip, TripMedia
+from .models import Trip, TripMedia, TripRoute, MediaBlob, MediaJob, MediaUpload, GeocodeEntry
 
 @admin.register(Trip)
 class TripAdmin(admin.ModelAdmin):
     list_display = ('title', 'user', 'start_location', 'end_location', 'start_date', 'end_date', 'created_at')
     list_filter = ('created_at', 'start_date', 'end_date', 'trip_type')
     search_fields = ('title', 'user__username', 'user__email', 'start_location', 'end_location')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('checklist_total', 'checklist_completed', 'checklist_next_id', 'route_size', 'created_at', 'updated_at')
     date_hierarchy = 'created_at'
     
     # MEMORY OPTIMIZATION SETTINGS
@@ -22,7 +22,7 @@ class TripAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         # Only load necessary fields for the list view
         return super().get_queryset(request).defer(
-            'route_data', 'checklist_data', 'waypoints'
+            'checklist_data', 'waypoints'
         )
     
     fieldsets = (
@@ -33,11 +33,11 @@ class TripAdmin(admin.ModelAdmin):
             'fields': ('start_date', 'end_date', 'travelers', 'waypoints')
         }),
         ('Route Information', {
-            'fields': ('total_distance', 'total_duration', 'route_data'),
+            'fields': ('total_distance', 'total_duration', 'route_size'),
             'classes': ('collapse',)
         }),
         ('Checklist', {
-            'fields': ('checklist_data',),
+            'fields': ('checklist_data', 'checklist_total', 'checklist_completed', 'checklist_next_id'),
             'classes': ('collapse',)
         }),
         ('Timestamps', {
@@ -45,6 +45,11 @@ class TripAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    @admin.display(description='Stored route')
+    def route_size(self, obj):
+        route = TripRoute.objects.filter(trip=obj).only('raw_size').first()
+        return f'{route.raw_size} bytes of JSON' if route else 'No route'
 
 @admin.register(TripMedia)
 class TripMediaAdmin(admin.ModelAdmin):
@@ -63,6 +68,15 @@ class TripMediaAdmin(admin.ModelAdmin):
         ('Basic Information', {
             'fields': ('trip', 'stop_index', 'media_type', 'file')
         }),
+        ('Renditions', {
+            'fields': ('thumbnail', 'screen_image', 'processing_status'),
+            'classes': ('collapse',)
+        }),
+        ('File Metadata', {
+            'fields': ('file_size', 'content_type', 'width', 'height', 'duration',
+                       'captured_at', 'metadata_extracted'),
+            'classes': ('collapse',)
+        }),
         ('Media Details', {
             'fields': ('title', 'description', 'notes')
         }),
@@ -74,4 +88,43 @@ class TripMediaAdmin(admin.ModelAdmin):
             'fields': ('custom_date', 'custom_time', 'taken_at'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(MediaJob)
+class MediaJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'media', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('created_at', 'updated_at', 'locked_at')
+    
+    list_per_page = 50
+    show_full_result_count = False
+    list_select_related = ('media',)
+
+@admin.register(MediaUpload)
+class MediaUploadAdmin(admin.ModelAdmin):
+    list_display = ('id', 'filename', 'user', 'trip', 'received_size', 'total_size', 'status', 'updated_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'updated_at')
+    
+    list_per_page = 50
+    show_full_result_count = False
+    list_select_related = ('user', 'trip')
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'name', 'size', 'ref_count', 'created_at')
+    search_fields = ('sha256', 'name')
+    readonly_fields = ('sha256', 'name', 'size', 'ref_count', 'created_at')
+    
+    list_per_page = 50
+    show_full_result_count = False
+
+@admin.register(GeocodeEntry)
+class GeocodeEntryAdmin(admin.ModelAdmin):
+    list_display = ('location', 'user', 'latitude', 'longitude', 'source', 'updated_at')
+    list_filter = ('source',)
+    search_fields = ('query', 'location', 'user__username')
+    list_select_related = ('user',)
+    
+    list_per_page = 50
+    show_full_result_count = False
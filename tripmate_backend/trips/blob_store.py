@@ -0,0 +1,89 @@
+# trips/blob_store.py - Content-addressed, reference-counted storage for media files
+"""
+Uploads are stored once per distinct content under trip_media/<aa>/<sha256>.<ext>.
+TripMedia.file points at the blob's path, so URLs, renditions and serving work
+exactly as for ordinary files; TripMedia.blob carries the reference that keeps
+the file alive. References are released through the cleanup job that every
+TripMedia delete path queues, including cascades from Trip and User.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import MediaBlob, TripMedia
+
+
+def content_sha256(content):
+    """SHA-256 of a Django File / UploadedFile, read chunk by chunk"""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_path(sha256, filename):
+    extension = os.path.splitext(filename or '')[1].lower()
+    return f'trip_media/{sha256[:2]}/{sha256}{extension}'
+
+
+class MediaBlobStore:
+    """Store, share and release MediaBlob files"""
+
+    @staticmethod
+    def acquire(sha256, size=None, user=None):
+        """
+        Add a reference to an already stored blob and return it, or return
+        None when no blob with this content exists. With `user`, only a blob
+        that user's media already references is acquired: a bare checksum
+        is no proof of holding the bytes.
+        """
+        blobs = MediaBlob.objects.filter(sha256=sha256)
+        if size is not None:
+            blobs = blobs.filter(size=size)
+        if user is not None:
+            blobs = blobs.filter(id__in=TripMedia.objects.filter(trip__user=user).values('blob_id'))
+        if not blobs.update(ref_count=F('ref_count') + 1, updated_at=timezone.now()):
+            return None
+        return blobs.get()
+
+    @staticmethod
+    def store(content, filename, sha256=None):
+        """
+        Return a referenced blob holding `content`. On a dedup hit nothing is
+        written; otherwise the file is saved once under its content hash.
+        Pass `sha256` when the caller has already hashed the bytes.
+        """
+        sha256 = (sha256 or content_sha256(content)).lower()
+        while True:
+            blob = MediaBlobStore.acquire(sha256)
+            if blob is not None:
+                return blob
+
+            name = default_storage.save(blob_path(sha256, filename), content)
+            try:
+                with transaction.atomic():
+                    return MediaBlob.objects.create(
+                        sha256=sha256, name=name, size=content.size, ref_count=1
+                    )
+            except IntegrityError:
+                # A concurrent upload of the same bytes created the blob first
+                default_storage.delete(name)
+
+    @staticmethod
+    def release(blob_id, count=1):
+        """Drop `count` references; the file is deleted when none remain"""
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(id=blob_id).first()
+            if blob is None:
+                return
+            if blob.ref_count > count:
+                MediaBlob.objects.filter(id=blob_id).update(
+                    ref_count=F('ref_count') - count, updated_at=timezone.now()
+                )
+                return
+            blob.delete()
+            transaction.on_commit(lambda: default_storage.delete(blob.name))
@@ -0,0 +1,86 @@
+# trips/cache.py - Read-through cache with versioned per-user / per-trip keys
+"""
+Cached entries are never deleted one by one. Every key embeds the current
+version number of the user and/or trip it depends on, and invalidation just
+bumps that version (see trips/signals.py), so all stale entries become
+unreachable at once and age out through their TTL.
+
+Versions live in the cache itself, so with a per-process backend (locmem) a
+bump made by one worker is invisible to the others. Views that answer
+conditional GETs therefore also pass their database-derived validator in
+`parts`, which keeps a stale body from being served under a fresh ETag.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+KEY_PREFIX = 'trips'
+DEFAULT_TIMEOUT = 60 * 60  # 1 hour
+
+
+def get_cache():
+    return caches[getattr(settings, 'TRIPS_CACHE_ALIAS', 'default')]
+
+
+def _version_key(scope, object_id):
+    return f'{KEY_PREFIX}:version:{scope}:{object_id}'
+
+
+def get_version(scope, object_id):
+    """Current version for a 'user' or 'trip' scope, created on first use"""
+    cache = get_cache()
+    key = _version_key(scope, object_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock rather than 1 so an evicted version key can
+        # never come back at a number that old entries were stored under.
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(scope, object_id):
+    """Invalidate every cached entry that depends on this user or trip"""
+    cache = get_cache()
+    key = _version_key(scope, object_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # No version stored yet, so nothing can be cached under it either
+        cache.add(key, int(time.time() * 1000), None)
+
+
+def invalidate_user(user_id):
+    bump_version('user', user_id)
+
+
+def invalidate_trip(trip_id):
+    bump_version('trip', trip_id)
+
+
+def make_key(name, user_id=None, trip_id=None, parts=()):
+    """Build a cache key that changes whenever the user or trip is invalidated"""
+    segments = [KEY_PREFIX, name]
+    if user_id is not None:
+        segments.append(f'u{user_id}.{get_version("user", user_id)}')
+    if trip_id is not None:
+        segments.append(f't{trip_id}.{get_version("trip", trip_id)}')
+    segments.extend(str(part) for part in parts)
+    return ':'.join(segments)
+
+
+def get_or_build(name, builder, user_id=None, trip_id=None, parts=(), timeout=None):
+    """
+    Return the cached value for the key, calling builder() and storing its
+    result on a miss. The builder must return a picklable value.
+    """
+    cache = get_cache()
+    key = make_key(name, user_id=user_id, trip_id=trip_id, parts=parts)
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        if timeout is None:
+            timeout = getattr(settings, 'TRIPS_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+        cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,82 @@
+# trips/conditional.py - Conditional GET (ETag / Last-Modified) helpers
+import hashlib
+import json
+from datetime import datetime, timezone
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .media_serving import signing_epoch
+
+
+def content_etag(payload):
+    """Strong ETag derived from the JSON content of a static payload"""
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return quote_etag(hashlib.sha256(encoded).hexdigest()[:32])
+
+
+def validator_etag(*parts):
+    """Weak ETag derived from validator values (timestamps, counts, ids)"""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return 'W/' + quote_etag(digest[:32])
+
+
+def _latest(*timestamps):
+    values = [ts for ts in timestamps if ts is not None]
+    return max(values) if values else None
+
+
+def trip_places_validators(trip, request):
+    """Validators for payloads built from the trip and its saved places"""
+    places = trip.saved_places.aggregate(latest=Max('updated_at'), count=Count('id'))
+    last_modified = _latest(trip.updated_at, places['latest'])
+    etag = validator_etag(
+        'places', trip.id, trip.updated_at.isoformat(), places['latest'],
+        places['count'], request.get_full_path()
+    )
+    return etag, last_modified
+
+
+def trip_media_validators(trip, request, signed_urls=False):
+    """
+    Validators for payloads built from the trip and its media.
+
+    Creating or deleting media changes the count or highest id. Processing
+    edits rows in place and moves the trip's updated_at instead (see
+    trips.jobs.touch_trip). Pass signed_urls=True for payloads that embed
+    signed stream URLs, so they also change with the signing epoch.
+    """
+    media = trip.media.aggregate(latest=Max('taken_at'), count=Count('id'), last_id=Max('id'))
+    last_modified = _latest(trip.updated_at, media['latest'])
+    epoch = None
+    if signed_urls:
+        epoch, epoch_start = signing_epoch()
+        last_modified = _latest(last_modified, datetime.fromtimestamp(epoch_start, timezone.utc))
+    etag = validator_etag(
+        'media', trip.id, trip.updated_at.isoformat(), media['count'],
+        media['last_id'], epoch, request.get_full_path()
+    )
+    return etag, last_modified
+
+
+def not_modified_response(request, etag=None, last_modified=None):
+    """Return a 304 response if the client's copy is current, otherwise None"""
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified.timestamp() if last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag=None, last_modified=None):
+    """Attach ETag / Last-Modified and force clients to revalidate"""
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,217 @@
+# trips/distance_service.py - Offline route distance and duration estimates
+"""
+Trip.total_distance (km) and total_duration (minutes) are what the planner
+computed through Google Directions when the trip was saved. This service
+estimates the same totals on the server from stop coordinates, so they can
+be checked and recomputed without a network call.
+
+Stop coordinates come from the stored route when it has one position per
+stop (driving legs or the flight path), otherwise from the trip owner's
+geocode cache entries by stop name, or the centroid of the places saved for
+each stop.
+"""
+from django.conf import settings
+from django.db.models import Avg
+
+from .geocode_cache import GeocodeCache
+from .geodesy import leg_distances_km, pairwise_distances_km
+from .models import TripPlaces, TripRoute
+from .route_geometry import load_route, route_stop_positions, waypoint_order
+from .route_store import TripRouteStore
+from .stop_order import optimize_order
+
+METHODS = ('haversine', 'vincenty')
+
+
+class MissingStopCoordinates(LookupError):
+    """Raised when an operation needs a position for every stop and some are unknown"""
+    pass
+
+
+class TripDistanceService:
+    """Service for estimating trip distances and durations from coordinates"""
+
+    @staticmethod
+    def route_mode(route):
+        """'flight' for the planner's flight stand-in, 'driving' otherwise"""
+        if route is None:
+            return 'driving'
+        if route.get('summary') == 'Flight Route':
+            return 'flight'
+        for leg in route.get('legs') or []:
+            for step in (leg.get('steps') or []) if isinstance(leg, dict) else []:
+                if isinstance(step, dict) and step.get('travel_mode') == 'FLIGHT':
+                    return 'flight'
+        return 'driving'
+
+    @staticmethod
+    def place_centroids(trip_ids):
+        """{trip_id: {stop_index: (lat, lng)}} averaged over the saved places, in one query"""
+        centroids = {}
+        rows = (
+            TripPlaces.objects.filter(trip_id__in=trip_ids)
+            .values('trip_id', 'stop_index')
+            .annotate(lat=Avg('latitude'), lng=Avg('longitude'))
+            .order_by()
+        )
+        for row in rows:
+            centroids.setdefault(row['trip_id'], {})[row['stop_index']] = (row['lat'], row['lng'])
+        return centroids
+
+    @staticmethod
+    def stop_positions(trip, route=None, centroids=None, geocoded=None):
+        """
+        (source, positions) with one (lat, lng) per stop in order, or None
+        for a stop whose position is unknown. A route with a position for
+        every stop wins; otherwise each stop is looked up in the owner's
+        geocode cache, then falls back to the centroid of its saved places. source
+        is 'route', 'geocode', 'places', 'mixed' or 'none'.
+        """
+        stop_names = trip.get_stop_names()
+        points = route_stop_positions(route, len(stop_names))
+        if points is not None:
+            return 'route', points
+
+        if geocoded is None:
+            geocoded = GeocodeCache.resolve_many(trip.user_id, stop_names)
+        if centroids is None:
+            centroids = TripDistanceService.place_centroids([trip.id]).get(trip.id, {})
+        positions = []
+        sources = set()
+        for index, name in enumerate(stop_names):
+            point = geocoded.get(name) if isinstance(name, str) else None
+            if point is not None:
+                positions.append(point)
+                sources.add('geocode')
+            elif index in centroids:
+                positions.append(centroids[index])
+                sources.add('places')
+            else:
+                positions.append(None)
+        source = sources.pop() if len(sources) == 1 else ('mixed' if sources else 'none')
+        return source, positions
+
+    @staticmethod
+    def stop_coordinates(trip, route=None, centroids=None, geocoded=None):
+        """
+        (source, points) for a trip's stops in the order they are travelled.
+        Points from a route follow its waypoint_order, so the legs match the
+        totals the planner stored. Stops without a known position are left
+        out, so points may be shorter than the stop list.
+        """
+        source, positions = TripDistanceService.stop_positions(trip, route, centroids, geocoded)
+        if source == 'route':
+            order = waypoint_order(route, len(positions) - 2) or range(len(positions) - 2)
+            positions = [positions[0]] + [positions[index + 1] for index in order] + [positions[-1]]
+        return source, [point for point in positions if point is not None]
+
+    @staticmethod
+    def leg_estimate(distance_km, mode):
+        """(distance km, duration minutes) for a great-circle leg"""
+        if mode == 'flight':
+            speed = getattr(settings, 'ROUTE_ESTIMATE_FLIGHT_SPEED_KMH', 900)
+        else:
+            # Roads are longer than the great circle between stops
+            distance_km *= getattr(settings, 'ROUTE_ESTIMATE_DETOUR_FACTOR', 1.25)
+            speed = getattr(settings, 'ROUTE_ESTIMATE_DRIVING_SPEED_KMH', 70)
+        return distance_km, distance_km / speed * 60
+
+    @staticmethod
+    def _summary(trip, mode, source, points, distances):
+        legs = [TripDistanceService.leg_estimate(distance, mode) for distance in distances]
+        return {
+            'mode': mode,
+            'source': source,
+            'complete': len(points) == len(trip.get_stop_names()),
+            'legs': [
+                {'distance': round(distance, 1), 'duration': round(duration)}
+                for distance, duration in legs
+            ],
+            'total_distance': round(sum(distance for distance, _ in legs)),
+            'total_duration': round(sum(duration for _, duration in legs)),
+        }
+
+    @staticmethod
+    def estimate(trip, method='haversine'):
+        """Estimated legs and totals for one trip, in the units Trip stores"""
+        route = load_route(TripRouteStore.load(trip.id))
+        mode = TripDistanceService.route_mode(route)
+        source, points = TripDistanceService.stop_coordinates(trip, route)
+        distances = leg_distances_km(points, method) if len(points) > 1 else []
+        return TripDistanceService._summary(trip, mode, source, points, distances)
+
+    @staticmethod
+    def estimate_many(trips, method='haversine'):
+        """
+        {trip_id: estimate} for a batch of trips. Routes and place centroids
+        are each read in one query, geocoded stop names in one query per
+        owner, and the legs of every trip are measured in a single vectorized
+        call.
+        """
+        trips = list(trips)
+        trip_ids = [trip.id for trip in trips]
+        routes = {
+            trip_id: load_route(TripRouteStore.decode(data))
+            for trip_id, data in TripRoute.objects.filter(trip_id__in=trip_ids).values_list('trip_id', 'data')
+        }
+        centroids = TripDistanceService.place_centroids(trip_ids)
+        stop_names = {}
+        for trip in trips:
+            stop_names.setdefault(trip.user_id, set()).update(
+                name for name in trip.get_stop_names() if isinstance(name, str)
+            )
+        geocoded = {user_id: GeocodeCache.resolve_many(user_id, names) for user_id, names in stop_names.items()}
+
+        resolved = []
+        origins, destinations = [], []
+        for trip in trips:
+            route = routes.get(trip.id)
+            source, points = TripDistanceService.stop_coordinates(
+                trip, route, centroids.get(trip.id, {}), geocoded[trip.user_id]
+            )
+            start = len(origins)
+            origins.extend(points[:-1])
+            destinations.extend(points[1:])
+            resolved.append((trip, TripDistanceService.route_mode(route), source, points, start, len(origins)))
+
+        distances = pairwise_distances_km(origins, destinations, method)
+        return {
+            trip.id: TripDistanceService._summary(trip, mode, source, points, distances[start:end])
+            for trip, mode, source, points, start, end in resolved
+        }
+
+    @staticmethod
+    def optimize_stop_order(trip, time_budget):
+        """
+        Suggested waypoint order with the start and end kept in place, and
+        the distance and duration it saves over the waypoints as stored on
+        the trip (not the order a stored route may already visit them in).
+        time_budget is in seconds.
+        """
+        route = load_route(TripRouteStore.load(trip.id))
+        mode = TripDistanceService.route_mode(route)
+        source, positions = TripDistanceService.stop_positions(trip, route)
+        missing = [name for name, point in zip(trip.get_stop_names(), positions) if point is None]
+        if missing:
+            raise MissingStopCoordinates(missing)
+
+        result = optimize_order(positions, time_budget)
+        waypoints = list(trip.waypoints or [])
+        order = [index - 1 for index in result['order'][1:-1]]
+        original = TripDistanceService.leg_estimate(result['initial_distance'], mode)
+        optimized = TripDistanceService.leg_estimate(result['distance'], mode)
+        return {
+            'mode': mode,
+            'source': source,
+            'order': order,
+            'waypoints': [waypoints[index] for index in order],
+            'changed': order != list(range(len(waypoints))),
+            'converged': result['converged'],
+            'original': {'total_distance': round(original[0]), 'total_duration': round(original[1])},
+            'optimized': {'total_distance': round(optimized[0]), 'total_duration': round(optimized[1])},
+            'savings': {
+                'distance': round(original[0] - optimized[0], 1),
+                'duration': round(original[1] - optimized[1]),
+                'percent': round(100 * (1 - optimized[0] / original[0]), 1) if original[0] else 0.0,
+            },
+        }
@@ -0,0 +1,193 @@
+# trips/geocode_cache.py - Server-side cache of coordinates for location strings
+"""
+Trip stops are free text ("Paris", "Berlin, Germany"). Whenever a client
+saves a route or a place it also sends coordinates, so every save teaches
+the GeocodeEntry table where those strings are. Lookups go through a
+per-process LRU first, so popular cities cost a dictionary hit; misses are
+read from the table in one query per batch.
+
+The coordinates come from whatever the client sent, so entries belong to
+the user whose route or place taught them: one user's saves can neither
+change nor reveal what another user's strings resolve to. The latest save
+wins, and memory hits expire after GEOCODE_CACHE_LRU_TTL seconds so other
+processes pick up the change.
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection
+
+from .models import GeocodeEntry, Trip
+from .route_geometry import coerce_point, load_route, route_stop_positions
+
+QUERY_MAX_LENGTH = 255
+LOOKUP_BATCH_SIZE = 500
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+COMMA_PATTERN = re.compile(r'\s*,\s*')
+
+
+def normalize_location(value):
+    """Case-, width- and spacing-insensitive key for a location string ('' if unusable)"""
+    if not isinstance(value, str):
+        return ''
+    text = unicodedata.normalize('NFKC', value).casefold()
+    text = COMMA_PATTERN.sub(', ', WHITESPACE_PATTERN.sub(' ', text)).strip(' ,.')
+    return text if len(text) <= QUERY_MAX_LENGTH else ''
+
+
+class LRUCache:
+    """
+    Thread-safe mapping that holds at most maxsize keys, evicting the least
+    recently used. With ttl, keys also expire that many seconds after set().
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            value, expires = self._data[key]
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Keyed by (user id, normalized string). Only hits are kept; a miss may be
+# learned by another process at any time
+memory_cache = LRUCache(
+    getattr(settings, 'GEOCODE_CACHE_LRU_SIZE', 4096),
+    ttl=getattr(settings, 'GEOCODE_CACHE_LRU_TTL', 300),
+)
+
+
+class GeocodeCache:
+    """Service for resolving and learning location coordinates"""
+
+    @staticmethod
+    def resolve_many(user_id, locations):
+        """{location: (lat, lng) or None} for an iterable of strings, from user_id's entries"""
+        keys = {location: normalize_location(location) for location in locations if isinstance(location, str)}
+        found = {}
+        missing = []
+        for key in set(keys.values()):
+            if not key:
+                continue
+            point = memory_cache.get((user_id, key))
+            if point is None:
+                missing.append(key)
+            else:
+                found[key] = point
+
+        for start in range(0, len(missing), LOOKUP_BATCH_SIZE):
+            rows = GeocodeEntry.objects.filter(
+                user_id=user_id, query__in=missing[start:start + LOOKUP_BATCH_SIZE]
+            ).values_list('query', 'latitude', 'longitude')
+            for query, latitude, longitude in rows:
+                found[query] = (latitude, longitude)
+                memory_cache.set((user_id, query), (latitude, longitude))
+
+        return {location: found.get(key) for location, key in keys.items()}
+
+    @staticmethod
+    def resolve(user_id, location):
+        return GeocodeCache.resolve_many(user_id, [location]).get(location)
+
+    @staticmethod
+    def record(user_id, entries, source):
+        """
+        Learn (location, point) pairs for user_id, where point is anything
+        coerce_point() accepts. A string the user already has is moved to
+        the new point; when a batch repeats a string the last pair wins.
+        Returns the number of distinct strings written.
+        """
+        new_entries = {}
+        for location, point in entries:
+            key = normalize_location(location)
+            point = coerce_point(point)
+            if not key or point is None:
+                continue
+            new_entries[key] = GeocodeEntry(
+                user_id=user_id,
+                query=key,
+                location=location.strip()[:QUERY_MAX_LENGTH],
+                latitude=point[0],
+                longitude=point[1],
+                source=source,
+            )
+        # Unchanged strings (most of a re-saved route) need no write
+        for key in [key for key, entry in new_entries.items()
+                    if memory_cache.get((user_id, key)) == (entry.latitude, entry.longitude)]:
+            del new_entries[key]
+        if new_entries:
+            # MySQL upserts on any unique key and refuses an explicit target
+            target = ['user', 'query'] if connection.features.supports_update_conflicts_with_target else None
+            GeocodeEntry.objects.bulk_create(
+                new_entries.values(),
+                batch_size=LOOKUP_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=target,
+                update_fields=['location', 'latitude', 'longitude', 'source', 'updated_at'],
+            )
+            for key, entry in new_entries.items():
+                memory_cache.set((user_id, key), (entry.latitude, entry.longitude))
+        return len(new_entries)
+
+    @staticmethod
+    def route_entries(route_data, stop_names):
+        """(location, point) pairs from a stored route: trip stops and Google's leg addresses"""
+        route = load_route(route_data)
+        if route is None:
+            return []
+        entries = []
+        positions = route_stop_positions(route, len(stop_names))
+        if positions is not None:
+            entries.extend(zip(stop_names, positions))
+        for leg in route.get('legs') or []:
+            if isinstance(leg, dict):
+                entries.append((leg.get('start_address'), leg.get('start_location')))
+                entries.append((leg.get('end_address'), leg.get('end_location')))
+        return entries
+
+    @staticmethod
+    def record_route(trip_id, route_data):
+        trip = Trip.objects.only('user_id', 'start_location', 'end_location', 'waypoints').filter(id=trip_id).first()
+        if trip is None:
+            return 0
+        return GeocodeCache.record(
+            trip.user_id, GeocodeCache.route_entries(route_data, trip.get_stop_names()), 'route'
+        )
+
+    @staticmethod
+    def record_places(user_id, places):
+        """Learn the addresses of saved places (the name alone is too ambiguous)"""
+        return GeocodeCache.record(
+            user_id, ((place.address, (place.latitude, place.longitude)) for place in places), 'place'
+        )
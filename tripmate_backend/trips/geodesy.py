@@ -0,0 +1,176 @@
+# trips/geodesy.py - Great-circle and ellipsoidal distances between coordinates
+"""
+Distances are computed for many legs at once. With NumPy installed every
+function works on whole arrays; without it the same results come from
+plain Python loops.
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; distances then use the pure-Python loops
+    np = None
+
+EARTH_RADIUS_KM = 6371.0088  # mean radius
+
+# WGS-84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+
+VINCENTY_MAX_ITERATIONS = 200
+VINCENTY_TOLERANCE = 1e-12
+
+
+def numpy_available():
+    return np is not None
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km between two points given in degrees"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _haversine_numpy(lat1, lng1, lat2, lng2):
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = np.radians(lng2 - lng1)
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def vincenty_km(lat1, lng1, lat2, lng2):
+    """
+    Distance in km on the WGS-84 ellipsoid (Vincenty's inverse formula).
+    Falls back to haversine for nearly antipodal points, where the
+    iteration does not converge.
+    """
+    U1 = math.atan((1 - WGS84_F) * math.tan(math.radians(lat1)))
+    U2 = math.atan((1 - WGS84_F) * math.tan(math.radians(lat2)))
+    L = math.radians(lng2 - lng1)
+    sin_U1, cos_U1 = math.sin(U1), math.cos(U1)
+    sin_U2, cos_U2 = math.sin(U2), math.cos(U2)
+
+    lam = L
+    for _ in range(VINCENTY_MAX_ITERATIONS):
+        sin_lam, cos_lam = math.sin(lam), math.cos(lam)
+        sin_sigma = math.hypot(cos_U2 * sin_lam, cos_U1 * sin_U2 - sin_U1 * cos_U2 * cos_lam)
+        if sin_sigma == 0:
+            return 0.0  # coincident points
+        cos_sigma = sin_U1 * sin_U2 + cos_U1 * cos_U2 * cos_lam
+        sigma = math.atan2(sin_sigma, cos_sigma)
+        sin_alpha = cos_U1 * cos_U2 * sin_lam / sin_sigma
+        cos_sq_alpha = 1 - sin_alpha ** 2
+        cos_2sigma_m = cos_sigma - 2 * sin_U1 * sin_U2 / cos_sq_alpha if cos_sq_alpha else 0.0
+        C = WGS84_F / 16 * cos_sq_alpha * (4 + WGS84_F * (4 - 3 * cos_sq_alpha))
+        previous = lam
+        lam = L + (1 - C) * WGS84_F * sin_alpha * (
+            sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+        )
+        if abs(lam - previous) < VINCENTY_TOLERANCE:
+            break
+    else:
+        return haversine_km(lat1, lng1, lat2, lng2)
+
+    u_sq = cos_sq_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    A = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+    B = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+    delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+        - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+    ))
+    return WGS84_B * A * (sigma - delta_sigma) / 1000
+
+
+def _vincenty_numpy(lat1, lng1, lat2, lng2):
+    """Vectorized Vincenty: every pair iterates until it converges, then stops updating"""
+    U1 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat2)))
+    L = np.radians(lng2 - lng1)
+    sin_U1, cos_U1 = np.sin(U1), np.cos(U1)
+    sin_U2, cos_U2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    active = np.ones(L.shape, dtype=bool)
+    sin_sigma = cos_sigma = sigma = cos_sq_alpha = cos_2sigma_m = np.zeros(L.shape)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for _ in range(VINCENTY_MAX_ITERATIONS):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            new_sin_sigma = np.hypot(cos_U2 * sin_lam, cos_U1 * sin_U2 - sin_U1 * cos_U2 * cos_lam)
+            new_cos_sigma = sin_U1 * sin_U2 + cos_U1 * cos_U2 * cos_lam
+            new_sigma = np.arctan2(new_sin_sigma, new_cos_sigma)
+            sin_alpha = np.where(new_sin_sigma == 0, 0.0, cos_U1 * cos_U2 * sin_lam / new_sin_sigma)
+            new_cos_sq_alpha = 1 - sin_alpha ** 2
+            new_cos_2sigma_m = np.where(
+                new_cos_sq_alpha == 0, 0.0, new_cos_sigma - 2 * sin_U1 * sin_U2 / new_cos_sq_alpha
+            )
+            C = WGS84_F / 16 * new_cos_sq_alpha * (4 + WGS84_F * (4 - 3 * new_cos_sq_alpha))
+            new_lam = L + (1 - C) * WGS84_F * sin_alpha * (
+                new_sigma + C * new_sin_sigma * (
+                    new_cos_2sigma_m + C * new_cos_sigma * (-1 + 2 * new_cos_2sigma_m ** 2)
+                )
+            )
+
+            # Only pairs still iterating take the new values
+            sin_sigma = np.where(active, new_sin_sigma, sin_sigma)
+            cos_sigma = np.where(active, new_cos_sigma, cos_sigma)
+            sigma = np.where(active, new_sigma, sigma)
+            cos_sq_alpha = np.where(active, new_cos_sq_alpha, cos_sq_alpha)
+            cos_2sigma_m = np.where(active, new_cos_2sigma_m, cos_2sigma_m)
+            converged = np.abs(new_lam - lam) < VINCENTY_TOLERANCE
+            lam = np.where(active, new_lam, lam)
+            active &= ~converged
+            if not active.any():
+                break
+
+    u_sq = cos_sq_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    A = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+    B = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+    delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+        - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+    ))
+    distances = WGS84_B * A * (sigma - delta_sigma) / 1000
+    distances = np.where(sin_sigma == 0, 0.0, distances)
+    # Nearly antipodal pairs that never converged
+    return np.where(active, _haversine_numpy(lat1, lng1, lat2, lng2), distances)
+
+
+def pairwise_distances_km(origins, destinations, method='haversine'):
+    """
+    Distance in km from each origin to the destination at the same index.
+    Points are (lat, lng) in degrees; returns a list of floats.
+    """
+    if not origins:
+        return []
+    if np is not None:
+        first = np.asarray(origins, dtype=float)
+        second = np.asarray(destinations, dtype=float)
+        compute = _vincenty_numpy if method == 'vincenty' else _haversine_numpy
+        return compute(first[:, 0], first[:, 1], second[:, 0], second[:, 1]).tolist()
+    compute = vincenty_km if method == 'vincenty' else haversine_km
+    return [compute(a[0], a[1], b[0], b[1]) for a, b in zip(origins, destinations)]
+
+
+def leg_distances_km(points, method='haversine'):
+    """Distances of the consecutive legs of a path of (lat, lng) points"""
+    return pairwise_distances_km(points[:-1], points[1:], method)
+
+
+def distance_matrix_km(points):
+    """
+    Symmetric great-circle distance matrix for (lat, lng) points. A NumPy
+    array when NumPy is available, otherwise a list of lists.
+    """
+    if np is not None:
+        coordinates = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+        lat = coordinates[:, 0][:, None]
+        lng = coordinates[:, 1][:, None]
+        a = (np.sin((lat - lat.T) / 2) ** 2
+             + np.cos(lat) * np.cos(lat.T) * np.sin((lng - lng.T) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+    return [[haversine_km(a[0], a[1], b[0], b[1]) for b in points] for a in points]
@@ -0,0 +1,151 @@
+# trips/jobs.py - Lightweight database-backed job queue for media post-processing
+"""
+Jobs are rows in the MediaJob table. Requests only insert a row; the
+`run_media_jobs` management command claims and runs them. Claiming uses
+SELECT ... FOR UPDATE SKIP LOCKED where the database supports it, so several
+workers can poll the same table safely.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import cache as trips_cache
+from .media_service import MediaService
+from .models import MediaJob, Trip, TripMedia
+
+logger = logging.getLogger(__name__)
+
+
+def touch_trip(trip_id):
+    """
+    Mark a trip's media payloads as changed after media rows were edited in
+    place. The media validators (trips/conditional.py) see only row counts
+    and ids, so the trip's updated_at has to move; update() skips the
+    signals, so the cache version is bumped here as well.
+    """
+    Trip.objects.filter(id=trip_id).update(updated_at=timezone.now())
+    trips_cache.invalidate_trip(trip_id)
+
+
+def process_media(job):
+    """Run every post-upload processing step for one media item"""
+    media = TripMedia.objects.filter(id=job.media_id).first()
+    if media is None:
+        return  # Deleted while queued
+    media.processing_status = 'processing'
+    media.save(update_fields=['processing_status'])
+
+    changed_fields = MediaService.process(media)
+    media.processing_status = 'ready'
+    media.save(update_fields=changed_fields + ['processing_status'])
+    touch_trip(media.trip_id)
+
+
+def cleanup_files(job):
+    """Remove the files of media rows that have already been deleted"""
+    MediaService.cleanup(job.payload)
+
+
+# Job kind -> handler(job)
+HANDLERS = {
+    'process_media': process_media,
+    'cleanup_files': cleanup_files,
+}
+
+
+def queue_media_cleanup(media_queryset):
+    """
+    Queue the storage cleanup for media rows about to be deleted: blob
+    references to release and renditions to remove. Called inside the
+    deleting transaction by every delete path (TripMediaQuerySet.delete()
+    and the Trip pre_delete hook), so the request does not wait on storage.
+    """
+    payload = MediaService.cleanup_payload(media_queryset)
+    if payload['files'] or payload['blobs']:
+        MediaJobQueue.enqueue('cleanup_files', payload=payload)
+
+
+def delete_media(media_queryset):
+    """Delete media rows and queue their file removal. Returns the number of media deleted."""
+    return media_queryset.delete()[1].get(TripMedia._meta.label, 0)
+
+
+class MediaJobQueue:
+    """Enqueue, claim and run MediaJob rows"""
+
+    @staticmethod
+    def enqueue(kind, media=None, payload=None):
+        job = MediaJob.objects.create(kind=kind, media=media, payload=payload or {})
+        if getattr(settings, 'MEDIA_JOBS_RUN_EAGERLY', False):
+            # Development / test convenience: run once the request commits
+            transaction.on_commit(lambda: MediaJobQueue.run_job(job.id))
+        return job
+
+    @staticmethod
+    def requeue_stale_jobs():
+        """Return jobs whose worker died mid-run to the pending state"""
+        timeout = getattr(settings, 'MEDIA_JOBS_LOCK_TIMEOUT', 15 * 60)
+        cutoff = timezone.now() - timedelta(seconds=timeout)
+        return MediaJob.objects.filter(status='running', locked_at__lt=cutoff).update(status='pending')
+
+    @staticmethod
+    def claim_next():
+        """Atomically mark the oldest runnable pending job as running and return it"""
+        now = timezone.now()
+        with transaction.atomic():
+            job = (
+                MediaJob.objects.select_for_update(skip_locked=True)
+                .filter(status='pending', run_after__lte=now)
+                .order_by('run_after', 'id')
+                .first()
+            )
+            if job is None:
+                return None
+            job.status = 'running'
+            job.attempts += 1
+            job.locked_at = now
+            job.save(update_fields=['status', 'attempts', 'locked_at', 'updated_at'])
+        return job
+
+    @staticmethod
+    def run_job(job_id):
+        """Claim a specific pending job (used for eager execution) and run it"""
+        claimed = MediaJob.objects.filter(id=job_id, status='pending').update(
+            status='running', locked_at=timezone.now(), attempts=F('attempts') + 1
+        )
+        if claimed:
+            MediaJobQueue.run(MediaJob.objects.get(id=job_id))
+
+    @staticmethod
+    def run(job):
+        """
+        Execute a claimed job, recording success or scheduling a retry.
+        
+        Status writes use update() because the row disappears if its media is
+        deleted while the job runs.
+        """
+        jobs = MediaJob.objects.filter(id=job.id)
+        try:
+            HANDLERS[job.kind](job)
+        except Exception as e:
+            logger.exception('Media job %s failed', job.id)
+            error = f'{type(e).__name__}: {e}'
+            if job.attempts >= job.max_attempts:
+                jobs.update(status='failed', last_error=error, updated_at=timezone.now())
+                if job.media_id:
+                    media = TripMedia.objects.filter(id=job.media_id)
+                    trip_id = media.values_list('trip_id', flat=True).first()
+                    if trip_id is not None:
+                        media.update(processing_status='failed')
+                        touch_trip(trip_id)
+            else:
+                retry_at = timezone.now() + timedelta(seconds=30 * 2 ** job.attempts)
+                jobs.update(status='pending', last_error=error, run_after=retry_at, updated_at=timezone.now())
+            return False
+
+        jobs.update(status='done', updated_at=timezone.now())
+        return True
@@ -0,0 +1,43 @@
+# trips/management/commands/backfill_checklist_counts.py
+from django.core.management.base import BaseCommand
+from trips import cache as trips_cache
+from trips.models import Trip
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized checklist_total / checklist_completed / checklist_next_id counters for existing trips'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of trips loaded and updated per batch')
+
+    def flush(self, batch):
+        # bulk_update bypasses the post_save signals that invalidate caches
+        Trip.objects.bulk_update(batch, ['checklist_total', 'checklist_completed', 'checklist_next_id'])
+        for trip in batch:
+            trips_cache.invalidate_trip(trip.id)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Trip.objects.only(
+            'id', 'checklist_data', 'checklist_total', 'checklist_completed', 'checklist_next_id'
+        )
+
+        batch = []
+        updated = 0
+        for trip in queryset.order_by('id').iterator(chunk_size=batch_size):
+            counters = (trip.checklist_total, trip.checklist_completed, trip.checklist_next_id)
+            trip.refresh_checklist_counts()
+            if (trip.checklist_total, trip.checklist_completed, trip.checklist_next_id) == counters:
+                continue
+            batch.append(trip)
+            if len(batch) >= batch_size:
+                self.flush(batch)
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            self.flush(batch)
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Updated checklist counters on {updated} trips'))
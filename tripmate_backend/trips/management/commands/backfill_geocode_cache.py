@@ -0,0 +1,60 @@
+# trips/management/commands/backfill_geocode_cache.py
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from trips.geocode_cache import GeocodeCache
+from trips.models import Trip, TripPlaces, TripRoute
+from trips.route_store import TripRouteStore
+
+
+class Command(BaseCommand):
+    help = "Fill each user's geocode cache from the coordinates in their routes and saved places"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of routes or places read per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        recorded = 0
+        routes = TripRoute.objects.values_list('trip_id', 'data').order_by('trip_id')
+        batch = []
+        for row in routes.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                recorded += self.record_routes(batch)
+                batch = []
+        if batch:
+            recorded += self.record_routes(batch)
+
+        places = TripPlaces.objects.annotate(user_id=F('trip__user_id')).only(
+            'address', 'latitude', 'longitude'
+        ).order_by('id')
+        batch = []
+        for place in places.iterator(chunk_size=batch_size):
+            batch.append(place)
+            if len(batch) >= batch_size:
+                recorded += self.record_places(batch)
+                batch = []
+        if batch:
+            recorded += self.record_places(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Recorded {recorded} location strings in the geocode cache'))
+
+    def record_routes(self, batch):
+        trips = Trip.objects.only('user_id', 'start_location', 'end_location', 'waypoints').in_bulk(
+            [trip_id for trip_id, _ in batch]
+        )
+        entries = {}
+        for trip_id, data in batch:
+            trip = trips[trip_id]
+            entries.setdefault(trip.user_id, []).extend(
+                GeocodeCache.route_entries(TripRouteStore.decode(data), trip.get_stop_names())
+            )
+        return sum(GeocodeCache.record(user_id, pairs, 'route') for user_id, pairs in entries.items())
+
+    def record_places(self, batch):
+        places = {}
+        for place in batch:
+            places.setdefault(place.user_id, []).append(place)
+        return sum(GeocodeCache.record_places(user_id, group) for user_id, group in places.items())
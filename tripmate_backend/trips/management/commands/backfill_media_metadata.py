@@ -0,0 +1,39 @@
+# trips/management/commands/backfill_media_metadata.py
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from trips.media_service import MediaService
+from trips.models import TripMedia
+
+
+class Command(BaseCommand):
+    help = ('Store file size, content type, dimensions, duration, capture time and GPS position '
+            'for media whose headers have not been read yet')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Re-read metadata for every media item, not just rows missing it')
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Rows fetched per database round-trip')
+
+    def handle(self, *args, **options):
+        queryset = TripMedia.objects.exclude(file='')
+        if not options['all']:
+            queryset = queryset.filter(
+                Q(metadata_extracted=False) | Q(file_size__isnull=True) | Q(content_type='')
+            )
+
+        updated = 0
+        missing = 0
+        for media in queryset.order_by('id').iterator(chunk_size=options['batch_size']):
+            try:
+                changed_fields = MediaService.extract_metadata(media, refresh=options['all'])
+            except FileNotFoundError:
+                missing += 1
+                continue
+            if changed_fields:
+                media.save(update_fields=changed_fields)
+                updated += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated metadata for {updated} media items ({missing} files missing from storage)'
+        ))
@@ -0,0 +1,124 @@
+# trips/management/commands/benchmark_checklist.py
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from trips.checklist_service import DEFAULT_CHECKLIST_TEMPLATES, ChecklistService
+
+# The pre-compilation get_default_checklist_templates() returned one big
+# literal, rebuilding every dict on each call. Compiling the repr of the
+# same data gives a function with that exact behaviour without repeating
+# the 200 lines of templates here.
+_build_legacy_templates = eval(compile(
+    f'lambda: {DEFAULT_CHECKLIST_TEMPLATES!r}', '<legacy checklist templates>', 'eval'
+))
+
+
+class LegacyChecklistService:
+    """Checklist generation as it was before the templates were compiled at import time"""
+
+    @staticmethod
+    def get_default_checklist_templates():
+        return _build_legacy_templates()
+
+    @staticmethod
+    def generate_checklist_for_trip(trip_type, duration_days=None, travelers=1, international=False):
+        templates = LegacyChecklistService.get_default_checklist_templates()
+        base_checklist = templates.get(trip_type, templates['leisure']).copy()
+
+        # Add universal items that apply to all trips
+        universal_items = [
+            {"id": 1000, "text": "Check weather forecast", "category": "planning", "completed": False, "priority": "medium"},
+            {"id": 1001, "text": "Confirm all bookings 24-48 hours before", "category": "confirmation", "completed": False, "priority": "high"},
+        ]
+
+        # Add duration-specific items
+        if duration_days:
+            if duration_days > 7:
+                universal_items.append({
+                    "id": 1002, "text": "Arrange mail hold/forwarding", "category": "home",
+                    "completed": False, "priority": "medium"
+                })
+            if duration_days > 14:
+                universal_items.append({
+                    "id": 1003, "text": "Notify employers/schools of extended absence", "category": "planning",
+                    "completed": False, "priority": "high"
+                })
+
+        # Add international travel items
+        if international:
+            international_items = [
+                {"id": 2000, "text": "Check visa requirements", "category": "documents", "completed": False, "priority": "high"},
+                {"id": 2001, "text": "Research currency exchange rates", "category": "finance", "completed": False, "priority": "medium"},
+                {"id": 2002, "text": "Check electrical outlet types and adapters", "category": "gear", "completed": False, "priority": "medium"},
+            ]
+            universal_items.extend(international_items)
+
+        # Add group-specific items if multiple travelers
+        if travelers > 1 and trip_type != 'group':
+            group_items = [
+                {"id": 3000, "text": "Coordinate packing lists with travel companions", "category": "coordination", "completed": False, "priority": "low"},
+                {"id": 3001, "text": "Plan shared expenses and payment methods", "category": "finance", "completed": False, "priority": "medium"},
+            ]
+            universal_items.extend(group_items)
+
+        # Combine and ensure unique IDs
+        final_checklist = base_checklist + universal_items
+
+        # Re-number IDs to ensure uniqueness
+        for i, item in enumerate(final_checklist):
+            item['id'] = i + 1
+
+        return final_checklist
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure per-call latency of checklist generation and the checklist templates payload, '
+        'before and after the templates were compiled at import time'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=20000,
+                            help='Calls per measurement')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Measurements per case; the best one is reported')
+
+    def handle(self, *args, **options):
+        number = options['number']
+        repeat = options['repeat']
+
+        # label -> (before, after)
+        cases = [
+            ('generate_checklist (leisure, 3 days)', *(
+                lambda service=service: service.generate_checklist_for_trip('leisure', duration_days=3)
+                for service in (LegacyChecklistService, ChecklistService)
+            )),
+            ('generate_checklist (all modifiers)', *(
+                lambda service=service: service.generate_checklist_for_trip(
+                    'leisure', duration_days=20, travelers=3, international=True)
+                for service in (LegacyChecklistService, ChecklistService)
+            )),
+            ('checklist_templates payload',
+             lambda: (LegacyChecklistService.get_default_checklist_templates(),
+                      ChecklistService.get_checklist_categories()),
+             lambda: (ChecklistService.get_shared_checklist_templates(),
+                      ChecklistService.get_checklist_categories())),
+            ('get_default_checklist_templates (copy)',
+             LegacyChecklistService.get_default_checklist_templates,
+             ChecklistService.get_default_checklist_templates),
+        ]
+
+        # Timing two implementations only means something if they agree
+        for label, before, after in cases:
+            if before() != after():
+                raise CommandError(f'{label}: output differs from the legacy implementation')
+
+        self.stdout.write(f'{"":<45} {"before":>11} {"after":>11}')
+        for label, before, after in cases:
+            timings = [
+                min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+                for func in (before, after)
+            ]
+            self.stdout.write(
+                f'{label:<45} {timings[0]:8.2f} us {timings[1]:8.2f} us  x{timings[0] / timings[1]:.1f}'
+            )
@@ -0,0 +1,45 @@
+# trips/management/commands/benchmark_stop_order.py
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from trips import geodesy, stop_order
+
+
+class Command(BaseCommand):
+    help = 'Measure waypoint order optimization on random stops spread over Europe'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 200],
+                            help='Waypoint counts to benchmark')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Random instances per size; times and savings are averaged')
+        parser.add_argument('--time-budget-ms', type=int, default=2000,
+                            help='Search time budget per instance')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def run_case(self, points, time_budget):
+        started = time.perf_counter()
+        result = stop_order.optimize_order(points, time_budget)
+        return time.perf_counter() - started, result
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        time_budget = options['time_budget_ms'] / 1000
+        self.stdout.write(f"NumPy {'available' if geodesy.numpy_available() else 'not installed'}")
+
+        for size in options['sizes']:
+            elapsed = savings = 0.0
+            converged = 0
+            for _ in range(options['repeat']):
+                # Start, waypoints and end, in the order a user might have typed them
+                points = [(rng.uniform(36, 60), rng.uniform(-9, 30)) for _ in range(size + 2)]
+                seconds, result = self.run_case(points, time_budget)
+                elapsed += seconds
+                savings += 1 - result['distance'] / result['initial_distance']
+                converged += result['converged']
+            repeat = options['repeat']
+            self.stdout.write(
+                f'{size:>4} waypoints  {elapsed / repeat * 1000:8.1f} ms  '
+                f'{savings / repeat * 100:5.1f}% shorter  converged {converged}/{repeat}'
+            )
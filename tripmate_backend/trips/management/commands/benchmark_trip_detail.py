@@ -0,0 +1,83 @@
+# trips/management/commands/benchmark_trip_detail.py
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from rest_framework.renderers import JSONRenderer
+from trips.models import Trip, TripPlaces
+from trips.serializers import TripDetailSerializer, TripPlacesSerializer
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare trip detail render time and size for different saved place counts (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000],
+                            help='Saved place counts to benchmark')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Renders per case; the best one is reported')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['sizes'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, sizes, repeat):
+        user = User.objects.create_user('benchmark-trip-detail', 'benchmark@example.com')
+        renderer = JSONRenderer()
+
+        for size in sizes:
+            trip = Trip.objects.create(
+                user=user, title=f'Benchmark {size}', start_location='Sydney',
+                end_location='Melbourne', waypoints=['Canberra', 'Albury']
+            )
+            TripPlaces.objects.bulk_create([
+                TripPlaces(
+                    trip=trip, stop_index=i % 4, place_id=f'bench-{i}', name=f'Place {i}',
+                    address='1 Example Street', latitude=-33.8, longitude=151.2,
+                    types=['point_of_interest', 'establishment']
+                )
+                for i in range(size)
+            ], batch_size=500)
+            trip = Trip.objects.get(pk=trip.pk)
+            prefetch_related_objects([trip], 'saved_places')
+
+            cases = [
+                ('per-place re-serialization (previous)', lambda: self.legacy_payload(trip)),
+                ('shared places, full grouping', lambda: TripDetailSerializer(trip).data),
+                ('shared places, ?places_by_stop=ids', lambda: TripDetailSerializer(
+                    trip, context={'places_by_stop_ids': True}).data),
+            ]
+            for label, build in cases:
+                best = None
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    body = renderer.render(build())
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                self.stdout.write(
+                    f'{size:>5} places  {label:<40} {best * 1000:9.2f} ms  {len(body) / 1024:9.1f} KB'
+                )
+
+    def legacy_payload(self, trip):
+        """Rebuild the old shape: every place serialized again per stop group"""
+        data = dict(TripDetailSerializer(trip).data)
+        context = {'stop_names': trip.get_stop_names()}
+        places_by_stop = {}
+        for place in trip.saved_places.all():
+            places_by_stop.setdefault(place.stop_index, []).append(
+                TripPlacesSerializer(place, context=context).data
+            )
+        data['saved_places_by_stop'] = places_by_stop
+        return data
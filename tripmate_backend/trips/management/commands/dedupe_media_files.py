@@ -0,0 +1,46 @@
+# trips/management/commands/dedupe_media_files.py
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from trips.blob_store import MediaBlobStore
+from trips.jobs import touch_trip
+from trips.models import TripMedia
+
+
+class Command(BaseCommand):
+    help = 'Move media uploaded before content-addressed storage into shared, deduplicated blobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Rows fetched per database round-trip')
+
+    def handle(self, *args, **options):
+        queryset = TripMedia.objects.filter(blob__isnull=True).exclude(file='')
+
+        moved = 0
+        deduplicated = 0
+        missing = 0
+        for media in queryset.order_by('id').iterator(chunk_size=options['batch_size']):
+            old_name = media.file.name
+            try:
+                media.file.open('rb')
+            except FileNotFoundError:
+                missing += 1
+                continue
+            try:
+                blob = MediaBlobStore.store(media.file, old_name)
+            finally:
+                media.file.close()
+
+            if blob.ref_count > 1:
+                deduplicated += 1
+            TripMedia.objects.filter(id=media.id).update(file=blob.name, blob=blob)
+            # update() skips the signals; cached payloads hold the old file URL
+            touch_trip(media.trip_id)
+            if blob.name != old_name:
+                default_storage.delete(old_name)
+            moved += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {moved} media files into blob storage, {deduplicated} of them duplicates '
+            f'({missing} files missing from storage)'
+        ))
@@ -0,0 +1,33 @@
+# trips/management/commands/generate_media_renditions.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from trips.media_service import MediaService
+from trips.models import TripMedia
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail and screen-sized renditions for photos that are missing them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate renditions that already exist')
+        parser.add_argument('--trip', type=int, help='Only process media of this trip id')
+
+    def handle(self, *args, **options):
+        if not MediaService.renditions_available():
+            raise CommandError('Pillow is not installed; renditions cannot be generated')
+
+        queryset = TripMedia.objects.filter(media_type='photo')
+        if options['trip']:
+            queryset = queryset.filter(trip_id=options['trip'])
+        if not options['force']:
+            queryset = queryset.filter(Q(thumbnail='') | Q(screen_image=''))
+
+        processed = 0
+        for media in queryset.order_by('id').iterator(chunk_size=100):
+            changed_fields = MediaService.generate_renditions(media, force=options['force'])
+            if changed_fields:
+                media.save(update_fields=changed_fields)
+                processed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Generated renditions for {processed} photos'))
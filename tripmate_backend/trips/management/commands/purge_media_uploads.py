@@ -0,0 +1,42 @@
+# trips/management/commands/purge_media_uploads.py
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from trips.models import MediaUpload
+from trips.upload_service import ChunkedUploadService
+
+
+class Command(BaseCommand):
+    help = 'Delete abandoned resumable uploads and their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24,
+                            help='Purge uploads with no activity for this many hours')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = MediaUpload.objects.filter(updated_at__lt=cutoff)
+
+        purged = 0
+        for upload in stale.iterator():
+            ChunkedUploadService.discard(upload)
+            purged += 1
+        stale.delete()
+
+        # Partial files whose upload row is gone (e.g. the trip was deleted)
+        orphans = 0
+        temp_dir = settings.MEDIA_UPLOAD_TEMP_DIR
+        if os.path.isdir(temp_dir):
+            known = {str(upload_id) for upload_id in MediaUpload.objects.values_list('id', flat=True)}
+            for entry in os.scandir(temp_dir):
+                upload_id = entry.name.rsplit('.', 1)[0]
+                if entry.is_file() and upload_id not in known and entry.stat().st_mtime < cutoff.timestamp():
+                    os.remove(entry.path)
+                    orphans += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {purged} stale uploads and {orphans} orphaned partial files'
+        ))
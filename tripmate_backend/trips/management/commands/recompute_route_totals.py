@@ -0,0 +1,78 @@
+# trips/management/commands/recompute_route_totals.py
+from django.core.management.base import BaseCommand
+from trips import cache as trips_cache
+from trips.distance_service import METHODS, TripDistanceService
+from trips.models import Trip
+
+
+class Command(BaseCommand):
+    help = ('Estimate total_distance / total_duration for every trip from stop coordinates '
+            'and report (or, with --apply, fix) trips whose stored totals disagree')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--method', choices=METHODS, default='haversine',
+                            help='Distance formula used for each leg')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Relative difference from the stored distance that counts as a mismatch')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of trips loaded and updated per batch')
+        parser.add_argument('--apply', action='store_true',
+                            help='Write the estimates to trips that mismatch or have no totals')
+
+    def flush(self, batch):
+        # bulk_update bypasses the post_save signals that invalidate caches
+        Trip.objects.bulk_update(batch, ['total_distance', 'total_duration'])
+        for trip in batch:
+            trips_cache.invalidate_trip(trip.id)
+
+    def process(self, trips, options, counts, batch):
+        estimates = TripDistanceService.estimate_many(trips, options['method'])
+        for trip in trips:
+            estimate = estimates[trip.id]
+            if not estimate['complete']:
+                counts['skipped'] += 1
+                continue
+            difference = abs(estimate['total_distance'] - trip.total_distance)
+            if difference <= options['tolerance'] * max(trip.total_distance, 1):
+                counts['matching'] += 1
+                continue
+            counts['mismatched'] += 1
+            self.stdout.write(
+                f'Trip {trip.id}: stored {trip.total_distance:g} km / {trip.total_duration} min, '
+                f"estimated {estimate['total_distance']} km / {estimate['total_duration']} min "
+                f"({estimate['mode']}, from {estimate['source']})"
+            )
+            if options['apply']:
+                trip.total_distance = estimate['total_distance']
+                trip.total_duration = estimate['total_duration']
+                batch.append(trip)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Trip.objects.only('id', 'user_id', 'start_location', 'end_location', 'waypoints',
+                                     'total_distance', 'total_duration')
+
+        counts = {'matching': 0, 'mismatched': 0, 'skipped': 0}
+        trips = []
+        batch = []
+        updated = 0
+        for trip in queryset.order_by('id').iterator(chunk_size=batch_size):
+            trips.append(trip)
+            if len(trips) >= batch_size:
+                self.process(trips, options, counts, batch)
+                trips = []
+            if len(batch) >= batch_size:
+                self.flush(batch)
+                updated += len(batch)
+                batch = []
+
+        if trips:
+            self.process(trips, options, counts, batch)
+        if batch:
+            self.flush(batch)
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['matching']} trips match, {counts['mismatched']} differ, "
+            f"{counts['skipped']} lack coordinates for every stop; updated {updated}"
+        ))
@@ -0,0 +1,44 @@
+# trips/management/commands/run_media_jobs.py
+import time
+
+from django.core.management.base import BaseCommand
+from trips.jobs import MediaJobQueue
+
+
+class Command(BaseCommand):
+    help = 'Run queued background media jobs (thumbnails, metadata extraction, file cleanup)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of polling')
+        parser.add_argument('--sleep', type=float, default=2.0,
+                            help='Seconds to wait between polls when the queue is empty')
+        parser.add_argument('--max-jobs', type=int, default=0,
+                            help='Exit after running this many jobs (0 = no limit)')
+
+    def handle(self, *args, **options):
+        processed = 0
+        failed = 0
+        last_stale_check = 0
+
+        while True:
+            if time.monotonic() - last_stale_check > 60:
+                MediaJobQueue.requeue_stale_jobs()
+                last_stale_check = time.monotonic()
+
+            job = MediaJobQueue.claim_next()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            if MediaJobQueue.run(job):
+                processed += 1
+            else:
+                failed += 1
+
+            if options['max_jobs'] and processed + failed >= options['max_jobs']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f'Ran {processed} media jobs ({failed} failed)'))
@@ -0,0 +1,106 @@
+# trips/management/commands/sweep_orphan_media.py
+import os
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from trips.models import MediaBlob, TripMedia
+
+
+def iter_media_files(root):
+    """Yield (storage name, path, mtime) for every file below root, one directory at a time"""
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = os.path.relpath(entry.path, settings.MEDIA_ROOT).replace(os.sep, '/')
+                    yield name, entry.path, entry.stat().st_mtime
+
+
+class Command(BaseCommand):
+    help = 'Delete files under MEDIA_ROOT/trip_media that no media row references, with their stale blobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=float, default=24,
+                            help='Only delete files older than this many hours (protects in-flight uploads)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Files checked against the database per query')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report orphans without deleting them')
+
+    def referenced(self, names, cutoff):
+        """
+        The subset of names still referenced by a TripMedia row, or held by a
+        blob that took or dropped a reference since cutoff (its media row
+        may not be committed yet, or a cleanup job is about to release it).
+        A blob's ref_count alone is not trusted: counts leaked by deletes
+        that skipped the release would keep the file forever.
+        """
+        media = TripMedia.objects.filter(
+            Q(file__in=names) | Q(thumbnail__in=names) | Q(screen_image__in=names)
+        ).values_list('file', 'thumbnail', 'screen_image')
+        found = {name for row in media for name in row}
+        found.update(
+            MediaBlob.objects.filter(name__in=names, updated_at__gte=cutoff).values_list('name', flat=True)
+        )
+        return found
+
+    def drop_blobs(self, names, cutoff):
+        """Delete the blob rows of orphaned files, re-checked under lock; returns the names still held"""
+        with transaction.atomic():
+            rows = list(
+                MediaBlob.objects.select_for_update().filter(name__in=names).values_list('id', 'name', 'updated_at')
+            )
+            in_use = set(
+                TripMedia.objects.filter(blob_id__in=[row[0] for row in rows]).values_list('blob_id', flat=True)
+            )
+            stale = {blob_id: name for blob_id, name, updated_at in rows if updated_at < cutoff and blob_id not in in_use}
+            MediaBlob.objects.filter(id__in=stale).delete()
+        return {name for _, name, _ in rows} - set(stale.values())
+
+    def sweep(self, batch, cutoff, dry_run):
+        referenced = self.referenced([name for name, _ in batch], cutoff)
+        orphans = [(name, path) for name, path in batch if name not in referenced]
+        if not dry_run:
+            held = self.drop_blobs([name for name, _ in orphans], cutoff)
+            orphans = [(name, path) for name, path in orphans if name not in held]
+            for name, path in orphans:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        for name, _ in orphans:
+            self.stdout.write(f'{"Would delete" if dry_run else "Deleted"} {name}')
+        return len(orphans)
+
+    def handle(self, *args, **options):
+        root = os.path.join(settings.MEDIA_ROOT, 'trip_media')
+        if not os.path.isdir(root):
+            self.stdout.write('No trip_media directory; nothing to sweep')
+            return
+
+        cutoff = time.time() - options['min_age'] * 3600
+        cutoff_at = datetime.fromtimestamp(cutoff, timezone.utc)
+        scanned = 0
+        orphans = 0
+        batch = []
+        for name, path, mtime in iter_media_files(root):
+            scanned += 1
+            if mtime >= cutoff:
+                continue
+            batch.append((name, path))
+            if len(batch) >= options['batch_size']:
+                orphans += self.sweep(batch, cutoff_at, options['dry_run'])
+                batch = []
+        if batch:
+            orphans += self.sweep(batch, cutoff_at, options['dry_run'])
+
+        verb = 'Found' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'Scanned {scanned} files. {verb} {orphans} orphans'))
@@ -0,0 +1,217 @@
+# trips/media_metadata.py - Header-only probing of uploaded media files
+"""
+Everything here reads just the bytes it needs: Pillow only parses the image
+header until pixel data is requested, and MP4/MOV files are walked box by
+box, seeking over the media payload instead of reading it.
+"""
+import mimetypes
+import re
+import struct
+import wave
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; photos then keep unknown dimensions
+    Image = None
+
+EXIF_ORIENTATION_TAG = 0x0112
+EXIF_DATETIME_TAG = 0x0132
+EXIF_IFD_POINTER = 0x8769
+EXIF_GPS_IFD_POINTER = 0x8825
+EXIF_DATETIME_ORIGINAL_TAG = 0x9003
+EXIF_OFFSET_TIME_ORIGINAL_TAG = 0x9011
+GPS_LATITUDE_REF, GPS_LATITUDE, GPS_LONGITUDE_REF, GPS_LONGITUDE = 1, 2, 3, 4
+
+# MP4 timestamps count seconds from 1904-01-01 UTC
+MP4_EPOCH = datetime(1904, 1, 1, tzinfo=dt_timezone.utc)
+
+# ISO 6709 location as stored in QuickTime '\xa9xyz' boxes, e.g. "+37.7858-122.4064+010.000/"
+ISO6709_PATTERN = re.compile(r'([+-]\d+(?:\.\d+)?)([+-]\d+(?:\.\d+)?)')
+
+MP4_EXTENSIONS = {'mp4', 'mov', 'm4a', 'm4v', '3gp'}
+
+# Boxes that only contain other boxes and must be descended into
+MP4_CONTAINER_BOXES = {b'moov', b'trak', b'mdia', b'minf', b'stbl', b'udta', b'edts'}
+
+
+def guess_content_type(name, declared=None):
+    """Content type from the file extension, falling back to the client's claim"""
+    guessed, _ = mimetypes.guess_type(name or '')
+    return guessed or declared or 'application/octet-stream'
+
+
+def _extension(name):
+    return (name or '').rsplit('.', 1)[-1].lower() if '.' in (name or '') else ''
+
+
+def iter_mp4_boxes(fileobj, start, end):
+    """Yield (box_type, content_start, box_end) for boxes in [start, end)"""
+    position = start
+    while position + 8 <= end:
+        fileobj.seek(position)
+        header = fileobj.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack('>I4s', header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', fileobj.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - position
+        if size < header_size:
+            return
+        yield box_type, position + header_size, min(position + size, end)
+        position += size
+
+
+def walk_mp4(fileobj, end, start=0):
+    """Depth-first walk over every box, descending into container boxes"""
+    for box_type, content_start, box_end in iter_mp4_boxes(fileobj, start, end):
+        yield box_type, content_start, box_end
+        if box_type in MP4_CONTAINER_BOXES:
+            yield from walk_mp4(fileobj, box_end, content_start)
+
+
+def _file_length(fileobj):
+    fileobj.seek(0, 2)
+    length = fileobj.tell()
+    fileobj.seek(0)
+    return length
+
+
+def parse_iso6709(value):
+    """(latitude, longitude) from an ISO 6709 string, or None"""
+    match = ISO6709_PATTERN.match(value.strip())
+    if not match:
+        return None
+    latitude, longitude = float(match.group(1)), float(match.group(2))
+    if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+        return latitude, longitude
+    return None
+
+
+def probe_mp4(fileobj):
+    """Duration, video dimensions, creation time and location from the moov boxes"""
+    info = {}
+    for box_type, content_start, box_end in walk_mp4(fileobj, _file_length(fileobj)):
+        fileobj.seek(content_start)
+        if box_type == b'mvhd':
+            version = fileobj.read(4)[0]
+            if version == 1:
+                created, _, timescale, duration = struct.unpack('>QQIQ', fileobj.read(28))
+            else:
+                created, _, timescale, duration = struct.unpack('>IIII', fileobj.read(16))
+            if timescale:
+                info['duration'] = duration / timescale
+            if created:
+                info['captured_at'] = MP4_EPOCH + timedelta(seconds=created)
+        elif box_type == b'\xa9xyz':
+            length = struct.unpack('>H', fileobj.read(2))[0]
+            fileobj.read(2)  # language code
+            location = parse_iso6709(fileobj.read(min(length, box_end - content_start - 4)).decode('ascii', 'ignore'))
+            if location:
+                info['latitude'], info['longitude'] = location
+        elif box_type == b'tkhd' and 'width' not in info:
+            version = fileobj.read(4)[0]
+            fileobj.seek(content_start + (88 if version == 1 else 76))
+            width, height = struct.unpack('>II', fileobj.read(8))
+            # 16.16 fixed point; audio tracks report 0x0
+            if width and height:
+                info['width'], info['height'] = width >> 16, height >> 16
+    return info
+
+
+def probe_wav(fileobj):
+    with wave.open(fileobj, 'rb') as wav:
+        rate = wav.getframerate()
+        return {'duration': wav.getnframes() / rate} if rate else {}
+
+
+def parse_exif_datetime(value, offset=None):
+    """
+    Parse an EXIF 'YYYY:MM:DD HH:MM:SS' timestamp.
+
+    With an OffsetTimeOriginal value the result is exact; without one the
+    camera's wall-clock time is stored as if it were UTC, so the displayed
+    date and time match what the camera recorded.
+    """
+    try:
+        parsed = datetime.strptime(str(value).strip('\x00 '), '%Y:%m:%d %H:%M:%S')
+    except ValueError:
+        return None
+    tzinfo = dt_timezone.utc
+    if offset:
+        try:
+            tzinfo = datetime.strptime(str(offset).strip('\x00 '), '%z').tzinfo
+        except ValueError:
+            pass
+    return parsed.replace(tzinfo=tzinfo)
+
+
+def _gps_coordinate(value, reference):
+    degrees, minutes, seconds = (float(part) for part in value)
+    coordinate = degrees + minutes / 60 + seconds / 3600
+    return -coordinate if reference in ('S', 'W') else coordinate
+
+
+def read_exif(image):
+    """Capture time and GPS position from an opened image's EXIF block"""
+    info = {}
+    exif = image.getexif()
+    exif_ifd = exif.get_ifd(EXIF_IFD_POINTER)
+
+    captured_at = parse_exif_datetime(
+        exif_ifd.get(EXIF_DATETIME_ORIGINAL_TAG) or exif.get(EXIF_DATETIME_TAG) or '',
+        exif_ifd.get(EXIF_OFFSET_TIME_ORIGINAL_TAG),
+    )
+    if captured_at:
+        info['captured_at'] = captured_at
+
+    gps = exif.get_ifd(EXIF_GPS_IFD_POINTER)
+    try:
+        latitude = _gps_coordinate(gps[GPS_LATITUDE], gps.get(GPS_LATITUDE_REF))
+        longitude = _gps_coordinate(gps[GPS_LONGITUDE], gps.get(GPS_LONGITUDE_REF))
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        pass
+    else:
+        if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+            info['latitude'], info['longitude'] = latitude, longitude
+    return info
+
+
+def probe_image(fileobj):
+    if Image is None:
+        return {}
+    try:
+        with Image.open(fileobj) as image:
+            width, height = image.size
+            orientation = image.getexif().get(EXIF_ORIENTATION_TAG)
+            info = read_exif(image)
+    except Image.DecompressionBombError:
+        return {}
+    if orientation in (5, 6, 7, 8):
+        # Stored sideways; report the dimensions as displayed
+        width, height = height, width
+    info.update(width=width, height=height)
+    return info
+
+
+def probe(fileobj, name, media_type):
+    """
+    Return whatever of width, height, duration, captured_at, latitude and
+    longitude can be read from the file headers. Unknown or unparsable
+    formats yield an empty dict.
+    """
+    extension = _extension(name)
+    try:
+        if media_type == 'photo':
+            return probe_image(fileobj)
+        if extension in MP4_EXTENSIONS:
+            return probe_mp4(fileobj)
+        if extension == 'wav':
+            return probe_wav(fileobj)
+    except (OSError, ValueError, EOFError, IndexError, struct.error, wave.Error):
+        pass
+    return {}
@@ -0,0 +1,176 @@
+# trips/media_service.py - Post-processing for uploaded trip media
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .blob_store import MediaBlobStore
+from .media_metadata import guess_content_type, probe
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it photos keep only the original
+    Image = None
+
+
+class MediaService:
+    """Service for generating photo renditions and cleaning up media files"""
+
+    # Rendition name -> (model field, bounding box in pixels)
+    RENDITIONS = {
+        'thumbnail': ('thumbnail', (320, 320)),
+        'screen': ('screen_image', (1600, 1600)),
+    }
+
+    @staticmethod
+    def renditions_available():
+        return Image is not None
+
+    @staticmethod
+    def _rendition_format():
+        return getattr(settings, 'MEDIA_RENDITION_FORMAT', 'WEBP').upper()
+
+    @staticmethod
+    def _rendition_name(media, rendition):
+        # Content-addressed originals have 64-character stems; keep within the column length
+        stem = os.path.splitext(os.path.basename(media.file.name))[0][:40]
+        extension = 'jpg' if MediaService._rendition_format() == 'JPEG' else 'webp'
+        return f'trip_media/renditions/{stem}_{rendition}.{extension}'
+
+    @staticmethod
+    def _encode(image):
+        buffer = BytesIO()
+        image.save(
+            buffer,
+            format=MediaService._rendition_format(),
+            quality=getattr(settings, 'MEDIA_RENDITION_QUALITY', 80)
+        )
+        return buffer.getvalue()
+
+    @staticmethod
+    def generate_renditions(media, force=False):
+        """
+        Create the thumbnail and screen-sized variants for a photo.
+
+        The original is decoded once; each rendition is downscaled from the
+        previous, larger one. Returns the list of model fields that changed;
+        the caller saves them.
+        """
+        if media.media_type != 'photo' or not media.file or not MediaService.renditions_available():
+            return []
+
+        pending = [
+            (rendition, field_name, box)
+            for rendition, (field_name, box) in MediaService.RENDITIONS.items()
+            if force or not getattr(media, field_name)
+        ]
+        if not pending:
+            return []
+        pending.sort(key=lambda entry: entry[2][0] * entry[2][1], reverse=True)
+
+        encoded = []
+        media.file.open('rb')
+        try:
+            with Image.open(media.file) as source:
+                # For JPEG sources, let the decoder skip detail we are about to throw away
+                source.draft('RGB', pending[0][2])
+                image = ImageOps.exif_transpose(source)
+                if MediaService._rendition_format() == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+                    image = image.convert('RGB')
+                for rendition, field_name, box in pending:
+                    image.thumbnail(box, Image.LANCZOS)
+                    encoded.append((rendition, field_name, MediaService._encode(image)))
+        except (OSError, ValueError, Image.DecompressionBombError):
+            # Not a decodable image; keep serving the original
+            return []
+        finally:
+            media.file.close()
+
+        changed_fields = []
+        for rendition, field_name, content in encoded:
+            old_name = getattr(media, field_name).name
+            if old_name:
+                default_storage.delete(old_name)
+            name = default_storage.save(MediaService._rendition_name(media, rendition), ContentFile(content))
+            setattr(media, field_name, name)
+            changed_fields.append(field_name)
+
+        return changed_fields
+
+    @staticmethod
+    def process(media):
+        """
+        Run all post-upload processing for a media item (called by the job
+        worker). Returns the list of model fields that changed.
+        """
+        changed_fields = MediaService.extract_metadata(media)
+        changed_fields += MediaService.generate_renditions(media)
+        return changed_fields
+
+    @staticmethod
+    def extract_metadata(media, refresh=False):
+        """
+        Fill size, content type, pixel dimensions, duration, capture time and
+        location columns.
+
+        Size and type are only looked up in storage when missing (or when
+        refresh is set); everything else comes from the file headers. A
+        location the user entered by hand is never overwritten. Returns the
+        list of model fields that changed.
+        """
+        if not media.file:
+            return []
+
+        values = {}
+        if refresh or media.file_size is None:
+            values['file_size'] = media.file.size
+        if refresh or not media.content_type:
+            values['content_type'] = guess_content_type(media.file.name)
+
+        media.file.open('rb')
+        try:
+            probed = probe(media.file, media.file.name, media.media_type)
+        finally:
+            media.file.close()
+
+        has_location = media.latitude is not None and media.longitude is not None
+        if has_location:
+            probed.pop('latitude', None)
+            probed.pop('longitude', None)
+        values.update(probed)
+        values['metadata_extracted'] = True
+
+        changed_fields = []
+        for field_name, value in values.items():
+            if getattr(media, field_name) != value:
+                setattr(media, field_name, value)
+                changed_fields.append(field_name)
+        return changed_fields
+
+    @staticmethod
+    def cleanup_payload(media_queryset):
+        """
+        Everything storage-side that deleting these media rows leaves behind,
+        read in one query: blob references to release (blob id -> count) and
+        the renditions and pre-blob originals to delete outright.
+        """
+        rendition_fields = [field for field, _ in MediaService.RENDITIONS.values()]
+        files = []
+        blobs = {}
+        for row in media_queryset.order_by().values('file', 'blob_id', *rendition_fields):
+            if row['blob_id']:
+                blobs[str(row['blob_id'])] = blobs.get(str(row['blob_id']), 0) + 1
+            elif row['file']:
+                files.append(row['file'])
+            files.extend(row[field] for field in rendition_fields if row[field])
+        return {'files': files, 'blobs': blobs}
+
+    @staticmethod
+    def cleanup(payload):
+        """Apply a cleanup_payload(): release blob references and delete the files"""
+        for blob_id, count in payload.get('blobs', {}).items():
+            MediaBlobStore.release(int(blob_id), count)
+        for name in payload.get('files', []):
+            default_storage.delete(name)
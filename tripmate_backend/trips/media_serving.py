@@ -0,0 +1,194 @@
+# trips/media_serving.py - Authenticated media delivery with HTTP Range support
+"""
+Media is served through the API instead of a public MEDIA_URL so ownership
+can be checked. <img> and <video> elements cannot send the Authorization
+header, so serializers hand out short-lived signed URLs. Range requests are
+answered with 206 responses that read only the requested bytes, which lets
+video and audio players seek without downloading from the start.
+"""
+import hashlib
+import os
+import re
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from .media_metadata import guess_content_type
+
+SIGNING_SALT = 'trips.media'
+STREAM_BLOCK_SIZE = 64 * 1024
+
+# Rendition query value -> TripMedia field
+RENDITION_FIELDS = {
+    'original': 'file',
+    'thumbnail': 'thumbnail',
+    'screen': 'screen_image',
+}
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def signed_url_max_age():
+    return getattr(settings, 'MEDIA_SIGNED_URL_MAX_AGE', 24 * 60 * 60)
+
+
+def signing_epoch():
+    """
+    (number, start timestamp) of the current signing period, half a URL's
+    lifetime long. Payloads that embed signed URLs key their ETag and cache
+    entry on it, so a cached or revalidated copy never holds URLs with less
+    than half their lifetime left.
+    """
+    period = max(1, signed_url_max_age() // 2)
+    number = int(time.time()) // period
+    return number, number * period
+
+
+def sign_media(media_id, rendition):
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign_object([media_id, rendition])
+
+
+def check_media_signature(token, media_id, rendition):
+    """True if the token was issued for this media item and rendition and has not expired"""
+    try:
+        signed = signing.TimestampSigner(salt=SIGNING_SALT).unsign_object(
+            token, max_age=signed_url_max_age()
+        )
+    except signing.BadSignature:
+        return False
+    return signed == [media_id, rendition]
+
+
+def signed_media_url(request, media, rendition='original'):
+    """Absolute, signed URL for the serve view, or None when the file is unset"""
+    if not request or not getattr(media, RENDITION_FIELDS[rendition]):
+        return None
+    path = reverse('serve-trip-media', args=[media.trip_id, media.id])
+    return request.build_absolute_uri(
+        f'{path}?rendition={rendition}&token={sign_media(media.id, rendition)}'
+    )
+
+
+def parse_range_header(header, size):
+    """
+    Return the inclusive (start, end) byte range requested, or None to serve
+    the whole file. Multi-range requests are answered with the whole file,
+    which RFC 9110 allows.
+    """
+    match = RANGE_PATTERN.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+class RangeFileWrapper:
+    """Iterate over one byte range of an open file in fixed-size blocks"""
+
+    def __init__(self, fileobj, start, length, block_size=STREAM_BLOCK_SIZE):
+        self.fileobj = fileobj
+        self.remaining = length
+        self.block_size = block_size
+        fileobj.seek(start)
+
+    def __iter__(self):
+        while self.remaining > 0:
+            block = self.fileobj.read(min(self.block_size, self.remaining))
+            if not block:
+                break
+            self.remaining -= len(block)
+            yield block
+
+    def close(self):
+        self.fileobj.close()
+
+
+def file_etag(field_file, size):
+    digest = hashlib.sha1(f'{field_file.name}:{size}'.encode('utf-8')).hexdigest()
+    return quote_etag(digest[:32])
+
+
+def _sendfile_response(field_file, content_type):
+    """
+    Hand the transfer to the front-end web server when configured
+    (MEDIA_SENDFILE_HEADER = 'X-Sendfile' for Apache/lighttpd or
+    'X-Accel-Redirect' for nginx). The server then handles Range itself.
+    """
+    header = getattr(settings, 'MEDIA_SENDFILE_HEADER', None)
+    if not header:
+        return None
+    response = HttpResponse(content_type=content_type)
+    if header.lower() == 'x-accel-redirect':
+        prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+        response[header] = prefix.rstrip('/') + '/' + field_file.name
+    else:
+        response[header] = os.path.abspath(field_file.path)
+    return response
+
+
+def media_file_response(request, field_file, content_type=None):
+    """
+    Build the response for a stored file: 304 when the client's copy is
+    current, 206 for a satisfiable Range, 416 for an unsatisfiable one and
+    a streamed 200 otherwise. Raises OSError (FileNotFoundError) when the
+    file is missing from storage.
+    """
+    size = field_file.size
+    etag = file_etag(field_file, size)
+    content_type = content_type or guess_content_type(field_file.name)
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = _sendfile_response(field_file, content_type)
+    if response is None:
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE')
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if range_header and (not if_range or if_range == etag):
+            try:
+                byte_range = parse_range_header(range_header, size)
+            except RangeNotSatisfiable:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+
+        if response is None and byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                RangeFileWrapper(field_file.open('rb'), start, length),
+                status=206,
+                content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(length)
+        elif response is None:
+            # FileResponse lets the WSGI server use sendfile() where available
+            response = FileResponse(field_file.open('rb'), content_type=content_type)
+
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    patch_cache_control(
+        response, private=True, max_age=getattr(settings, 'MEDIA_CACHE_MAX_AGE', 24 * 60 * 60)
+    )
+    return response
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0006_add_trip_list_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='checklist_completed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='checklist_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0007_add_checklist_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tripmedia',
+            name='screen_image',
+            field=models.FileField(blank=True, upload_to='trip_media/renditions/'),
+        ),
+        migrations.AddField(
+            model_name='tripmedia',
+            name='thumbnail',
+            field=models.FileField(blank=True, upload_to='trip_media/renditions/'),
+        ),
+    ]
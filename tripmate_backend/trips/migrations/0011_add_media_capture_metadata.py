@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0010_add_media_file_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tripmedia',
+            name='captured_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tripmedia',
+            name='metadata_extracted',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:40
+
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.db import migrations, models
+
+
+def populate_timeline_at(apps, schema_editor):
+    TripMedia = apps.get_model('trips', 'TripMedia')
+    queryset = TripMedia.objects.only('id', 'custom_date', 'custom_time', 'captured_at', 'taken_at')
+    batch = []
+    for media in queryset.order_by('id').iterator(chunk_size=500):
+        if media.custom_date:
+            media.timeline_at = datetime.combine(
+                media.custom_date, media.custom_time or time(12, 0), tzinfo=dt_timezone.utc
+            )
+        else:
+            media.timeline_at = media.captured_at or media.taken_at
+        batch.append(media)
+        if len(batch) >= 500:
+            TripMedia.objects.bulk_update(batch, ['timeline_at'])
+            batch = []
+    if batch:
+        TripMedia.objects.bulk_update(batch, ['timeline_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0013_add_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='tripmedia',
+            options={'ordering': ['timeline_at', 'id']},
+        ),
+        migrations.AddField(
+            model_name='tripmedia',
+            name='timeline_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(populate_timeline_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tripmedia',
+            name='timeline_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='tripmedia',
+            index=models.Index(fields=['trip', 'timeline_at'], name='media_trip_timeline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tripmedia',
+            index=models.Index(fields=['trip', 'stop_index', 'timeline_at'], name='media_trip_stop_timeline_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:30
+
+import hashlib
+import json
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_route_data(apps, schema_editor):
+    Trip = apps.get_model('trips', 'Trip')
+    TripRoute = apps.get_model('trips', 'TripRoute')
+    trips = Trip.objects.filter(route_data__isnull=False).only('id', 'route_data')
+    batch = []
+    for trip in trips.order_by('id').iterator(chunk_size=200):
+        raw = json.dumps(trip.route_data, separators=(',', ':')).encode('utf-8')
+        batch.append(TripRoute(
+            trip_id=trip.id,
+            data=zlib.compress(raw, 6),
+            raw_size=len(raw),
+            digest=hashlib.sha256(raw).hexdigest(),
+        ))
+        if len(batch) >= 200:
+            TripRoute.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        TripRoute.objects.bulk_create(batch)
+
+
+def restore_route_data(apps, schema_editor):
+    Trip = apps.get_model('trips', 'Trip')
+    TripRoute = apps.get_model('trips', 'TripRoute')
+    for route in TripRoute.objects.iterator(chunk_size=200):
+        Trip.objects.filter(id=route.trip_id).update(
+            route_data=json.loads(zlib.decompress(route.data))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0015_add_cleanup_files_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TripRoute',
+            fields=[
+                ('trip', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='route', serialize=False, to='trips.trip')),
+                ('data', models.BinaryField()),
+                ('raw_size', models.PositiveIntegerField()),
+                ('digest', models.CharField(max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(move_route_data, restore_route_data),
+        migrations.RemoveField(
+            model_name='trip',
+            name='route_data',
+        ),
+    ]
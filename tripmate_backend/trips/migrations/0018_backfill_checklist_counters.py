@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:10
+
+from django.db import migrations
+
+
+def backfill_checklist_counters(apps, schema_editor):
+    Trip = apps.get_model('trips', 'Trip')
+    queryset = Trip.objects.only('id', 'checklist_data', 'checklist_total', 'checklist_completed')
+    batch = []
+    for trip in queryset.order_by('id').iterator(chunk_size=500):
+        # Same rule as Trip.refresh_checklist_counts()
+        items = trip.checklist_data or []
+        total = len(items)
+        completed = sum(1 for item in items if item.get('completed', False))
+        if (trip.checklist_total, trip.checklist_completed) == (total, completed):
+            continue
+        trip.checklist_total, trip.checklist_completed = total, completed
+        batch.append(trip)
+        if len(batch) >= 500:
+            Trip.objects.bulk_update(batch, ['checklist_total', 'checklist_completed'])
+            batch = []
+    if batch:
+        Trip.objects.bulk_update(batch, ['checklist_total', 'checklist_completed'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0017_geocode_entry'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_checklist_counters, migrations.RunPython.noop),
+    ]
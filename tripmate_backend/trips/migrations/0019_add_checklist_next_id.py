@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:20
+
+from django.db import migrations, models
+
+
+def populate_checklist_next_id(apps, schema_editor):
+    Trip = apps.get_model('trips', 'Trip')
+    batch = []
+    for trip in Trip.objects.only('id', 'checklist_data').order_by('id').iterator(chunk_size=500):
+        ids = [item.get('id') for item in trip.checklist_data or [] if isinstance(item.get('id'), int)]
+        if not ids:
+            continue
+        trip.checklist_next_id = max(ids) + 1
+        batch.append(trip)
+        if len(batch) >= 500:
+            Trip.objects.bulk_update(batch, ['checklist_next_id'])
+            batch = []
+    if batch:
+        Trip.objects.bulk_update(batch, ['checklist_next_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0018_backfill_checklist_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='checklist_next_id',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(populate_checklist_next_id, migrations.RunPython.noop),
+    ]
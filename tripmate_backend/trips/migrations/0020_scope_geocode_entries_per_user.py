@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def clear_geocode_entries(apps, schema_editor):
+    # Shared entries cannot be attributed to a user; backfill_geocode_cache
+    # rebuilds them per user from the stored routes and places
+    apps.get_model('trips', 'GeocodeEntry').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0019_add_checklist_next_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_geocode_entries, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='geocodeentry',
+            name='query',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AddField(
+            model_name='geocodeentry',
+            name='user',
+            field=models.ForeignKey(default=None, on_delete=django.db.models.deletion.CASCADE, related_name='geocode_entries', to=settings.AUTH_USER_MODEL),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='geocodeentry',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AlterUniqueTogether(
+            name='geocodeentry',
+            unique_together={('user', 'query')},
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0020_scope_geocode_entries_per_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediablob',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -1,6 +1,10 @@
 # trips/models.py - Updated with trip type, checklist, and TripPlaces
-from django.db import models
+import uuid
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -26,7 +30,6 @@ class Trip(models.Model):
     end_date = models.DateField(null=True, blank=True)
     travelers = models.PositiveIntegerField(default=1)
     waypoints = models.JSONField(default=list, blank=True)
-    route_data = models.JSONField(null=True, blank=True)
     total_distance = models.FloatField(default=0)
     total_duration = models.IntegerField(default=0)
     
@@ -34,15 +37,45 @@ class Trip(models.Model):
     trip_type = models.CharField(max_length=20, choices=TRIP_TYPES, default='leisure')
     checklist_data = models.JSONField(default=list, blank=True)
     
+    # Denormalized checklist counters so list views never parse checklist_data
+    checklist_total = models.PositiveIntegerField(default=0)
+    checklist_completed = models.PositiveIntegerField(default=0)
+    # Next id for an added checklist item; only grows, so ids of deleted items are never reused
+    checklist_next_id = models.PositiveIntegerField(default=1)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Backs keyset pagination of a user's trip list
+            models.Index(fields=['user', 'created_at', 'id'], name='trip_user_created_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.user.username}"
     
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        checklist_loaded = 'checklist_data' not in self.get_deferred_fields()
+        if checklist_loaded and (update_fields is None or 'checklist_data' in update_fields):
+            self.refresh_checklist_counts()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {
+                    'checklist_total', 'checklist_completed', 'checklist_next_id'
+                }
+        super().save(*args, **kwargs)
+    
+    def refresh_checklist_counts(self):
+        """Recompute the checklist counters from checklist_data"""
+        items = self.checklist_data or []
+        self.checklist_total = len(items)
+        self.checklist_completed = sum(1 for item in items if item.get('completed', False))
+        # Whole-list writes (PUT, regenerate) may bring ids past the counter
+        highest_id = max((item.get('id') for item in items if isinstance(item.get('id'), int)), default=0)
+        self.checklist_next_id = max(self.checklist_next_id or 1, highest_id + 1)
+    
     @property
     def duration_days(self):
         if self.start_date and self.end_date:
@@ -51,17 +84,22 @@ class Trip(models.Model):
     
     @property
     def checklist_progress(self):
-        """Calculate checklist completion percentage"""
-        if not self.checklist_data:
+        """Calculate checklist completion percentage from the stored counters"""
+        if not self.checklist_total:
             return 0
         
-        total_items = len(self.checklist_data)
-        completed_items = sum(1 for item in self.checklist_data if item.get('completed', False))
-        
-        if total_items == 0:
-            return 0
-        
-        return round((completed_items / total_items) * 100)
+        return round((self.checklist_completed / self.checklist_total) * 100)
+    
+    def get_stop_names(self):
+        """Stop index -> name table: start location, waypoints in order, end location"""
+        return [self.start_location] + list(self.waypoints or []) + [self.end_location]
+    
+    @staticmethod
+    def lookup_stop_name(stop_names, stop_index):
+        """Resolve a stop index against a table built by get_stop_names()"""
+        if 0 <= stop_index < len(stop_names):
+            return stop_names[stop_index]
+        return f"Stop {stop_index + 1}"
     
     def get_checklist_by_category(self):
         """Group checklist items by category"""
@@ -74,6 +112,21 @@ class Trip(models.Model):
         return categories
 
 
+class TripRoute(models.Model):
+    """
+    The directions response saved with a trip, zlib-compressed JSON kept out
+    of the trips_trip rows. Read and written through trips/route_store.py.
+    """
+    trip = models.OneToOneField(Trip, on_delete=models.CASCADE, primary_key=True, related_name='route')
+    data = models.BinaryField()
+    raw_size = models.PositiveIntegerField()  # uncompressed JSON bytes
+    digest = models.CharField(max_length=64)  # sha256 of the uncompressed JSON
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Route for trip {self.trip_id} ({len(self.data)}/{self.raw_size} bytes)"
+
+
 class TripPlaces(models.Model):
     """Model to store places saved to specific trips"""
     trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name='saved_places')
@@ -113,16 +166,66 @@ class TripPlaces(models.Model):
     
     @property
     def stop_name(self):
-        """Get the name of the stop this place belongs to"""
-        try:
-            if self.stop_index == 0:
-                return self.trip.start_location
-            elif self.stop_index == len(self.trip.waypoints) + 1:
-                return self.trip.end_location
-            else:
-                return self.trip.waypoints[self.stop_index - 1]
-        except (IndexError, AttributeError):
-            return f"Stop {self.stop_index + 1}"
+        """
+        Get the name of the stop this place belongs to.
+        
+        Dereferences self.trip; when serializing many places, build the table
+        once with Trip.get_stop_names() instead.
+        """
+        return Trip.lookup_stop_name(self.trip.get_stop_names(), self.stop_index)
+
+
+class GeocodeEntry(models.Model):
+    """
+    Coordinates for a free-text location string, learned from the routes
+    and places a user saves, so the server can place that user's stops
+    without calling a geocoding API (see trips/geocode_cache.py).
+    """
+    SOURCES = [
+        ('route', 'Route'),
+        ('place', 'Saved place'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='geocode_entries')
+    query = models.CharField(max_length=255)  # normalize_location() of the text
+    location = models.CharField(max_length=255)  # the text as last seen
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    source = models.CharField(max_length=10, choices=SOURCES)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['user', 'query']
+    
+    def __str__(self):
+        return f"{self.location} ({self.latitude:.4f}, {self.longitude:.4f})"
+
+
+class MediaBlob(models.Model):
+    """
+    One stored copy of a media file, addressed by the SHA-256 of its bytes.
+    TripMedia rows that upload identical content share a blob; the file is
+    removed once the last reference is released (see trips/blob_store.py).
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255)  # storage path, trip_media/<aa>/<sha256>.<ext>
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # also set when a reference is taken or dropped
+    
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+
+class TripMediaQuerySet(models.QuerySet):
+    def delete(self):
+        """Delete the rows and queue the release of their blobs and files"""
+        from .jobs import queue_media_cleanup  # jobs imports this module
+        with transaction.atomic(using=self.db):
+            queue_media_cleanup(self)
+            return super().delete()
 
 
 class TripMedia(models.Model):
@@ -131,11 +234,33 @@ class TripMedia(models.Model):
         ('video', 'Video'),
         ('audio', 'Audio'),
     ]
+    PROCESSING_STATUSES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
     
     trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name='media')
     stop_index = models.IntegerField()
     media_type = models.CharField(max_length=10, choices=MEDIA_TYPES)
     file = models.FileField(upload_to='trip_media/')
+    blob = models.ForeignKey(MediaBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='media')
+    
+    # Downscaled photo renditions, generated from the original after upload
+    thumbnail = models.FileField(upload_to='trip_media/renditions/', blank=True)
+    screen_image = models.FileField(upload_to='trip_media/renditions/', blank=True)
+    processing_status = models.CharField(max_length=10, choices=PROCESSING_STATUSES, default='pending')
+    
+    # File metadata captured at upload / processing time so reads never touch storage
+    file_size = models.PositiveBigIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True)  # seconds, for video/audio
+    captured_at = models.DateTimeField(null=True, blank=True)  # from EXIF / container metadata
+    metadata_extracted = models.BooleanField(default=False)
+    
     title = models.CharField(max_length=200, blank=True)
     description = models.TextField(blank=True)
     notes = models.TextField(blank=True)
@@ -149,15 +274,54 @@ class TripMedia(models.Model):
     custom_time = models.TimeField(null=True, blank=True)
     taken_at = models.DateTimeField(auto_now_add=True)
     
+    # Persisted timeline sort key (custom date/time, else capture time, else
+    # upload time), maintained in save() so timeline queries can use an index
+    timeline_at = models.DateTimeField()
+    
+    objects = TripMediaQuerySet.as_manager()
+    
     class Meta:
-        ordering = ['custom_date', 'custom_time', '-taken_at']
+        ordering = ['timeline_at', 'id']
+        indexes = [
+            models.Index(fields=['trip', 'timeline_at'], name='media_trip_timeline_idx'),
+            models.Index(fields=['trip', 'stop_index', 'timeline_at'], name='media_trip_stop_timeline_idx'),
+        ]
     
     def __str__(self):
         return f"{self.trip.title} - {self.get_media_type_display()}"
     
+    TIMELINE_SOURCE_FIELDS = {'custom_date', 'custom_time', 'captured_at', 'taken_at'}
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or self.TIMELINE_SOURCE_FIELDS & set(update_fields):
+            self.timeline_at = self.compute_timeline_at()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'timeline_at'}
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        # The queryset delete releases the blob and queues the file cleanup;
+        # cascades from Trip are handled in trips/signals.py
+        result = TripMedia.objects.filter(pk=self.pk).delete()
+        self.pk = None
+        return result
+    
+    def compute_timeline_at(self):
+        """
+        The moment this item sits at on the timeline. Custom dates are stored
+        as UTC so the timeline day always equals the date the user picked;
+        a custom date without a time sorts at midday.
+        """
+        if self.custom_date:
+            return datetime.combine(
+                self.custom_date, self.custom_time or time(12, 0), tzinfo=dt_timezone.utc
+            )
+        return self.captured_at or self.taken_at or timezone.now()
+    
     @property
     def display_datetime(self):
-        """Get the display datetime (custom or actual upload time)"""
+        """Get the display datetime (custom, captured, or actual upload time)"""
         if self.custom_date:
             if self.custom_time:
                 from datetime import datetime, time
@@ -165,9 +329,73 @@ class TripMedia(models.Model):
             else:
                 from datetime import datetime, time
                 return datetime.combine(self.custom_date, time(12, 0))
-        return self.taken_at
+        return self.captured_at or self.taken_at
     
     @property
     def timeline_date(self):
         """Get the date for timeline sorting"""
-        return self.custom_date if self.custom_date else self.taken_at.date()
\ No newline at end of file
+        if self.custom_date:
+            return self.custom_date
+        return self.timeline_at.astimezone(dt_timezone.utc).date()
+
+
+class MediaUpload(models.Model):
+    """An in-progress resumable (chunked) media upload, see trips/upload_service.py"""
+    STATUSES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='media_uploads')
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name='media_uploads')
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    received_size = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    media_fields = models.JSONField(default=dict, blank=True)  # TripMedia fields applied on finalize
+    status = models.CharField(max_length=10, choices=STATUSES, default='uploading')
+    media = models.ForeignKey(TripMedia, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.filename} ({self.received_size}/{self.total_size})"
+
+
+class MediaJob(models.Model):
+    """Database-backed queue entry for background media work (see trips/jobs.py)"""
+    KINDS = [
+        ('process_media', 'Process uploaded media'),
+        ('cleanup_files', 'Remove deleted media files'),
+    ]
+    STATUSES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    kind = models.CharField(max_length=30, choices=KINDS)
+    media = models.ForeignKey(TripMedia, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [
+            # Workers poll for the oldest runnable pending job
+            models.Index(fields=['status', 'run_after'], name='mediajob_status_run_after_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.id} ({self.status})"
@@ -0,0 +1,116 @@
+# trips/pagination.py - Keyset (cursor) pagination for trip lists
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+MAX_TRIP_ID = 2 ** 63  # BigAutoField upper bound; larger ids cannot be bound as query params
+
+
+class TripCursorPagination(BasePagination):
+    """
+    Keyset pagination on (created_at, id), newest first.
+
+    Each page is a single index range scan no matter how deep the client
+    pages, unlike offset pagination. Pagination is opt-in: it only kicks in
+    when the request carries a `cursor` or `page_size` query param, so
+    existing clients that expect a plain list keep working.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        default_size = getattr(settings, 'TRIP_LIST_PAGE_SIZE', 20)
+        max_size = getattr(settings, 'TRIP_LIST_MAX_PAGE_SIZE', 100)
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, default_size))
+        except (TypeError, ValueError):
+            page_size = default_size
+        return max(1, min(page_size, max_size))
+
+    def is_requested(self, request):
+        return (
+            self.cursor_query_param in request.query_params or
+            self.page_size_query_param in request.query_params
+        )
+
+    def encode_cursor(self, trip):
+        payload = json.dumps({'c': trip.created_at.isoformat(), 'i': trip.id})
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            created_at = parse_datetime(payload['c'])
+            trip_id = int(payload['i'])
+        except (TypeError, ValueError, KeyError, UnicodeError, OverflowError):
+            raise NotFound(self.invalid_cursor_message)
+        # Cursors we issue always carry an aware timestamp and a row id
+        if created_at is None or timezone.is_naive(created_at) or not 0 < trip_id < MAX_TRIP_ID:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, trip_id
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by('-created_at', '-id')
+        position = self.decode_cursor(request)
+        if position is not None:
+            created_at, trip_id = position
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) |
+                Q(created_at=created_at, id__lt=trip_id)
+            )
+
+        # Fetch one extra row to know whether another page exists
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_first_link(self):
+        url = self.request.build_absolute_uri()
+        return remove_query_param(url, self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('first', self.get_first_link()),
+            ('page_size', self.page_size),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'first': {'type': 'string', 'format': 'uri'},
+                'page_size': {'type': 'integer'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,291 @@
+# trips/route_geometry.py - Route path extraction, simplification and polyline encoding
+"""
+The stored route_data is the Google DirectionsResult the planner produced
+(serialized to a JSON string), or the flight-route stand-in with the same
+shape. This module pulls the densest available path out of it, simplifies
+it with Douglas-Peucker for a set of map zoom levels and encodes each level
+as a Google encoded polyline, which is what the map needs to draw.
+"""
+import json
+import math
+
+EARTH_RADIUS_M = 6371008.8
+
+# Ground metres per screen pixel at zoom 0 on the equator (256px Web Mercator tiles)
+METERS_PER_PIXEL_ZOOM_0 = 156543.03392
+
+DEFAULT_ZOOM_LEVELS = (5, 8, 11, 14)
+
+
+def encode_polyline(points, precision=5):
+    """Google encoded polyline for a sequence of (lat, lng)"""
+    factor = 10 ** precision
+    output = []
+    previous_lat = previous_lng = 0
+    for lat, lng in points:
+        lat_e5 = int(round(lat * factor))
+        lng_e5 = int(round(lng * factor))
+        for delta in (lat_e5 - previous_lat, lng_e5 - previous_lng):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                output.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            output.append(chr(value + 63))
+        previous_lat, previous_lng = lat_e5, lng_e5
+    return ''.join(output)
+
+
+def decode_polyline(encoded, precision=5):
+    """
+    List of (lat, lng) from a Google encoded polyline. Raises ValueError
+    when the string is truncated or is not a polyline.
+    """
+    factor = 10 ** precision
+    points = []
+    index = lat = lng = 0
+    length = len(encoded)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                if index >= length:
+                    raise ValueError('Truncated polyline')
+                byte = ord(encoded[index]) - 63
+                if not 0 <= byte < 0x40:
+                    raise ValueError(f'Invalid polyline character at {index}')
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append((lat / factor, lng / factor))
+    return points
+
+
+def coerce_point(value):
+    """(lat, lng) from {'lat': .., 'lng': ..} or [lat, lng], or None"""
+    try:
+        if isinstance(value, dict):
+            lat, lng = float(value['lat']), float(value['lng'])
+        else:
+            lat, lng = float(value[0]), float(value[1])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+    if -90 <= lat <= 90 and -180 <= lng <= 180:
+        return lat, lng
+    return None
+
+
+def _coerce_path(values):
+    if isinstance(values, dict) and isinstance(values.get('points'), str):
+        values = values['points']
+    if isinstance(values, str):
+        # A malformed polyline counts as a missing path, like a bad point
+        try:
+            return decode_polyline(values)
+        except ValueError:
+            return []
+    if not isinstance(values, list):
+        return []
+    return [point for point in map(coerce_point, values) if point is not None]
+
+
+def _step_path(step):
+    for key in ('path', 'lat_lngs', 'polyline'):
+        path = _coerce_path(step.get(key))
+        if path:
+            return path
+    return []
+
+
+def load_route(route_data):
+    """The first route of a stored DirectionsResult, or None"""
+    if isinstance(route_data, str):
+        try:
+            route_data = json.loads(route_data)
+        except ValueError:
+            return None
+    if not isinstance(route_data, dict):
+        return None
+    routes = route_data.get('routes')
+    if not routes or not isinstance(routes[0], dict):
+        return None
+    return routes[0]
+
+
+def waypoint_order(route, waypoint_count):
+    """
+    Google's waypoint_order for a route: the trip waypoint index visited by
+    each leg, in route order. The identity when the route was not
+    reordered, None when the stored order does not fit the waypoints.
+    """
+    order = route.get('waypoint_order')
+    if not order:
+        return list(range(waypoint_count))
+    if not isinstance(order, list) or sorted(order) != list(range(waypoint_count)):
+        return None
+    return order
+
+
+def route_stop_positions(route, stop_count):
+    """
+    One (lat, lng) per trip stop, in the trip's stop order, from a loaded
+    route, or None when the route does not have one position per stop.
+    Driving routes give the leg endpoints, which follow the route's
+    waypoint_order (the planner lets Google reorder the waypoints); flight
+    routes store [start, *waypoints, end] as the overview path (their leg
+    locations serialize as empty objects).
+    """
+    if route is None:
+        return None
+    legs = [leg for leg in route.get('legs') or [] if isinstance(leg, dict)]
+    order = waypoint_order(route, stop_count - 2) if stop_count >= 2 else None
+    if legs and len(legs) == stop_count - 1 and order is not None:
+        route_points = [coerce_point(legs[0].get('start_location'))]
+        route_points += [coerce_point(leg.get('end_location')) for leg in legs]
+        if None not in route_points:
+            points = list(route_points)
+            for visit, waypoint_index in enumerate(order):
+                points[waypoint_index + 1] = route_points[visit + 1]
+            return points
+
+    overview = route.get('overview_path')
+    if isinstance(overview, list) and len(overview) == stop_count:
+        points = [coerce_point(point) for point in overview]
+        if None not in points:
+            return points
+    return None
+
+
+def extract_path(route_data):
+    """
+    The most detailed path available: the step-level paths of every leg,
+    else the overview path, else the overview polyline. Consecutive
+    duplicate points are dropped.
+    """
+    route = load_route(route_data)
+    if route is None:
+        return []
+
+    path = []
+    for leg in route.get('legs') or []:
+        for step in (leg.get('steps') or []) if isinstance(leg, dict) else []:
+            if isinstance(step, dict):
+                path.extend(_step_path(step))
+    if len(path) < 2:
+        path = _coerce_path(route.get('overview_path')) or _coerce_path(route.get('overview_polyline'))
+
+    deduplicated = []
+    for point in path:
+        if not deduplicated or deduplicated[-1] != point:
+            deduplicated.append(point)
+    return deduplicated
+
+
+def _project(points):
+    """Local equirectangular projection to metres, accurate enough for tolerances"""
+    mean_lat = math.radians(sum(lat for lat, _ in points) / len(points))
+    scale_x = EARTH_RADIUS_M * math.cos(mean_lat)
+    return [
+        (math.radians(lng) * scale_x, math.radians(lat) * EARTH_RADIUS_M)
+        for lat, lng in points
+    ]
+
+
+def simplify(points, tolerance_m):
+    """
+    Douglas-Peucker simplification keeping every point that deviates more
+    than tolerance_m metres from the simplified line. Iterative, so long
+    paths cannot hit the recursion limit.
+    """
+    if len(points) < 3 or tolerance_m <= 0:
+        return list(points)
+
+    projected = _project(points)
+    xs = [x for x, _ in projected]
+    ys = [y for _, y in projected]
+    tolerance_sq = tolerance_m * tolerance_m
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xs[first], ys[first]
+        dx, dy = xs[last] - ax, ys[last] - ay
+        segment_sq = dx * dx + dy * dy
+
+        max_distance_sq = -1.0
+        max_index = first
+        for index in range(first + 1, last):
+            px = xs[index] - ax
+            py = ys[index] - ay
+            if segment_sq:
+                t = (px * dx + py * dy) / segment_sq
+                if t > 1.0:
+                    px -= dx
+                    py -= dy
+                elif t > 0.0:
+                    px -= t * dx
+                    py -= t * dy
+            distance_sq = px * px + py * py
+            if distance_sq > max_distance_sq:
+                max_distance_sq = distance_sq
+                max_index = index
+
+        if max_distance_sq > tolerance_sq:
+            keep[max_index] = True
+            stack.append((first, max_index))
+            stack.append((max_index, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def zoom_tolerance(zoom, latitude, pixels=1.0):
+    """Metres covered by `pixels` screen pixels at this zoom level and latitude"""
+    return METERS_PER_PIXEL_ZOOM_0 * math.cos(math.radians(latitude)) / (2 ** zoom) * pixels
+
+
+def bounds(points):
+    lats = [lat for lat, _ in points]
+    lngs = [lng for _, lng in points]
+    return {'north': max(lats), 'south': min(lats), 'east': max(lngs), 'west': min(lngs)}
+
+
+def build_geometry(route_data, zoom_levels=DEFAULT_ZOOM_LEVELS, pixel_tolerance=1.0):
+    """
+    Encoded polylines of the route for each zoom level. Levels are
+    simplified from fine to coarse, each from the previous level's output,
+    so the coarse levels only process a few points.
+    """
+    path = extract_path(route_data)
+    if len(path) < 2:
+        return {'source_point_count': len(path), 'bounds': None, 'levels': []}
+
+    mid_latitude = (max(lat for lat, _ in path) + min(lat for lat, _ in path)) / 2
+    levels = []
+    current = path
+    for zoom in sorted(zoom_levels, reverse=True):
+        tolerance = zoom_tolerance(zoom, mid_latitude, pixel_tolerance)
+        current = simplify(current, tolerance)
+        levels.append({
+            'zoom': zoom,
+            'tolerance_m': round(tolerance, 2),
+            'point_count': len(current),
+            'polyline': encode_polyline(current),
+        })
+    levels.reverse()
+
+    return {'source_point_count': len(path), 'bounds': bounds(path), 'levels': levels}
+
+
+def level_for_zoom(geometry, zoom):
+    """The finest level whose zoom does not exceed the requested zoom"""
+    levels = geometry['levels']
+    if not levels:
+        return None
+    eligible = [level for level in levels if level['zoom'] <= zoom]
+    return eligible[-1] if eligible else levels[0]
@@ -0,0 +1,72 @@
+# trips/route_store.py - Compressed storage for trip route_data
+import hashlib
+import json
+import zlib
+
+from django.conf import settings
+from django.utils import timezone
+
+from .geocode_cache import GeocodeCache
+from .models import Trip, TripRoute
+
+
+def encode_route(value):
+    """Compact JSON bytes for a route_data value"""
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def route_digest(raw):
+    return hashlib.sha256(raw).hexdigest()
+
+
+class TripRouteStore:
+    """
+    route_data lives in the TripRoute table rather than on Trip, so trip
+    saves never rewrite it and it is only read by callers that ask for it.
+    """
+
+    @staticmethod
+    def load(trip_id):
+        """The stored route_data value, or None when the trip has no route"""
+        data = TripRoute.objects.filter(trip_id=trip_id).values_list('data', flat=True).first()
+        return TripRouteStore.decode(data)
+
+    @staticmethod
+    def decode(data):
+        """route_data from a stored TripRoute.data value"""
+        if data is None:
+            return None
+        return json.loads(zlib.decompress(data))
+
+    @staticmethod
+    def digest(trip_id):
+        return TripRoute.objects.filter(trip_id=trip_id).values_list('digest', flat=True).first()
+
+    @staticmethod
+    def save(trip_id, value):
+        """
+        Store route_data for a trip, or remove it when value is None. Nothing
+        is written when the content is unchanged. Returns True if it changed.
+        """
+        if value is None:
+            changed = TripRoute.objects.filter(trip_id=trip_id).delete()[0] > 0
+        else:
+            raw = encode_route(value)
+            digest = route_digest(raw)
+            if TripRoute.objects.filter(trip_id=trip_id, digest=digest).exists():
+                return False
+            TripRoute.objects.update_or_create(
+                trip_id=trip_id,
+                defaults={
+                    'data': zlib.compress(raw, getattr(settings, 'TRIP_ROUTE_COMPRESSION_LEVEL', 6)),
+                    'raw_size': len(raw),
+                    'digest': digest,
+                },
+            )
+            changed = True
+        if changed:
+            # Detail ETags are derived from the trip's updated_at
+            Trip.objects.filter(id=trip_id).update(updated_at=timezone.now())
+            if value is not None:
+                GeocodeCache.record_route(trip_id, value)
+        return changed
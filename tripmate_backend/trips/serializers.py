@@ -1,7 +1,13 @@
 # trips/serializers.py - Updated with checklist support and TripPlaces
+from django.conf import settings
 from rest_framework import serializers
 from .models import Trip, TripMedia, TripPlaces
 from .checklist_service import ChecklistService
+from .blob_store import MediaBlobStore
+from .media_metadata import guess_content_type
+from .media_serving import signed_media_url
+from .route_store import TripRouteStore
+from .timeline_service import TripTimelineService
 from datetime import datetime
 
 class TripListSerializer(serializers.ModelSerializer):
@@ -17,12 +23,43 @@ class TripListSerializer(serializers.ModelSerializer):
             'start_date', 'end_date', 'travelers', 'waypoints',
             'total_distance', 'total_duration', 'duration_days',
             'trip_type', 'trip_type_display', 'checklist_progress',
+            'checklist_total', 'checklist_completed',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'checklist_total', 'checklist_completed', 'created_at', 'updated_at']
+
+class TripRouteDataMixin:
+    """
+    route_data is stored compressed in TripRoute (see trips/route_store.py).
+    It is accepted on writes, saved only when it changed, and included in
+    responses only when the view sets context['include_route'].
+    """
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if self.context.get('include_route'):
+            data['route_data'] = TripRouteStore.load(instance.pk)
+        return data
+    
+    def create(self, validated_data):
+        has_route = 'route_data' in validated_data
+        route_data = validated_data.pop('route_data', None)
+        trip = super().create(validated_data)
+        if has_route:
+            TripRouteStore.save(trip.pk, route_data)
+        return trip
+    
+    def update(self, instance, validated_data):
+        has_route = 'route_data' in validated_data
+        route_data = validated_data.pop('route_data', None)
+        trip = super().update(instance, validated_data)
+        if has_route:
+            TripRouteStore.save(trip.pk, route_data)
+        return trip
 
-class TripSerializer(serializers.ModelSerializer):
-    """Full serializer with route_data and checklist"""
+class TripSerializer(TripRouteDataMixin, serializers.ModelSerializer):
+    """Full serializer with checklist (and route_data when requested)"""
+    route_data = serializers.JSONField(write_only=True, required=False, allow_null=True)
     duration_days = serializers.ReadOnlyField()
     checklist_progress = serializers.ReadOnlyField()
     trip_type_display = serializers.CharField(source='get_trip_type_display', read_only=True)
@@ -35,10 +72,10 @@ class TripSerializer(serializers.ModelSerializer):
             'start_date', 'end_date', 'travelers', 'waypoints',
             'total_distance', 'total_duration', 'duration_days',
             'trip_type', 'trip_type_display', 'checklist_data', 
-            'checklist_progress', 'checklist_by_category',
-            'route_data', 'created_at', 'updated_at'
+            'checklist_progress', 'checklist_total', 'checklist_completed',
+            'checklist_by_category', 'route_data', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'checklist_total', 'checklist_completed', 'created_at', 'updated_at']
     
     def get_checklist_by_category(self, obj):
         """Group checklist items by category with category metadata"""
@@ -60,7 +97,8 @@ class TripSerializer(serializers.ModelSerializer):
         
         return result
 
-class TripCreateSerializer(serializers.ModelSerializer):
+class TripCreateSerializer(TripRouteDataMixin, serializers.ModelSerializer):
+    route_data = serializers.JSONField(write_only=True, required=False, allow_null=True)
     generate_checklist = serializers.BooleanField(write_only=True, default=True)
     
     class Meta:
@@ -160,10 +198,43 @@ class ChecklistUpdateSerializer(serializers.Serializer):
         
         return value
 
+class ChecklistItemSerializer(serializers.Serializer):
+    """Fields accepted when adding or editing a single checklist item"""
+    PRIORITIES = ['high', 'medium', 'low']
+    
+    text = serializers.CharField(required=False, max_length=500)
+    category = serializers.CharField(required=False, max_length=50)
+    completed = serializers.BooleanField(required=False)
+    priority = serializers.ChoiceField(choices=PRIORITIES, required=False)
+
+class ChecklistItemOperationSerializer(ChecklistItemSerializer):
+    """A single operation in a batched checklist update"""
+    OPERATIONS = ['toggle', 'update', 'add', 'delete']
+    
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    id = serializers.IntegerField(required=False)
+    
+    def validate(self, attrs):
+        if attrs['op'] == 'add':
+            if not attrs.get('text'):
+                raise serializers.ValidationError("'text' is required to add an item")
+        elif 'id' not in attrs:
+            raise serializers.ValidationError(f"'id' is required for '{attrs['op']}'")
+        return attrs
+
+class ChecklistBatchSerializer(serializers.Serializer):
+    """Serializer for batched checklist item operations"""
+    operations = ChecklistItemOperationSerializer(many=True, allow_empty=False)
+
 # NEW: TripPlaces serializers
 class TripPlacesSerializer(serializers.ModelSerializer):
-    """Serializer for saved trip places"""
-    stop_name = serializers.ReadOnlyField()
+    """
+    Serializer for saved trip places.
+    
+    Pass context={'stop_names': trip.get_stop_names()} when serializing many
+    places so stop names resolve without touching place.trip.
+    """
+    stop_name = serializers.SerializerMethodField()
     
     class Meta:
         model = TripPlaces
@@ -174,6 +245,12 @@ class TripPlacesSerializer(serializers.ModelSerializer):
             'visit_date', 'user_rating', 'stop_name', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def get_stop_name(self, obj):
+        stop_names = self.context.get('stop_names')
+        if stop_names is None:
+            return obj.stop_name
+        return Trip.lookup_stop_name(stop_names, obj.stop_index)
 
 class TripPlacesCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating trip places"""
@@ -214,27 +291,59 @@ class TripPlacesUpdateSerializer(serializers.ModelSerializer):
 
 # Enhanced trip serializer with saved places
 class TripDetailSerializer(TripSerializer):
-    """Enhanced trip serializer with saved places"""
-    saved_places = TripPlacesSerializer(many=True, read_only=True)
+    """
+    Enhanced trip serializer with saved places.
+    
+    Places are serialized once and saved_places_by_stop is grouped from that
+    list. With context={'places_by_stop_ids': True} the grouping holds place
+    ids instead of repeating every place object.
+    """
+    saved_places = serializers.SerializerMethodField()
     saved_places_by_stop = serializers.SerializerMethodField()
     
     class Meta(TripSerializer.Meta):
         fields = TripSerializer.Meta.fields + ['saved_places', 'saved_places_by_stop']
     
+    def _serialized_places(self, obj):
+        """Serialize a trip's places once, shared by both places fields"""
+        if not hasattr(self, '_places_cache'):
+            self._places_cache = {}
+        if obj.pk not in self._places_cache:
+            self._places_cache[obj.pk] = TripPlacesSerializer(
+                obj.saved_places.all(),
+                many=True,
+                context={**self.context, 'stop_names': obj.get_stop_names()}
+            ).data
+        return self._places_cache[obj.pk]
+    
+    def get_saved_places(self, obj):
+        return self._serialized_places(obj)
+    
     def get_saved_places_by_stop(self, obj):
-        """Group saved places by stop index"""
+        """Group saved places (or just their ids) by stop index"""
+        ids_only = self.context.get('places_by_stop_ids', False)
         places_by_stop = {}
-        for place in obj.saved_places.all():
-            stop_index = place.stop_index
+        for place in self._serialized_places(obj):
+            stop_index = place['stop_index']
             if stop_index not in places_by_stop:
                 places_by_stop[stop_index] = []
-            places_by_stop[stop_index].append(TripPlacesSerializer(place).data)
+            places_by_stop[stop_index].append(place['id'] if ids_only else place)
         return places_by_stop
 
-# Media serializers (unchanged)
+def _absolute_file_url(request, field_file):
+    """Absolute URL for a stored file, or None when the file is unset"""
+    if field_file and request:
+        return request.build_absolute_uri(field_file.url)
+    return None
+
+# Media serializers
 class TripMediaSerializer(serializers.ModelSerializer):
     file_url = serializers.SerializerMethodField()
-    file_size = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    screen_url = serializers.SerializerMethodField()
+    stream_url = serializers.SerializerMethodField()
+    thumbnail_stream_url = serializers.SerializerMethodField()
+    screen_stream_url = serializers.SerializerMethodField()
     display_datetime = serializers.ReadOnlyField()
     timeline_date = serializers.ReadOnlyField()
     
@@ -242,23 +351,35 @@ class TripMediaSerializer(serializers.ModelSerializer):
         model = TripMedia
         fields = [
             'id', 'stop_index', 'media_type', 'file', 'file_url',
-            'title', 'description', 'notes', 'latitude', 'longitude', 
+            'thumbnail_url', 'screen_url', 'stream_url', 'thumbnail_stream_url',
+            'screen_stream_url', 'processing_status', 'title', 'description', 'notes', 'latitude', 'longitude', 
             'custom_date', 'custom_time', 'taken_at', 'file_size',
+            'content_type', 'width', 'height', 'duration', 'captured_at',
             'display_datetime', 'timeline_date'
         ]
-        read_only_fields = ['id', 'taken_at']
+        read_only_fields = [
+            'id', 'processing_status', 'file_size', 'content_type',
+            'width', 'height', 'duration', 'captured_at', 'taken_at'
+        ]
     
     def get_file_url(self, obj):
-        if obj.file:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.file.url)
-        return None
-    
-    def get_file_size(self, obj):
-        if obj.file:
-            return obj.file.size
-        return 0
+        return _absolute_file_url(self.context.get('request'), obj.file)
+    
+    def get_thumbnail_url(self, obj):
+        return _absolute_file_url(self.context.get('request'), obj.thumbnail)
+    
+    def get_screen_url(self, obj):
+        return _absolute_file_url(self.context.get('request'), obj.screen_image)
+    
+    def get_stream_url(self, obj):
+        return signed_media_url(self.context.get('request'), obj, 'original')
+    
+    def get_thumbnail_stream_url(self, obj):
+        return signed_media_url(self.context.get('request'), obj, 'thumbnail')
+    
+    def get_screen_stream_url(self, obj):
+        return signed_media_url(self.context.get('request'), obj, 'screen')
+    
 
 class TripMediaCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -274,6 +395,108 @@ class TripMediaCreateSerializer(serializers.ModelSerializer):
         if custom_date and custom_date > datetime.now().date():
             pass
         return attrs
+    
+    def create(self, validated_data):
+        # Identical bytes are stored once; pass context['sha256'] when the
+        # upload was already hashed to skip re-reading it, or context['blob']
+        # when the caller already stored it (its reference is handed over)
+        upload = validated_data['file']
+        blob = self.context.get('blob')
+        if blob is None:
+            blob = MediaBlobStore.store(upload, upload.name, sha256=self.context.get('sha256'))
+        validated_data['file'] = blob.name
+        validated_data['blob'] = blob
+        
+        # Record size and type from the upload itself; dimensions and duration
+        # are read from the file headers by the background processing job
+        validated_data['file_size'] = blob.size
+        validated_data['content_type'] = guess_content_type(
+            upload.name, getattr(upload, 'content_type', None)
+        )
+        try:
+            return super().create(validated_data)
+        except Exception:
+            MediaBlobStore.release(blob.id)
+            raise
+
+class MediaBulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=1000
+    )
+
+class GeocodeResolveSerializer(serializers.Serializer):
+    locations = serializers.ListField(
+        child=serializers.CharField(max_length=255, trim_whitespace=False), allow_empty=False, max_length=500
+    )
+
+class MediaUploadInitSerializer(TripMediaCreateSerializer):
+    """Starts a resumable upload; the TripMedia fields are applied on finalize"""
+    filename = serializers.CharField(max_length=255)
+    total_size = serializers.IntegerField(min_value=1)
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False)
+    
+    class Meta(TripMediaCreateSerializer.Meta):
+        fields = [
+            field for field in TripMediaCreateSerializer.Meta.fields if field != 'file'
+        ] + ['filename', 'total_size', 'sha256']
+    
+    def validate_filename(self, value):
+        extension = value.rsplit('.', 1)[-1].lower() if '.' in value else ''
+        if extension not in settings.ALLOWED_UPLOAD_EXTENSIONS:
+            raise serializers.ValidationError(f"File type '.{extension}' is not allowed")
+        return value
+    
+    def validate_total_size(self, value):
+        if value > settings.MEDIA_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"File exceeds the maximum upload size of {settings.MEDIA_UPLOAD_MAX_SIZE} bytes"
+            )
+        return value
+    
+    def create_from_blob(self, trip, blob):
+        """Create the TripMedia directly when the client's checksum matches a stored blob"""
+        media_data = {
+            field: value for field, value in self.validated_data.items()
+            if field in TripMediaCreateSerializer.Meta.fields
+        }
+        return TripMedia.objects.create(
+            trip=trip,
+            file=blob.name,
+            blob=blob,
+            file_size=blob.size,
+            content_type=guess_content_type(self.validated_data['filename']),
+            **media_data
+        )
+    
+    def get_media_fields(self):
+        """JSON-safe TripMedia field values to store on the MediaUpload row"""
+        return {
+            field: value for field, value in self.data.items()
+            if field in TripMediaCreateSerializer.Meta.fields
+        }
+
+def timeline_media_item(media, request):
+    """Payload for one media item in the timeline / slideshow"""
+    return {
+        'id': media.id,
+        'media_type': media.media_type,
+        'file_url': _absolute_file_url(request, media.file),
+        'thumbnail_url': _absolute_file_url(request, media.thumbnail),
+        'screen_url': _absolute_file_url(request, media.screen_image),
+        'stream_url': signed_media_url(request, media, 'original'),
+        'thumbnail_stream_url': signed_media_url(request, media, 'thumbnail'),
+        'screen_stream_url': signed_media_url(request, media, 'screen'),
+        'processing_status': media.processing_status,
+        'title': media.title,
+        'description': media.description,
+        'notes': media.notes,
+        'stop_index': media.stop_index,
+        'custom_date': media.custom_date,
+        'custom_time': media.custom_time,
+        'display_datetime': media.display_datetime,
+        'latitude': media.latitude,
+        'longitude': media.longitude
+    }
 
 # Timeline serializer for automated view
 class TripTimelineSerializer(serializers.ModelSerializer):
@@ -292,7 +515,8 @@ class TripTimelineSerializer(serializers.ModelSerializer):
     
     def get_media_items(self, obj):
         """Get all media items grouped by date for timeline"""
-        media_queryset = obj.media.all().order_by('custom_date', 'custom_time', 'taken_at')
+        media_queryset = obj.media.all().order_by('timeline_at', 'id')
+        request = self.context['request']
         
         timeline_data = {}
         for media in media_queryset:
@@ -300,20 +524,7 @@ class TripTimelineSerializer(serializers.ModelSerializer):
             if date_key not in timeline_data:
                 timeline_data[date_key] = []
             
-            timeline_data[date_key].append({
-                'id': media.id,
-                'media_type': media.media_type,
-                'file_url': self.context['request'].build_absolute_uri(media.file.url) if media.file else None,
-                'title': media.title,
-                'description': media.description,
-                'notes': media.notes,
-                'stop_index': media.stop_index,
-                'custom_date': media.custom_date,
-                'custom_time': media.custom_time,
-                'display_datetime': media.display_datetime,
-                'latitude': media.latitude,
-                'longitude': media.longitude
-            })
+            timeline_data[date_key].append(timeline_media_item(media, request))
         
         # Convert to sorted list
         timeline_list = []
@@ -324,4 +535,16 @@ class TripTimelineSerializer(serializers.ModelSerializer):
                 'items': timeline_data[date_key]
             })
         
-        return timeline_list
\ No newline at end of file
+        return timeline_list
+
+class TripTimelineSummarySerializer(TripTimelineSerializer):
+    """Timeline header with per-day media counts; items are paged in separately"""
+    days = serializers.SerializerMethodField()
+    
+    class Meta(TripTimelineSerializer.Meta):
+        fields = [
+            field for field in TripTimelineSerializer.Meta.fields if field != 'media_items'
+        ] + ['days']
+    
+    def get_days(self, obj):
+        return TripTimelineService.day_summaries(obj)
@@ -0,0 +1,36 @@
+# trips/signals.py - Cache invalidation and media cleanup hooks for trip data
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import cache as trips_cache
+from .jobs import queue_media_cleanup
+from .models import Trip, TripMedia, TripPlaces, TripRoute
+
+
+@receiver(post_save, sender=Trip)
+@receiver(post_delete, sender=Trip)
+def invalidate_trip_caches(sender, instance, **kwargs):
+    """Trip writes change the trip's own payloads and the owner's stats"""
+    trips_cache.invalidate_trip(instance.id)
+    trips_cache.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=TripPlaces)
+@receiver(post_delete, sender=TripPlaces)
+@receiver(post_save, sender=TripMedia)
+@receiver(post_delete, sender=TripMedia)
+@receiver(post_save, sender=TripRoute)
+@receiver(post_delete, sender=TripRoute)
+def invalidate_parent_trip_cache(sender, instance, **kwargs):
+    """Places, media and the route are embedded in the parent trip's payloads"""
+    trips_cache.invalidate_trip(instance.trip_id)
+
+
+@receiver(pre_delete, sender=Trip)
+def release_trip_media(sender, instance, **kwargs):
+    """
+    Media rows deleted by the cascade from their trip (trip or account
+    deletion, admin) bypass TripMediaQuerySet.delete(), so their blobs are
+    released here, before the rows go.
+    """
+    queue_media_cleanup(instance.media.all())
@@ -0,0 +1,59 @@
+# trips/stats_service.py - Aggregated, per-user cached trip statistics
+from django.conf import settings
+from django.db.models import Count, Sum
+
+from . import cache as trips_cache
+from .models import Trip
+
+
+class TripStatsService:
+    """Service for computing and caching a user's dashboard statistics"""
+    
+    RECENT_TRIPS_LIMIT = 3
+    
+    @staticmethod
+    def compute_stats(user_id):
+        """Compute totals and the trip type distribution in one grouped query"""
+        rows = (
+            Trip.objects.filter(user_id=user_id)
+            .order_by()
+            .values('trip_type')
+            .annotate(
+                count=Count('id'),
+                distance=Sum('total_distance'),
+                duration=Sum('total_duration'),
+            )
+        )
+        
+        total_trips = 0
+        total_distance = 0.0
+        total_duration = 0
+        trip_types = []
+        for row in rows:
+            total_trips += row['count']
+            total_distance += row['distance'] or 0
+            total_duration += row['duration'] or 0
+            trip_types.append({'trip_type': row['trip_type'], 'count': row['count']})
+        trip_types.sort(key=lambda entry: (-entry['count'], entry['trip_type']))
+        
+        recent_trips = Trip.objects.filter(user_id=user_id).order_by('-created_at', '-id').values(
+            'id', 'title', 'start_location', 'end_location', 'trip_type', 'created_at'
+        )[:TripStatsService.RECENT_TRIPS_LIMIT]
+        
+        return {
+            'total_trips': int(total_trips),
+            'total_distance': round(float(total_distance), 2),
+            'total_duration': int(total_duration),
+            'trip_types': trip_types,
+            'recent_trips': list(recent_trips)
+        }
+    
+    @staticmethod
+    def get_stats(user_id):
+        """Get a user's stats from cache, computing and storing them on a miss"""
+        return trips_cache.get_or_build(
+            'stats',
+            lambda: TripStatsService.compute_stats(user_id),
+            user_id=user_id,
+            timeout=getattr(settings, 'TRIP_STATS_CACHE_TIMEOUT', None),
+        )
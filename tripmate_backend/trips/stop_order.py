@@ -0,0 +1,148 @@
+# trips/stop_order.py - Visiting-order optimization for trip waypoints
+"""
+The start and end of a trip are fixed, so reordering the waypoints is an
+open travelling-salesman path. The search starts from the shorter of the
+user's order and a nearest-neighbour path, then applies 2-opt (reverse a
+stretch of the path) and Or-opt (move a run of up to three stops elsewhere)
+until neither finds a gain or the time budget runs out. With NumPy, all
+candidate moves for a position are scored in one array operation.
+"""
+import time
+
+from .geodesy import distance_matrix_km, np
+
+IMPROVEMENT_EPSILON = 1e-9
+OR_OPT_SEGMENT_LENGTHS = (1, 2, 3)
+
+
+def path_length(path, matrix):
+    return float(sum(matrix[a][b] for a, b in zip(path, path[1:])))
+
+
+def nearest_neighbour(matrix):
+    """Path from the first node to the last, always moving to the closest unvisited node"""
+    last = len(matrix) - 1
+    remaining = set(range(1, last))
+    path = [0]
+    while remaining:
+        distances = matrix[path[-1]]
+        following = min(remaining, key=lambda node: distances[node])
+        remaining.remove(following)
+        path.append(following)
+    path.append(last)
+    return path
+
+
+def _best_two_opt(path, matrix, i):
+    """(length change, j) of the best reversal of path[i:j + 1]"""
+    a, b = path[i - 1], path[i]
+    if np is not None:
+        nodes = np.asarray(path)
+        c, e = nodes[i + 1:-1], nodes[i + 2:]
+        deltas = matrix[a, c] + matrix[b, e] - matrix[a, b] - matrix[c, e]
+        k = int(np.argmin(deltas))
+        return float(deltas[k]), i + 1 + k
+    return min(
+        (matrix[a][path[j]] + matrix[b][path[j + 1]] - matrix[a][b] - matrix[path[j]][path[j + 1]], j)
+        for j in range(i + 1, len(path) - 1)
+    )
+
+
+def _best_or_opt(path, matrix, i, length):
+    """
+    (length change, path after the move) for the best relocation of
+    path[i:i + length], inserted forwards or reversed between two other
+    consecutive stops.
+    """
+    first, last = path[i], path[i + length - 1]
+    before, after = path[i - 1], path[i + length]
+    removal_gain = matrix[before][first] + matrix[last][after] - matrix[before][after]
+    rest = path[:i] + path[i + length:]
+
+    if np is not None:
+        nodes = np.asarray(rest)
+        u, v = nodes[:-1], nodes[1:]
+        forward = matrix[u, first] + matrix[last, v] - matrix[u, v]
+        backward = matrix[u, last] + matrix[first, v] - matrix[u, v]
+        # Slot i - 1 is where the run came from
+        forward[i - 1] = backward[i - 1] = np.inf
+        k_forward, k_backward = int(np.argmin(forward)), int(np.argmin(backward))
+        if forward[k_forward] <= backward[k_backward]:
+            cost, k, reverse = float(forward[k_forward]), k_forward, False
+        else:
+            cost, k, reverse = float(backward[k_backward]), k_backward, True
+    else:
+        candidates = []
+        for k, (u, v) in enumerate(zip(rest, rest[1:])):
+            if k != i - 1:
+                candidates.append((matrix[u][first] + matrix[last][v] - matrix[u][v], k, False))
+                candidates.append((matrix[u][last] + matrix[first][v] - matrix[u][v], k, True))
+        cost, k, reverse = min(candidates)
+
+    segment = path[i:i + length]
+    if reverse:
+        segment.reverse()
+    return cost - removal_gain, rest[:k + 1] + segment + rest[k + 1:]
+
+
+def improve(path, matrix, deadline):
+    """
+    Apply improving 2-opt and Or-opt moves until none is left or the
+    deadline (a time.perf_counter() value) passes. Returns (path, converged).
+    """
+    path = list(path)
+    improved = True
+    while improved:
+        improved = False
+        i = 1
+        while i < len(path) - 2:
+            if time.perf_counter() > deadline:
+                return path, False
+            delta, j = _best_two_opt(path, matrix, i)
+            if delta < -IMPROVEMENT_EPSILON:
+                path[i:j + 1] = path[i:j + 1][::-1]
+                improved = True
+            else:
+                i += 1
+
+        for length in OR_OPT_SEGMENT_LENGTHS:
+            i = 1
+            # The run must leave at least one other slot to move into
+            while i + length < len(path) and len(path) - length > 2:
+                if time.perf_counter() > deadline:
+                    return path, False
+                delta, moved = _best_or_opt(path, matrix, i, length)
+                if delta < -IMPROVEMENT_EPSILON:
+                    path = moved
+                    improved = True
+                else:
+                    i += 1
+    return path, True
+
+
+def optimize_order(points, time_budget=0.2):
+    """
+    Shorter visiting order for points[1:-1] with points[0] and points[-1]
+    fixed. points are (lat, lng); time_budget is in seconds. Returns a dict
+    with the node order (indices into points), both path lengths in km and
+    whether the search converged within the budget.
+    """
+    deadline = time.perf_counter() + time_budget
+    identity = list(range(len(points)))
+    if len(points) < 4:
+        # Fewer than two waypoints: nothing to reorder
+        length = path_length(identity, distance_matrix_km(points)) if len(points) > 1 else 0.0
+        return {'order': identity, 'initial_distance': length, 'distance': length, 'converged': True}
+
+    matrix = distance_matrix_km(points)
+    initial_distance = path_length(identity, matrix)
+    candidate = nearest_neighbour(matrix)
+    if path_length(candidate, matrix) >= initial_distance:
+        candidate = identity
+    order, converged = improve(candidate, matrix, deadline)
+    return {
+        'order': order,
+        'initial_distance': initial_distance,
+        'distance': path_length(order, matrix),
+        'converged': converged,
+    }
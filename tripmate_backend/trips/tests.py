@@ -1,3 +1,926 @@
-from django.test import TestCase
+import base64
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .checklist_service import DEFAULT_CHECKLIST_TEMPLATES, ChecklistService
+from .distance_service import MissingStopCoordinates, TripDistanceService
+from .geodesy import distance_matrix_km, haversine_km, pairwise_distances_km, vincenty_km
+from .geocode_cache import GeocodeCache, LRUCache, memory_cache
+from .jobs import MediaJobQueue
+from .management.commands.benchmark_checklist import LegacyChecklistService
+from .media_serving import RangeNotSatisfiable, parse_range_header
+from .models import GeocodeEntry, MediaBlob, MediaJob, Trip, TripMedia, TripPlaces
+from .route_geometry import decode_polyline
+from .route_store import TripRouteStore
+from .stop_order import improve, optimize_order, path_length
+
+
+class TripPlacesQueryCountTests(TestCase):
+    """Serializing places must not issue one query per place (stop_name lookups)"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('traveller', 'traveller@example.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _create_trip(self, place_count):
+        trip = Trip.objects.create(
+            user=self.user, title='Road trip', start_location='Sydney',
+            end_location='Melbourne', waypoints=['Canberra', 'Albury']
+        )
+        TripPlaces.objects.bulk_create([
+            TripPlaces(
+                trip=trip, stop_index=i % 4, place_id=f'place-{i}', name=f'Place {i}',
+                address='Somewhere', latitude=-33.8, longitude=151.2
+            )
+            for i in range(place_count)
+        ])
+        return trip
+
+    def _count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def _assert_constant_queries(self, url_template):
+        small_trip = self._create_trip(1)
+        large_trip = self._create_trip(30)
+        small_count, _ = self._count_queries(url_template.format(small_trip.id))
+        large_count, response = self._count_queries(url_template.format(large_trip.id))
+        self.assertEqual(small_count, large_count)
+        return response
+
+    def test_trip_places_list(self):
+        response = self._assert_constant_queries('/api/trips/{}/places/')
+        stop_names = {place['stop_index']: place['stop_name'] for place in response.data}
+        self.assertEqual(stop_names, {0: 'Sydney', 1: 'Canberra', 2: 'Albury', 3: 'Melbourne'})
+
+    def test_trip_places_map_data(self):
+        response = self._assert_constant_queries('/api/trips/{}/places/map-data/')
+        self.assertEqual(len(response.data['places']), 30)
+
+    def test_trip_detail(self):
+        response = self._assert_constant_queries('/api/trips/{}/')
+        self.assertEqual(len(response.data['saved_places']), 30)
+        self.assertEqual(response.data['saved_places_by_stop'][3][0]['stop_name'], 'Melbourne')
+
+    def test_stop_name_out_of_range(self):
+        trip = self._create_trip(0)
+        self.assertEqual(Trip.lookup_stop_name(trip.get_stop_names(), 7), 'Stop 8')
+
+
+class TripListPaginationTests(TestCase):
+    """Keyset pagination of /api/trips/ on (created_at, id)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('traveller', 'traveller@example.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_trips(self, count):
+        trips = Trip.objects.bulk_create([
+            Trip(user=self.user, title=f'Trip {i}', start_location='A', end_location='B') for i in range(count)
+        ])
+        return [trip.id for trip in trips]
+
+    def test_pages_through_trips_with_equal_created_at(self):
+        ids = self.create_trips(7)
+        now = timezone.now()
+        # Three batches of trips sharing one created_at each, newest first
+        Trip.objects.filter(id__in=ids[:3]).update(created_at=now - timedelta(days=1))
+        Trip.objects.filter(id__in=ids[3:]).update(created_at=now)
+        expected = sorted(ids[3:], reverse=True) + sorted(ids[:3], reverse=True)
+
+        seen = []
+        url = '/api/trips/?page_size=2'
+        while url:
+            data = self.client.get(url).data
+            self.assertLessEqual(len(data['results']), 2)
+            seen.extend(trip['id'] for trip in data['results'])
+            url = data['next']
+        self.assertEqual(seen, expected)
+
+        # A trip created after the first page was read does not shift the later pages
+        first = self.client.get('/api/trips/?page_size=3').data
+        self.create_trips(1)
+        second = self.client.get(first['next']).data
+        self.assertEqual([trip['id'] for trip in second['results']], expected[3:6])
+
+    def test_unpaginated_list_is_unchanged(self):
+        ids = self.create_trips(3)
+        response = self.client.get('/api/trips/')
+        self.assertEqual([trip['id'] for trip in response.data], sorted(ids, reverse=True))
+
+    def test_invalid_cursor(self):
+        self.create_trips(2)
+        tampered = [
+            'not base64!', 'bm90IGpzb24=',
+            base64.urlsafe_b64encode(b'[1, 2]').decode(),
+            base64.urlsafe_b64encode(b'{"c": "yesterday", "i": 1}').decode(),
+            base64.urlsafe_b64encode(b'{"c": "2026-01-01T00:00:00+00:00"}').decode(),
+            base64.urlsafe_b64encode(b'{"c": "2026-01-01T00:00:00+00:00", "i": Infinity}').decode(),
+            base64.urlsafe_b64encode(b'{"c": "2026-01-01T00:00:00+00:00", "i": 1e30}').decode(),
+            base64.urlsafe_b64encode(b'{"c": "2026-01-01T00:00:00", "i": 1}').decode(),
+            'caf\u00e9',
+        ]
+        for cursor in tampered:
+            response = self.client.get('/api/trips/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, cursor)
+            self.assertEqual(str(response.data['detail']), 'Invalid cursor')
+
+    def test_page_size_is_clamped(self):
+        self.create_trips(5)
+        with override_settings(TRIP_LIST_PAGE_SIZE=2, TRIP_LIST_MAX_PAGE_SIZE=3):
+            for page_size, expected in (('1000', 3), ('0', 1), ('-4', 1), ('many', 2)):
+                data = self.client.get('/api/trips/', {'page_size': page_size}).data
+                self.assertEqual((data['page_size'], len(data['results'])), (expected, expected), page_size)
+            next_url = self.client.get('/api/trips/', {'page_size': '1000'}).data['next']
+            self.assertIn('page_size=3', next_url)
+
+
+class ChecklistCounterMigrationTests(TestCase):
+    """Trips created before the counters existed get them from checklist_data"""
+
+    def test_backfill(self):
+        migration = import_module('trips.migrations.0018_backfill_checklist_counters')
+
+        user = User.objects.create_user('traveller', 'traveller@example.com', 'password')
+        trip = Trip.objects.create(
+            user=user, title='Trip', start_location='A', end_location='B',
+            checklist_data=[{'id': 1, 'completed': True}, {'id': 2}, {'id': 3, 'completed': False}]
+        )
+        Trip.objects.filter(id=trip.id).update(checklist_total=0, checklist_completed=0)
+
+        migration.backfill_checklist_counters(apps, None)
+
+        trip.refresh_from_db()
+        self.assertEqual((trip.checklist_total, trip.checklist_completed), (3, 1))
+        self.assertEqual(trip.checklist_progress, 33)
+
+
+class ChecklistItemIdTests(TestCase):
+    """Ids of deleted checklist items are never handed out again"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('traveller', 'traveller@example.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.trip = Trip.objects.create(
+            user=self.user, title='Trip', start_location='A', end_location='B',
+            checklist_data=[{'id': 1, 'text': 'Passport'}, {'id': 2, 'text': 'Tickets'}]
+        )
+
+    def test_deleted_top_id_is_not_reused(self):
+        self.assertEqual(self.trip.checklist_next_id, 3)
+        url = f'/api/trips/{self.trip.id}/checklist/items/'
+
+        added = self.client.post(url, {'text': 'Charger'}, format='json').data['items'][0]
+        self.assertEqual(added['id'], 3)
+        self.client.delete(f'{url}3/')
+
+        added = self.client.post(url, {'text': 'Adapter'}, format='json').data['items'][0]
+        self.assertEqual(added['id'], 4)
+        # A retried delete of the old item must not remove the new one
+        self.assertEqual(self.client.delete(f'{url}3/').status_code, 404)
+
+    def test_whole_list_write_moves_counter_forward(self):
+        self.client.put(f'/api/trips/{self.trip.id}/checklist/', {
+            'checklist_data': [{'id': 10, 'text': 'Visa', 'category': 'documents', 'completed': False, 'priority': 'high'}]
+        }, format='json')
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.checklist_next_id, 11)
+
+
+class ChecklistGenerationTests(TestCase):
+    """The compiled templates produce what the old per-call literals did"""
+
+    def test_matches_legacy_implementation(self):
+        for trip_type in list(DEFAULT_CHECKLIST_TEMPLATES) + ['unknown']:
+            for duration_days, travelers, international in [(None, 1, False), (8, 2, False), (20, 3, True)]:
+                args = (trip_type, duration_days, travelers, international)
+                self.assertEqual(
+                    ChecklistService.generate_checklist_for_trip(*args),
+                    LegacyChecklistService.generate_checklist_for_trip(*args), args
+                )
+        self.assertEqual(
+            ChecklistService.get_default_checklist_templates(),
+            LegacyChecklistService.get_default_checklist_templates()
+        )
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_checklist', '--number', '1', '--repeat', '1', stdout=out)
+        self.assertIn('checklist_templates payload', out.getvalue())
+
+
+
+class MediaTestCase(TestCase):
+    """Runs against a throwaway MEDIA_ROOT; uploads stay pending until a job runs"""
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root,
+            MEDIA_UPLOAD_TEMP_DIR=os.path.join(media_root, 'uploads'),
+            MEDIA_JOBS_RUN_EAGERLY=False,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user('traveller', 'traveller@example.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.trip = Trip.objects.create(user=self.user, title='Trip', start_location='A', end_location='B')
+
+    def upload(self, content=b'not really a video', name='clip.mp4', trip=None, client=None):
+        trip = trip or self.trip
+        response = (client or self.client).post(f'/api/trips/{trip.id}/media/', {
+            'stop_index': 0, 'media_type': 'video', 'file': SimpleUploadedFile(name, content),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response
+
+
+class MediaJobTests(MediaTestCase):
+    """Background processing through the MediaJob queue"""
+
+    def timeline_item(self, response):
+        return response.data['media_items'][0]['items'][0]
+
+    def test_processing_changes_timeline_validators(self):
+        self.upload()
+        urls = [f'/api/trips/{self.trip.id}/timeline/', f'/api/trips/{self.trip.id}/timeline/days/']
+        before = {url: self.client.get(url) for url in urls}
+        self.assertEqual(self.timeline_item(before[urls[0]])['processing_status'], 'pending')
+
+        call_command('run_media_jobs', '--once')
+
+        for url in urls:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=before[url]['ETag'])
+            self.assertEqual(response.status_code, 200, url)
+        self.assertEqual(self.timeline_item(self.client.get(urls[0]))['processing_status'], 'ready')
+
+    def test_failed_job_is_retried_then_marks_media_failed(self):
+        self.upload()
+        job = MediaJob.objects.get()
+        etag = self.client.get(f'/api/trips/{self.trip.id}/timeline/')['ETag']
+
+        with mock.patch('trips.jobs.MediaService.process', side_effect=RuntimeError('boom')), \
+                self.assertLogs('trips.jobs', 'ERROR'):
+            self.assertFalse(MediaJobQueue.run(MediaJobQueue.claim_next()))
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts, job.last_error), ('pending', 1, 'RuntimeError: boom'))
+            self.assertGreater(job.run_after, timezone.now())
+            # Backed off: not claimable yet
+            self.assertIsNone(MediaJobQueue.claim_next())
+
+            for _ in range(job.max_attempts - 1):
+                MediaJob.objects.update(run_after=timezone.now())
+                MediaJobQueue.run(MediaJobQueue.claim_next())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(TripMedia.objects.get().processing_status, 'failed')
+        response = self.client.get(f'/api/trips/{self.trip.id}/timeline/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_stale_running_jobs_are_requeued(self):
+        self.upload()
+        job = MediaJobQueue.claim_next()
+        MediaJob.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(MediaJobQueue.requeue_stale_jobs(), 1)
+        self.assertEqual(MediaJobQueue.claim_next().id, job.id)
+
+
+class TripCacheInvalidationTests(MediaTestCase):
+    """Cached payloads follow writes, even when another worker bumped the cache version"""
+
+    def urls(self, *names):
+        return [f'/api/trips/{self.trip.id}/{name}' for name in names]
+
+    def add_place(self, name):
+        TripPlaces.objects.create(
+            trip=self.trip, stop_index=0, place_id=name, name=name,
+            address='Somewhere', latitude=-33.8, longitude=151.2
+        )
+
+    def test_place_writes_refresh_detail_and_map_data(self):
+        detail, map_data = self.urls('', 'places/map-data/')
+        self.add_place('first')
+        self.assertEqual(len(self.client.get(detail).data['saved_places']), 1)
+        self.assertEqual(len(self.client.get(map_data).data['places']), 1)
+
+        self.add_place('second')
+        self.assertEqual(len(self.client.get(detail).data['saved_places']), 2)
+        self.assertEqual(len(self.client.get(map_data).data['places']), 2)
+
+    def test_writes_seen_by_other_workers_refresh_cached_payloads(self):
+        # The version bump lands in another process's cache: only the
+        # database-derived validators can tell this worker the entry is stale
+        detail, map_data = self.urls('', 'places/map-data/')
+        timeline, days, items = self.urls('timeline/', 'timeline/days/', 'timeline/items/')
+        self.add_place('first')
+        self.upload()
+        before = {url: self.client.get(url) for url in (detail, map_data, timeline, days, items)}
+
+        with mock.patch('trips.cache.bump_version'):
+            self.add_place('second')
+            self.upload(b'another clip')
+            responses = {url: self.client.get(url) for url in before}
+
+        for url, response in responses.items():
+            self.assertNotEqual(response['ETag'], before[url]['ETag'], url)
+        self.assertEqual(len(responses[detail].data['saved_places']), 2)
+        self.assertEqual(len(responses[map_data].data['places']), 2)
+        self.assertEqual(responses[timeline].data['media_items'][0]['media_count'], 2)
+        self.assertEqual(responses[days].data['days'][0]['media_count'], 2)
+        self.assertEqual(len(responses[items].data['days'][0]['items']), 2)
+
+
+class ChunkedUploadTests(MediaTestCase):
+    """Resumable uploads: init, PUT chunks at an offset, complete"""
+
+    content = b'0123456789' * 100
+
+    def start(self, **fields):
+        response = self.client.post(f'/api/trips/{self.trip.id}/media/uploads/', {
+            'filename': 'clip.mp4', 'total_size': len(self.content), 'stop_index': 0,
+            'media_type': 'video', **fields,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return f"/api/trips/{self.trip.id}/media/uploads/{response.data['upload_id']}/"
+
+    def put(self, url, offset, chunk):
+        return self.client.generic(
+            'PUT', f'{url}?offset={offset}', chunk, content_type='application/octet-stream'
+        )
+
+    def test_chunks_resume_from_offset_and_complete(self):
+        url = self.start()
+        self.assertEqual(self.put(url, 0, self.content[:400]).data['offset'], 400)
+
+        # A chunk that does not start at the received offset is refused with the offset to resume from
+        response = self.put(url, 300, self.content[300:700])
+        self.assertEqual((response.status_code, response.data['offset']), (409, 400))
+        response = self.client.post(f'{url}complete/', {'sha256': hashlib.sha256(self.content).hexdigest()})
+        self.assertEqual((response.status_code, response.data['offset']), (409, 400))
+
+        self.assertEqual(self.put(url, 400, self.content[400:]).data['offset'], len(self.content))
+        self.assertEqual(self.put(url, len(self.content), b'extra').status_code, 400)
+
+        response = self.client.post(f'{url}complete/', {'sha256': hashlib.sha256(self.content).hexdigest()})
+        self.assertEqual(response.status_code, 201, response.content)
+        media = TripMedia.objects.get(id=response.data['id'])
+        with media.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertEqual(self.client.get(url).data['status'], 'complete')
+        self.assertEqual(self.client.post(f'{url}complete/').status_code, 404)
+
+    def test_checksum_mismatch_restarts_upload(self):
+        url = self.start(sha256='0' * 64)
+        self.put(url, 0, self.content)
+
+        response = self.client.post(f'{url}complete/')
+        self.assertEqual((response.status_code, response.data['offset']), (400, 0))
+        self.assertEqual(self.client.get(url).data['offset'], 0)
+        self.assertFalse(TripMedia.objects.exists())
+        self.assertFalse(MediaBlob.objects.exists())
+
+
+class MediaServingTests(MediaTestCase):
+    """Signed stream URLs and Range requests"""
+
+    content = b'0123456789' * 10
+
+    def test_parse_range_header(self):
+        self.assertEqual(parse_range_header('bytes=10-19', 100), (10, 19))
+        self.assertEqual(parse_range_header('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range_header('bytes=95-200', 100), (95, 99))
+        self.assertEqual(parse_range_header('bytes=-30', 100), (70, 99))
+        self.assertEqual(parse_range_header('bytes=-300', 100), (0, 99))
+        for header in (None, '', 'bytes=-', 'bytes=0-1,5-9', 'items=0-1'):
+            self.assertIsNone(parse_range_header(header, 100), header)
+        for header in ('bytes=100-', 'bytes=20-10', 'bytes=-0'):
+            with self.assertRaises(RangeNotSatisfiable, msg=header):
+                parse_range_header(header, 100)
+
+    def test_range_requests(self):
+        url = self.upload(self.content).data['stream_url']
+        anonymous = APIClient()
+
+        response = anonymous.get(url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+
+        response = anonymous.get(url, HTTP_RANGE='bytes=100-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+        # A stale If-Range gets the whole file
+        response = anonymous.get(url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+        self.assertEqual(anonymous.get(url.replace('token=', 'token=x')).status_code, 404)
+
+    def test_missing_file_is_not_found(self):
+        response = self.upload(self.content)
+        default_storage.delete(TripMedia.objects.get(id=response.data['id']).file.name)
+        for headers in ({}, {'HTTP_RANGE': 'bytes=10-19'}):
+            missing = APIClient().get(response.data['stream_url'], **headers)
+            self.assertEqual(missing.status_code, 404, headers)
+            self.assertEqual(missing.json(), {'error': 'Media not found'})
+
+    def test_timeline_urls_are_reissued_before_they_expire(self):
+        self.upload(self.content)
+        url = f'/api/trips/{self.trip.id}/timeline/'
+        max_age = settings.MEDIA_SIGNED_URL_MAX_AGE
+        issued_at = 1_000_000 * max_age
+
+        with mock.patch('time.time', return_value=issued_at):
+            first = self.client.get(url)
+        with mock.patch('time.time', return_value=issued_at + max_age // 2):
+            # The next signing epoch rebuilds the payload instead of answering 304
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(response.status_code, 200)
+        stream_url = lambda response: response.data['media_items'][0]['items'][0]['stream_url']
+        with mock.patch('time.time', return_value=issued_at + max_age + 1):
+            self.assertEqual(APIClient().get(stream_url(response)).status_code, 200)
+            self.assertEqual(APIClient().get(stream_url(first)).status_code, 404)
+
+
+class MediaBlobTests(MediaTestCase):
+    """Identical content is stored once and released by reference count"""
+
+    content = b'the same holiday photo'
+
+    def setUp(self):
+        super().setUp()
+        self.other_user = User.objects.create_user('stranger', 'stranger@example.com', 'password')
+        self.other_client = APIClient()
+        self.other_client.force_authenticate(self.other_user)
+        self.other_trip = Trip.objects.create(user=self.other_user, title='Trip', start_location='A', end_location='B')
+
+    def start_instant_upload(self):
+        return self.client.post(f'/api/trips/{self.trip.id}/media/uploads/', {
+            'filename': 'clip.mp4', 'total_size': len(self.content), 'stop_index': 0, 'media_type': 'video',
+            'sha256': hashlib.sha256(self.content).hexdigest(),
+        }, format='json').data
+
+    def delete(self, media_id, trip):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/trips/{trip.id}/media/{media_id}/')
+            self.assertEqual(response.status_code, 200)
+            call_command('run_media_jobs', '--once')
+
+    def test_release_deletes_file_with_last_reference(self):
+        first = self.upload(self.content).data['id']
+        second_trip = Trip.objects.create(user=self.user, title='Again', start_location='A', end_location='B')
+        second = self.upload(self.content, trip=second_trip).data['id']
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(TripMedia.objects.get(id=second).file.name, blob.name)
+
+        self.delete(first, self.trip)
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+        self.assertTrue(default_storage.exists(blob.name))
+
+        self.delete(second, second_trip)
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(default_storage.exists(blob.name))
+
+    def test_instant_upload_reuses_own_blob(self):
+        self.upload(self.content)
+        upload = self.start_instant_upload()
+        self.assertEqual((upload['status'], upload['offset']), ('complete', len(self.content)))
+        self.assertEqual(MediaBlob.objects.get().ref_count, 2)
+
+    def test_instant_upload_needs_the_bytes_for_another_users_blob(self):
+        self.upload(self.content, trip=self.other_trip, client=self.other_client)
+        upload = self.start_instant_upload()
+        self.assertEqual((upload['status'], upload['offset'], upload['media_id']), ('uploading', 0, None))
+        self.assertEqual(MediaBlob.objects.get().ref_count, 1)
+        self.assertFalse(TripMedia.objects.filter(trip=self.trip).exists())
+
+    def test_dedupe_command_refreshes_cached_payloads(self):
+        default_storage.save('trip_media/legacy.mp4', ContentFile(self.content))
+        TripMedia.objects.create(trip=self.trip, stop_index=0, media_type='video', file='trip_media/legacy.mp4')
+        url = f'/api/trips/{self.trip.id}/timeline/'
+        etag = self.client.get(url)['ETag']
+
+        call_command('dedupe_media_files', stdout=StringIO())
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        item = response.data['media_items'][0]['items'][0]
+        self.assertIn(MediaBlob.objects.get().name, item['file_url'])
+
+    def test_deleting_trips_releases_blobs(self):
+        second_trip = Trip.objects.create(user=self.user, title='Again', start_location='A', end_location='B')
+        self.upload(self.content)
+        self.upload(self.content, trip=second_trip)
+        self.upload(self.content, trip=self.other_trip, client=self.other_client)
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.ref_count, 3)
+
+        def run_jobs():
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('run_media_jobs', '--once', stdout=StringIO())
+
+        # API delete, model delete (admin) and account deletion all cascade to media
+        self.assertEqual(self.client.delete(f'/api/trips/{self.trip.id}/').status_code, 204)
+        run_jobs()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 2)
+
+        second_trip.delete()
+        run_jobs()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+
+        self.other_user.delete()
+        run_jobs()
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(default_storage.exists(blob.name))
+        self.assertFalse(MediaJob.objects.filter(status='failed').exists())
+
+    def test_sweeper_collects_blobs_with_leaked_references(self):
+        leaked = TripMedia.objects.get(id=self.upload(self.content).data['id']).blob
+        recent = TripMedia.objects.get(id=self.upload(b'another photo').data['id']).blob
+        # Rows removed without releasing their references, as deletes used to
+        MediaJob.objects.all().delete()
+        TripMedia.objects.all()._raw_delete(TripMedia.objects.db)
+
+        long_ago = timezone.now() - timedelta(days=2)
+        MediaBlob.objects.filter(id=leaked.id).update(updated_at=long_ago)
+        for blob in (leaked, recent):
+            os.utime(default_storage.path(blob.name), (long_ago.timestamp(), long_ago.timestamp()))
+
+        call_command('sweep_orphan_media', stdout=StringIO())
+
+        self.assertFalse(default_storage.exists(leaked.name))
+        self.assertEqual(list(MediaBlob.objects.all()), [recent])
+        self.assertTrue(default_storage.exists(recent.name))
+
+
+class RouteGeometryTests(TestCase):
+    """Route geometry built from the planner's stored route_data"""
+
+    polyline = '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+
+    def test_decode_polyline(self):
+        self.assertEqual(decode_polyline(self.polyline), [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)])
+        for broken in (self.polyline[:-1], self.polyline[:5], '_p~iF ps|U'):
+            with self.assertRaises(ValueError, msg=broken):
+                decode_polyline(broken)
+
+    def test_truncated_polylines_are_skipped(self):
+        user = User.objects.create_user('traveller', 'traveller@example.com', 'password')
+        client = APIClient()
+        client.force_authenticate(user)
+        trip = Trip.objects.create(user=user, title='Trip', start_location='A', end_location='B')
+        url = f'/api/trips/{trip.id}/route/geometry/'
+
+        TripRouteStore.save(trip.id, json.dumps({'routes': [{
+            'legs': [{'steps': [{'polyline': {'points': self.polyline[:-1]}}]}],
+            'overview_polyline': self.polyline,
+        }]}))
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['source_point_count'], 3)
+
+        TripRouteStore.save(trip.id, json.dumps({'routes': [{'overview_polyline': self.polyline[:-1]}]}))
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['source_point_count'], response.data['levels']), (0, []))
+
+
+class GeocodeCacheTests(TestCase):
+    """Coordinates learned from one user's saves are only used for that user"""
+
+    def setUp(self):
+        memory_cache.clear()
+        self.addCleanup(memory_cache.clear)
+        self.user = User.objects.create_user('traveller', 'traveller@example.com', 'password')
+        self.other_user = User.objects.create_user('stranger', 'stranger@example.com', 'password')
+
+    def save_route(self, user, paris):
+        route = {'routes': [{'legs': [
+            {'start_location': {'lat': 51.5, 'lng': -0.12}, 'end_location': paris},
+            {'start_location': paris, 'end_location': {'lat': 52.52, 'lng': 13.4}},
+        ]}]}
+        trip = Trip.objects.create(
+            user=user, title='Trip', start_location='London', end_location='Berlin', waypoints=['Paris']
+        )
+        TripRouteStore.save(trip.id, json.dumps(route))
+        return trip
+
+    def resolve(self, user, locations):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post('/api/trips/geocode/resolve/', {'locations': locations}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_entries_are_scoped_to_the_user(self):
+        self.save_route(self.user, {'lat': 48.85, 'lng': 2.35})
+        self.assertEqual(self.resolve(self.user, ['paris'])['paris'], {'lat': 48.85, 'lng': 2.35})
+        self.assertIsNone(self.resolve(self.other_user, ['paris'])['paris'])
+
+        # Another user's bogus coordinates do not reach the first user's trips
+        self.save_route(self.other_user, {'lat': 0.0, 'lng': 0.0})
+        trip = Trip.objects.create(user=self.user, title='Again', start_location='Paris', end_location='Berlin')
+        memory_cache.clear()
+        self.assertEqual(GeocodeCache.resolve(self.user.id, 'Paris'), (48.85, 2.35))
+        self.assertEqual(TripDistanceService.stop_positions(trip)[1][0], (48.85, 2.35))
+
+    def test_newer_entry_replaces_older(self):
+        self.save_route(self.user, {'lat': 1.0, 'lng': 1.0})
+        self.save_route(self.user, {'lat': 48.85, 'lng': 2.35})
+        self.assertEqual(GeocodeCache.resolve(self.user.id, 'Paris'), (48.85, 2.35))
+        memory_cache.clear()
+        self.assertEqual(GeocodeCache.resolve(self.user.id, 'Paris'), (48.85, 2.35))
+        self.assertEqual(GeocodeEntry.objects.filter(user=self.user, query='paris').count(), 1)
+
+    def test_reordered_route_pairs_waypoints_by_waypoint_order(self):
+        london, brussels, paris, berlin = (
+            {'lat': 51.5, 'lng': -0.12}, {'lat': 50.85, 'lng': 4.35},
+            {'lat': 48.85, 'lng': 2.35}, {'lat': 52.52, 'lng': 13.4},
+        )
+        # Typed as London, Paris, Brussels, Berlin; Google visits Brussels first
+        route = {'routes': [{'waypoint_order': [1, 0], 'legs': [
+            {'start_location': london, 'end_location': brussels},
+            {'start_location': brussels, 'end_location': paris},
+            {'start_location': paris, 'end_location': berlin},
+        ]}]}
+        trip = Trip.objects.create(
+            user=self.user, title='Trip', start_location='London', end_location='Berlin',
+            waypoints=['Paris', 'Brussels']
+        )
+        TripRouteStore.save(trip.id, json.dumps(route))
+
+        memory_cache.clear()
+        resolved = GeocodeCache.resolve_many(self.user.id, ['Paris', 'Brussels'])
+        self.assertEqual(resolved, {'Paris': (48.85, 2.35), 'Brussels': (50.85, 4.35)})
+
+        # An order that does not fit the waypoints teaches nothing about them
+        route['routes'][0]['waypoint_order'] = [0, 0]
+        trip.waypoints = ['Lyon', 'Ghent']
+        trip.save()
+        TripRouteStore.save(trip.id, json.dumps(route))
+        self.assertEqual(GeocodeCache.resolve_many(self.user.id, ['Lyon', 'Ghent']), {'Lyon': None, 'Ghent': None})
+
+    def test_memory_entries_expire(self):
+        lru = LRUCache(10, ttl=60)
+        with mock.patch('time.monotonic', return_value=1000):
+            lru.set('paris', (48.85, 2.35))
+        with mock.patch('time.monotonic', return_value=1059):
+            self.assertEqual(lru.get('paris'), (48.85, 2.35))
+        with mock.patch('time.monotonic', return_value=1060):
+            self.assertIsNone(lru.get('paris'))
+        self.assertEqual(len(lru), 0)
+
+
+class StopOrderTests(TestCase):
+    """2-opt / Or-opt search for a shorter waypoint order"""
+
+    # Start, three waypoints typed out of order, end; all on the equator
+    points = [(0.0, 0.0), (0.0, 3.0), (0.0, 1.0), (0.0, 2.0), (0.0, 4.0)]
+
+    def assert_uncrosses(self):
+        result = optimize_order(self.points, time_budget=5)
+        self.assertEqual(result['order'], [0, 2, 3, 1, 4])
+        self.assertTrue(result['converged'])
+        self.assertAlmostEqual(result['distance'], 4 * 111.195, places=0)
+        self.assertGreater(result['initial_distance'], result['distance'])
+
+    def test_crossed_path_is_uncrossed(self):
+        self.assert_uncrosses()
+
+    def test_without_numpy(self):
+        with mock.patch('trips.stop_order.np', None), mock.patch('trips.geodesy.np', None):
+            self.assert_uncrosses()
+
+    def test_improve_keeps_ends_fixed(self):
+        # Ends chosen so that moving them would shorten the path
+        points = [(0.0, 2.0), (0.0, 0.0), (0.0, 3.0), (0.0, 1.0), (0.0, 4.0), (0.0, -1.0)]
+        path, converged = improve(list(range(6)), distance_matrix_km(points), time.perf_counter() + 5)
+        self.assertTrue(converged)
+        self.assertEqual((path[0], path[-1]), (0, 5))
+        self.assertEqual(sorted(path), list(range(6)))
+        self.assertLess(path_length(path, distance_matrix_km(points)), path_length(range(6), distance_matrix_km(points)))
+
+    def test_nothing_to_reorder(self):
+        result = optimize_order(self.points[:3])
+        self.assertEqual(result['order'], [0, 1, 2])
+        self.assertEqual(result['distance'], result['initial_distance'])
+
+
+class OptimizeTripStopsTests(TestCase):
+    """/route/optimize/ against the trip's waypoints as typed"""
+
+    stops = {
+        'Start': {'lat': 0.0, 'lng': 0.0}, 'A': {'lat': 0.0, 'lng': 1.0}, 'B': {'lat': 0.0, 'lng': 2.0},
+        'C': {'lat': 0.0, 'lng': 3.0}, 'End': {'lat': 0.0, 'lng': 4.0},
+    }
+
+    def setUp(self):
+        memory_cache.clear()
+        self.addCleanup(memory_cache.clear)
+        self.user = User.objects.create_user('traveller', 'traveller@example.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_trip(self, waypoints, visits=None, waypoint_order=None):
+        trip = Trip.objects.create(
+            user=self.user, title='Trip', start_location='Start', end_location='End', waypoints=waypoints
+        )
+        if visits is not None:
+            names = ['Start'] + visits + ['End']
+            route = {'legs': [
+                {'start_location': self.stops[a], 'end_location': self.stops[b]} for a, b in zip(names, names[1:])
+            ]}
+            if waypoint_order is not None:
+                route['waypoint_order'] = waypoint_order
+            TripRouteStore.save(trip.id, json.dumps({'routes': [route]}))
+        return trip
+
+    def optimize(self, trip, **params):
+        return self.client.get(f'/api/trips/{trip.id}/route/optimize/', params)
+
+    def test_typed_order_is_improved(self):
+        trip = self.create_trip(['C', 'A', 'B'], visits=['C', 'A', 'B'])
+        data = self.optimize(trip).data
+        self.assertEqual((data['source'], data['order'], data['waypoints']), ('route', [1, 2, 0], ['A', 'B', 'C']))
+        self.assertTrue(data['changed'])
+        self.assertGreater(data['savings']['distance'], 0)
+        self.assertEqual(data['optimized']['total_distance'], round(4 * 111.195 * 1.25))
+
+    def test_route_reordered_by_google(self):
+        # Typed C, A, B; the stored route already visits A, B, C
+        trip = self.create_trip(['C', 'A', 'B'], visits=['A', 'B', 'C'], waypoint_order=[1, 2, 0])
+        data = self.optimize(trip).data
+        self.assertEqual(data['waypoints'], ['A', 'B', 'C'])
+        self.assertTrue(data['changed'])
+        self.assertEqual(data['original']['total_distance'], round(8 * 111.195 * 1.25))
+        self.assertGreater(data['savings']['percent'], 0)
+
+    def test_already_optimal(self):
+        trip = self.create_trip(['A', 'B', 'C'], visits=['A', 'B', 'C'])
+        data = self.optimize(trip).data
+        self.assertFalse(data['changed'])
+        self.assertEqual(data['savings']['distance'], 0)
+
+    def test_missing_coordinates_and_bad_budget(self):
+        trip = self.create_trip(['A', 'Nowhere'])
+        response = self.optimize(trip)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['missing_stops'], ['Start', 'A', 'Nowhere', 'End'])
+        self.assertEqual(self.optimize(trip, time_budget_ms='soon').status_code, 400)
+
+
+class TripDistanceTests(TestCase):
+    """Offline distance and duration estimates from stop coordinates"""
+
+    london, paris = (51.5074, -0.1278), (48.8566, 2.3522)
+
+    def setUp(self):
+        memory_cache.clear()
+        self.addCleanup(memory_cache.clear)
+        self.user = User.objects.create_user('traveller', 'traveller@example.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_trip(self, waypoints=(), user=None, places=None):
+        trip = Trip.objects.create(
+            user=user or self.user, title='Trip', start_location='London', end_location='Paris',
+            waypoints=list(waypoints)
+        )
+        for stop_index, (lat, lng) in (places or {}).items():
+            TripPlaces.objects.create(
+                trip=trip, stop_index=stop_index, place_id=f'place-{stop_index}', name='Place',
+                address='Somewhere', latitude=lat, longitude=lng
+            )
+        return trip
+
+    def test_known_distances(self):
+        self.assertAlmostEqual(haversine_km(*self.london, *self.paris), 343.56, places=2)
+        self.assertAlmostEqual(vincenty_km(*self.london, *self.paris), 343.92, places=2)
+        # Flinders Peak to Buninyong, the reference case of Vincenty (1975): 54972.271 m
+        flinders, buninyong = (-37.95103341666667, 144.42486788888888), (-37.65282113888889, 143.92649552777777)
+        self.assertAlmostEqual(vincenty_km(*flinders, *buninyong), 54.972271, places=6)
+        self.assertEqual(vincenty_km(*self.paris, *self.paris), 0.0)
+
+        origins, destinations = [self.london, flinders, self.paris], [self.paris, buninyong, self.paris]
+        for method, compute in (('haversine', haversine_km), ('vincenty', vincenty_km)):
+            expected = [compute(*a, *b) for a, b in zip(origins, destinations)]
+            with mock.patch('trips.geodesy.np', None):
+                self.assertEqual(pairwise_distances_km(origins, destinations, method), expected)
+            for distance, reference in zip(pairwise_distances_km(origins, destinations, method), expected):
+                self.assertAlmostEqual(distance, reference, places=6)
+
+    def test_leg_estimate(self):
+        # Driving legs are stretched by the detour factor and driven at 70 km/h
+        distance, duration = TripDistanceService.leg_estimate(100, 'driving')
+        self.assertAlmostEqual(distance, 125)
+        self.assertAlmostEqual(duration, 125 / 70 * 60)
+        with override_settings(ROUTE_ESTIMATE_DETOUR_FACTOR=1.5):
+            self.assertAlmostEqual(TripDistanceService.leg_estimate(100, 'driving')[0], 150)
+        # Flights take the great circle at 900 km/h
+        self.assertEqual(TripDistanceService.leg_estimate(900, 'flight'), (900, 60))
+
+    def test_estimate_from_saved_places(self):
+        trip = self.create_trip(places={0: self.london, 1: self.paris})
+        distance, duration = TripDistanceService.leg_estimate(haversine_km(*self.london, *self.paris), 'driving')
+        response = self.client.get(f'/api/trips/{trip.id}/route/estimate/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {key: response.data[key] for key in ('mode', 'source', 'complete', 'legs', 'total_distance')},
+            {'mode': 'driving', 'source': 'places', 'complete': True,
+             'legs': [{'distance': round(distance, 1), 'duration': round(duration)}],
+             'total_distance': round(distance)}
+        )
+
+        vincenty = self.client.get(f'/api/trips/{trip.id}/route/estimate/', {'method': 'vincenty'}).data
+        self.assertEqual(vincenty['legs'][0]['distance'], round(vincenty_km(*self.london, *self.paris) * 1.25, 1))
+        self.assertEqual(self.client.get(f'/api/trips/{trip.id}/route/estimate/', {'method': 'rhumb'}).status_code, 400)
+
+    def test_flight_route(self):
+        trip = self.create_trip()
+        TripRouteStore.save(trip.id, json.dumps({'routes': [{
+            'summary': 'Flight Route',
+            'overview_path': [dict(zip(('lat', 'lng'), self.london)), dict(zip(('lat', 'lng'), self.paris))],
+        }]}))
+        estimate = TripDistanceService.estimate(trip)
+        distance = haversine_km(*self.london, *self.paris)
+        self.assertEqual((estimate['mode'], estimate['source']), ('flight', 'route'))
+        self.assertEqual(estimate['legs'], [{'distance': round(distance, 1), 'duration': round(distance / 900 * 60)}])
+
+    def test_reordered_route_is_measured_in_visiting_order(self):
+        stops = [{'lat': 0.0, 'lng': float(lng)} for lng in range(5)]
+        trip = Trip.objects.create(
+            user=self.user, title='Trip', start_location='Start', end_location='End', waypoints=['C', 'A', 'B']
+        )
+        # Typed C, A, B; Google visits A, B, C
+        TripRouteStore.save(trip.id, json.dumps({'routes': [{
+            'legs': [{'start_location': a, 'end_location': b} for a, b in zip(stops, stops[1:])],
+            'waypoint_order': [1, 2, 0],
+        }]}))
+        estimate = TripDistanceService.estimate(trip)
+        self.assertEqual(estimate['source'], 'route')
+        self.assertEqual([leg['distance'] for leg in estimate['legs']], [round(111.195 * 1.25, 1)] * 4)
+        self.assertEqual(TripDistanceService.estimate_many([trip])[trip.id], estimate)
+
+    def test_missing_coordinates(self):
+        trip = self.create_trip(['Nowhere'], places={0: self.london, 2: self.paris})
+        estimate = TripDistanceService.estimate(trip)
+        self.assertFalse(estimate['complete'])
+        self.assertEqual(len(estimate['legs']), 1)
+
+        with self.assertRaises(MissingStopCoordinates) as raised:
+            TripDistanceService.optimize_stop_order(trip, time_budget=0.1)
+        self.assertEqual(raised.exception.args[0], ['Nowhere'])
+
+        unknown = TripDistanceService.estimate(self.create_trip())
+        self.assertEqual((unknown['source'], unknown['legs'], unknown['total_distance']), ('none', [], 0))
+
+    def test_estimate_many_matches_estimate(self):
+        other_user = User.objects.create_user('stranger', 'stranger@example.com', 'password')
+        trips = [
+            self.create_trip(places={0: self.london, 1: self.paris}),
+            self.create_trip(['Nowhere'], places={0: self.paris, 2: self.london}),
+            self.create_trip(user=other_user, places={0: (52.52, 13.405), 1: self.paris}),
+            self.create_trip(),
+        ]
+        estimates = TripDistanceService.estimate_many(Trip.objects.filter(id__in=[trip.id for trip in trips]))
+        for trip in trips:
+            self.assertEqual(estimates[trip.id], TripDistanceService.estimate(trip), trip.id)
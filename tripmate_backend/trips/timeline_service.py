@@ -0,0 +1,96 @@
+# trips/timeline_service.py - Day index and date-windowed media queries for the timeline
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.db.models import Count, Min, Q
+from django.db.models.functions import TruncDate
+
+from .models import TripMedia
+
+
+class TripTimelineService:
+    """
+    Service behind the windowed timeline endpoints: the slideshow first
+    fetches the per-day summaries, then pages through the items day by day.
+    """
+
+    MEDIA_ORDERING = ('timeline_at', 'id')
+
+    @staticmethod
+    def day_expression():
+        """
+        The media's timeline day, computed in the database (mirrors
+        TripMedia.timeline_date). Truncated in UTC, the zone custom dates are
+        stored in, whatever TIME_ZONE is set to.
+        """
+        return TruncDate('timeline_at', tzinfo=dt_timezone.utc)
+
+    @staticmethod
+    def day_bounds(start, end):
+        """[start 00:00, day after end 00:00) in UTC for ISO date strings"""
+        lower = datetime.combine(date.fromisoformat(start), time.min, tzinfo=dt_timezone.utc)
+        upper = datetime.combine(date.fromisoformat(end) + timedelta(days=1), time.min, tzinfo=dt_timezone.utc)
+        return lower, upper
+
+    @staticmethod
+    def day_summaries(trip):
+        """One row per day with media counts, grouped by the database"""
+        rows = (
+            TripMedia.objects.filter(trip=trip)
+            .annotate(day=TripTimelineService.day_expression())
+            .order_by()
+            .values('day')
+            .annotate(
+                media_count=Count('id'),
+                photo_count=Count('id', filter=Q(media_type='photo')),
+                video_count=Count('id', filter=Q(media_type='video')),
+                audio_count=Count('id', filter=Q(media_type='audio')),
+                first_media_id=Min('id'),
+            )
+            .order_by('day')
+        )
+        return [
+            {
+                'date': row['day'].isoformat(),
+                'media_count': row['media_count'],
+                'photo_count': row['photo_count'],
+                'video_count': row['video_count'],
+                'audio_count': row['audio_count'],
+                'first_media_id': row['first_media_id'],
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def window_after(summaries, cursor, days):
+        """
+        Pick `days` consecutive timeline days starting at the cursor date
+        (ISO string, or None for the first day). Returns (dates, next_cursor).
+        """
+        remaining = [summary['date'] for summary in summaries if cursor is None or summary['date'] >= cursor]
+        window = remaining[:days]
+        next_cursor = remaining[days] if len(remaining) > days else None
+        return window, next_cursor
+
+    @staticmethod
+    def media_between(trip, start, end):
+        """
+        Media whose timeline day falls in [start, end], in slideshow order.
+        Filters on the raw column so the (trip, timeline_at) index is range-scanned.
+        """
+        lower, upper = TripTimelineService.day_bounds(start, end)
+        return (
+            TripMedia.objects.filter(trip=trip, timeline_at__gte=lower, timeline_at__lt=upper)
+            .order_by(*TripTimelineService.MEDIA_ORDERING)
+        )
+
+    @staticmethod
+    def group_by_day(media_items, serialize):
+        """Group already ordered media into [{'date', 'media_count', 'items'}]"""
+        days = []
+        for media in media_items:
+            date_key = media.timeline_date.isoformat()
+            if not days or days[-1]['date'] != date_key:
+                days.append({'date': date_key, 'media_count': 0, 'items': []})
+            days[-1]['items'].append(serialize(media))
+            days[-1]['media_count'] += 1
+        return days
@@ -0,0 +1,79 @@
+# trips/upload_service.py - Resumable chunked uploads streamed straight to disk
+import hashlib
+import os
+
+from django.conf import settings
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class UploadOffsetMismatch(Exception):
+    """Raised when a chunk does not start where the previous one ended"""
+    pass
+
+
+class UploadTooLarge(Exception):
+    """Raised when a chunk would exceed the size declared at init"""
+    pass
+
+
+class ChunkedUploadService:
+    """
+    Service backing the init / PUT chunk / finalize upload protocol.
+
+    Chunks must arrive in order: each PUT names the offset it starts at, and
+    that offset must equal the bytes received so far. A client that lost its
+    connection asks for the current offset and resumes from there.
+    """
+
+    @staticmethod
+    def temp_path(upload):
+        return os.path.join(settings.MEDIA_UPLOAD_TEMP_DIR, f'{upload.id}.part')
+
+    @staticmethod
+    def create_temp_file(upload):
+        os.makedirs(settings.MEDIA_UPLOAD_TEMP_DIR, exist_ok=True)
+        open(ChunkedUploadService.temp_path(upload), 'wb').close()
+
+    @staticmethod
+    def write_chunk(upload, offset, stream, length):
+        """
+        Append `length` bytes from `stream` at `offset`, reading in small
+        blocks so the chunk is never held in memory. Returns the new offset.
+        The caller must hold a row lock on the upload.
+        """
+        if offset != upload.received_size:
+            raise UploadOffsetMismatch(upload.received_size)
+        if offset + length > upload.total_size:
+            raise UploadTooLarge(upload.total_size)
+
+        path = ChunkedUploadService.temp_path(upload)
+        written = 0
+        with open(path, 'r+b') as destination:
+            # Drop any bytes a previously interrupted request left past the offset
+            destination.truncate(offset)
+            destination.seek(offset)
+            while written < length:
+                block = stream.read(min(STREAM_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                destination.write(block)
+                written += len(block)
+
+        return offset + written
+
+    @staticmethod
+    def checksum(upload):
+        """SHA-256 of the assembled file, streamed from disk"""
+        digest = hashlib.sha256()
+        with open(ChunkedUploadService.temp_path(upload), 'rb') as source:
+            for block in iter(lambda: source.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def discard(upload):
+        try:
+            os.remove(ChunkedUploadService.temp_path(upload))
+        except FileNotFoundError:
+            pass
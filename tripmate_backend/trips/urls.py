@@ -7,17 +7,33 @@ urlpatterns = [
     path('', views.TripListCreateView.as_view(), name='trip-list-create'),
     path('<int:pk>/', views.TripDetailView.as_view(), name='trip-detail'),
     path('stats/', views.trip_stats, name='trip-stats'),
+    path('geocode/resolve/', views.resolve_locations, name='resolve-locations'),
+    path('<int:trip_id>/route/', views.trip_route, name='trip-route'),
+    path('<int:trip_id>/route/geometry/', views.trip_route_geometry, name='trip-route-geometry'),
+    path('<int:trip_id>/route/estimate/', views.trip_route_estimate, name='trip-route-estimate'),
+    path('<int:trip_id>/route/optimize/', views.optimize_trip_stops, name='optimize-trip-stops'),
     
     # Checklist endpoints
     path('checklist/templates/', views.checklist_templates, name='checklist-templates'),
     path('checklist/generate/', views.generate_checklist, name='generate-checklist'),
     path('<int:trip_id>/checklist/', views.update_trip_checklist, name='update-trip-checklist'),
     path('<int:trip_id>/checklist/regenerate/', views.regenerate_trip_checklist, name='regenerate-trip-checklist'),
+    path('<int:trip_id>/checklist/items/', views.add_checklist_item, name='add-checklist-item'),
+    path('<int:trip_id>/checklist/items/batch/', views.batch_checklist_items, name='batch-checklist-items'),
+    path('<int:trip_id>/checklist/items/<int:item_id>/', views.checklist_item_detail, name='checklist-item-detail'),
+    path('<int:trip_id>/checklist/items/<int:item_id>/toggle/', views.toggle_checklist_item, name='toggle-checklist-item'),
     
     # Timeline and media
     path('<int:trip_id>/timeline/', views.trip_timeline, name='trip-timeline'),
+    path('<int:trip_id>/timeline/days/', views.trip_timeline_days, name='trip-timeline-days'),
+    path('<int:trip_id>/timeline/items/', views.trip_timeline_items, name='trip-timeline-items'),
     path('<int:trip_id>/media/', views.trip_media, name='trip-media'),
     path('<int:trip_id>/media/<int:media_id>/', views.delete_trip_media, name='delete-trip-media'),
+    path('<int:trip_id>/media/bulk-delete/', views.bulk_delete_trip_media, name='bulk-delete-trip-media'),
+    path('<int:trip_id>/media/<int:media_id>/file/', views.serve_trip_media, name='serve-trip-media'),
+    path('<int:trip_id>/media/uploads/', views.create_media_upload, name='create-media-upload'),
+    path('<int:trip_id>/media/uploads/<uuid:upload_id>/', views.media_upload_detail, name='media-upload-detail'),
+    path('<int:trip_id>/media/uploads/<uuid:upload_id>/complete/', views.complete_media_upload, name='complete-media-upload'),
 
     # Trip places endpoints
     path('<int:trip_id>/places/', views.trip_places, name='trip-places'),
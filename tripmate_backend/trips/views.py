@@ -1,20 +1,45 @@
 # trips/views.py - Updated with checklist endpoints and TripPlaces
+from datetime import datetime
+from functools import lru_cache
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Q, Sum, Count
-from django.core.files.storage import default_storage
-from .models import Trip, TripMedia, TripPlaces
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum, Count, prefetch_related_objects
+from django.utils.http import quote_etag
+from .models import Trip, TripMedia, TripPlaces, MediaUpload
 from .serializers import (
     TripSerializer, TripCreateSerializer, TripListSerializer,
     TripMediaSerializer, TripMediaCreateSerializer, TripTimelineSerializer,
     ChecklistUpdateSerializer, TripPlacesSerializer, TripPlacesCreateSerializer, 
-    TripPlacesUpdateSerializer, TripDetailSerializer
+    TripPlacesUpdateSerializer, TripDetailSerializer, ChecklistItemSerializer,
+    ChecklistBatchSerializer, MediaUploadInitSerializer, TripTimelineSummarySerializer,
+    MediaBulkDeleteSerializer, GeocodeResolveSerializer,
+    timeline_media_item
+)
+from .checklist_service import ChecklistService, ChecklistItemNotFound
+from .blob_store import MediaBlobStore
+from .media_serving import RENDITION_FIELDS, check_media_signature, media_file_response
+from .jobs import MediaJobQueue, delete_media
+from .upload_service import ChunkedUploadService, UploadOffsetMismatch, UploadTooLarge
+from .pagination import TripCursorPagination
+from .stats_service import TripStatsService
+from .route_store import TripRouteStore
+from .route_geometry import build_geometry, level_for_zoom
+from .distance_service import METHODS as DISTANCE_METHODS, MissingStopCoordinates, TripDistanceService
+from .geocode_cache import GeocodeCache
+from .timeline_service import TripTimelineService
+from . import cache as trips_cache
+from .conditional import (
+    content_etag, not_modified_response, set_validators, validator_etag,
+    trip_media_validators, trip_places_validators
 )
-from .checklist_service import ChecklistService
 
 class TripListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TripCursorPagination
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -22,7 +47,7 @@ class TripListCreateView(generics.ListCreateAPIView):
         return TripListSerializer
     
     def get_queryset(self):
-        queryset = Trip.objects.filter(user=self.request.user).defer('route_data')
+        queryset = Trip.objects.filter(user=self.request.user).defer('checklist_data')
         
         # Search functionality
         search = self.request.query_params.get('search', None)
@@ -38,7 +63,7 @@ class TripListCreateView(generics.ListCreateAPIView):
         if trip_type:
             queryset = queryset.filter(trip_type=trip_type)
         
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', '-id')
 
 # Updated to use TripDetailSerializer for enhanced functionality
 class TripDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -46,68 +71,184 @@ class TripDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = TripDetailSerializer  # Changed from TripSerializer
     
     def get_queryset(self):
-        return Trip.objects.filter(user=self.request.user).prefetch_related('saved_places')
+        return Trip.objects.filter(user=self.request.user)
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # ?places_by_stop=ids groups place ids instead of repeating place objects
+        context['places_by_stop_ids'] = self.request.query_params.get('places_by_stop') == 'ids'
+        # route_data is only loaded for ?include=route
+        context['include_route'] = 'route' in self.request.query_params.get('include', '').split(',')
+        return context
+    
+    def retrieve(self, request, *args, **kwargs):
+        trip = self.get_object()
+        
+        # Answer conditional GETs before touching places or serializers
+        etag, last_modified = trip_places_validators(trip, request)
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        
+        def build():
+            prefetch_related_objects([trip], 'saved_places')
+            return self.get_serializer(trip).data
+        
+        # The validator is part of the key: cache versions are not shared
+        # between processes on every backend, but the database state is
+        context = self.get_serializer_context()
+        data = trips_cache.get_or_build(
+            'detail', build, trip_id=trip.id,
+            parts=(
+                'ids' if context['places_by_stop_ids'] else 'full',
+                'route' if context['include_route'] else 'no-route',
+                etag,
+            )
+        )
+        return set_validators(Response(data), etag, last_modified)
+
+@api_view(['GET', 'PUT'])
+@permission_classes([permissions.IsAuthenticated])
+def trip_route(request, trip_id):
+    """Get or replace a trip's stored route_data"""
+    if not Trip.objects.filter(id=trip_id, user=request.user).exists():
+        return Response({'error': 'Trip not found'}, status=404)
+    
+    if request.method == 'PUT':
+        if 'route_data' not in request.data:
+            return Response({'error': 'route_data is required'}, status=400)
+        changed = TripRouteStore.save(trip_id, request.data['route_data'])
+        return Response({'changed': changed})
+    
+    digest = TripRouteStore.digest(trip_id)
+    etag = quote_etag(digest) if digest else None
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+    return set_validators(Response({'route_data': TripRouteStore.load(trip_id)}), etag)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
-def trip_stats(request):
-    """Get user's trip statistics"""
+def trip_route_geometry(request, trip_id):
+    """
+    Simplified route geometry as encoded polylines, one per zoom level.
+    With ?zoom=N only the level suited to that map zoom is returned.
+    """
+    if not Trip.objects.filter(id=trip_id, user=request.user).exists():
+        return Response({'error': 'Trip not found'}, status=404)
+    
+    zoom = request.query_params.get('zoom')
     try:
-        from django.db import connection
-        
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_trips,
-                    COALESCE(SUM(total_distance), 0) as total_distance,
-                    COALESCE(SUM(total_duration), 0) as total_duration
-                FROM trips_trip 
-                WHERE user_id = %s
-            """, [request.user.id])
-            
-            row = cursor.fetchone()
-            total_trips, total_distance, total_duration = row
-        
-        # Get trip type distribution
-        trip_types = Trip.objects.filter(user=request.user).values('trip_type').annotate(
-            count=Count('id')
-        ).order_by('-count')
-        
-        # Get recent trips with minimal data
-        recent_trips = Trip.objects.filter(user=request.user).only(
-            'id', 'title', 'start_location', 'end_location', 'created_at', 'trip_type'
-        ).order_by('-created_at')[:3]
-        
-        recent_trips_data = []
-        for trip in recent_trips:
-            recent_trips_data.append({
-                'id': trip.id,
-                'title': trip.title,
-                'start_location': trip.start_location,
-                'end_location': trip.end_location,
-                'trip_type': trip.trip_type,
-                'created_at': trip.created_at
-            })
-        
-        stats = {
-            'total_trips': int(total_trips),
-            'total_distance': round(float(total_distance), 2),
-            'total_duration': int(total_duration),
-            'trip_types': list(trip_types),
-            'recent_trips': recent_trips_data
+        zoom = int(zoom) if zoom is not None else None
+    except ValueError:
+        return Response({'error': 'zoom must be an integer'}, status=400)
+    
+    digest = TripRouteStore.digest(trip_id)
+    if digest is None:
+        return Response({'error': 'Trip has no route'}, status=404)
+    
+    etag = validator_etag('route-geometry', digest, zoom)
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+    
+    geometry = trips_cache.get_or_build(
+        'route-geometry',
+        lambda: build_geometry(
+            TripRouteStore.load(trip_id),
+            settings.ROUTE_GEOMETRY_ZOOM_LEVELS,
+            settings.ROUTE_GEOMETRY_PIXEL_TOLERANCE,
+        ),
+        trip_id=trip_id,
+        parts=(digest,),
+    )
+    if zoom is not None:
+        geometry = {
+            'source_point_count': geometry['source_point_count'],
+            'bounds': geometry['bounds'],
+            'level': level_for_zoom(geometry, zoom),
         }
-        
-        return Response(stats)
-        
-    except Exception as e:
-        print(f"Error in trip_stats: {e}")
+    return set_validators(Response(geometry), etag)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def trip_route_estimate(request, trip_id):
+    """
+    Distance and duration estimated on the server from stop coordinates,
+    next to the stored totals. ?method=vincenty uses the WGS-84 ellipsoid.
+    """
+    try:
+        trip = Trip.objects.only('id', 'user_id', 'start_location', 'end_location', 'waypoints',
+                                 'total_distance', 'total_duration').get(id=trip_id, user=request.user)
+    except Trip.DoesNotExist:
+        return Response({'error': 'Trip not found'}, status=404)
+    
+    method = request.query_params.get('method', 'haversine')
+    if method not in DISTANCE_METHODS:
+        return Response({'error': f"method must be one of: {', '.join(DISTANCE_METHODS)}"}, status=400)
+    
+    estimate = TripDistanceService.estimate(trip, method)
+    estimate['method'] = method
+    estimate['stored'] = {
+        'total_distance': trip.total_distance,
+        'total_duration': trip.total_duration,
+    }
+    return Response(estimate)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def optimize_trip_stops(request, trip_id):
+    """
+    Suggest the waypoint order with the shortest travel distance between the
+    fixed start and end. Nothing is saved; the client updates the trip's
+    waypoints if the user accepts. ?time_budget_ms= caps the search time.
+    """
+    try:
+        trip = Trip.objects.only('id', 'user_id', 'start_location', 'end_location', 'waypoints').get(
+            id=trip_id, user=request.user
+        )
+    except Trip.DoesNotExist:
+        return Response({'error': 'Trip not found'}, status=404)
+    
+    time_budget = request.query_params.get('time_budget_ms', settings.STOP_ORDER_TIME_BUDGET_MS)
+    try:
+        time_budget = min(max(int(time_budget), 1), settings.STOP_ORDER_MAX_TIME_BUDGET_MS)
+    except ValueError:
+        return Response({'error': 'time_budget_ms must be an integer'}, status=400)
+    
+    try:
+        return Response(TripDistanceService.optimize_stop_order(trip, time_budget / 1000))
+    except MissingStopCoordinates as e:
         return Response({
-            'total_trips': 0,
-            'total_distance': 0.0,
-            'total_duration': 0,
-            'trip_types': [],
-            'recent_trips': []
-        })
+            'error': 'Coordinates unknown for some stops; save a route or places for every stop',
+            'missing_stops': e.args[0],
+        }, status=400)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def resolve_locations(request):
+    """
+    Coordinates for many location strings at once, from the entries the
+    user's own routes and places taught the server-side geocode cache.
+    Unknown locations map to null; the client geocodes those.
+    """
+    serializer = GeocodeResolveSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+    
+    resolved = GeocodeCache.resolve_many(request.user.id, serializer.validated_data['locations'])
+    return Response({
+        'results': {
+            location: {'lat': point[0], 'lng': point[1]} if point else None
+            for location, point in resolved.items()
+        }
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def trip_stats(request):
+    """Get user's trip statistics (served from the per-user stats cache)"""
+    return Response(TripStatsService.get_stats(request.user.id))
 
 # NEW: Trip Places endpoints
 @api_view(['GET', 'POST'])
@@ -120,6 +261,11 @@ def trip_places(request, trip_id):
         return Response({'error': 'Trip not found'}, status=404)
     
     if request.method == 'GET':
+        etag, last_modified = trip_places_validators(trip, request)
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        
         # Get places for specific stop or all places
         stop_index = request.query_params.get('stop_index')
         places_queryset = trip.saved_places.all()
@@ -127,8 +273,10 @@ def trip_places(request, trip_id):
         if stop_index is not None:
             places_queryset = places_queryset.filter(stop_index=int(stop_index))
         
-        serializer = TripPlacesSerializer(places_queryset, many=True)
-        return Response(serializer.data)
+        serializer = TripPlacesSerializer(
+            places_queryset, many=True, context={'stop_names': trip.get_stop_names()}
+        )
+        return set_validators(Response(serializer.data), etag, last_modified)
     
     elif request.method == 'POST':
         serializer = TripPlacesCreateSerializer(
@@ -138,6 +286,7 @@ def trip_places(request, trip_id):
         if serializer.is_valid():
             try:
                 place = serializer.save()
+                GeocodeCache.record_places(trip.user_id, [place])
                 response_serializer = TripPlacesSerializer(place)
                 return Response(response_serializer.data, status=201)
             except Exception as e:
@@ -189,35 +338,71 @@ def bulk_save_places(request, trip_id):
     if not places_data:
         return Response({'error': 'No places provided'}, status=400)
     
-    created_places = []
     errors = []
     
+    # Validate every row up front; validation itself never hits the database
+    valid_rows = []
     for place_data in places_data:
         serializer = TripPlacesCreateSerializer(
             data=place_data,
             context={'trip': trip}
         )
         if serializer.is_valid():
-            try:
-                place = serializer.save()
-                created_places.append(TripPlacesSerializer(place).data)
-            except Exception as e:
-                if 'unique_trip_place' in str(e):
-                    errors.append({
-                        'place_name': place_data.get('name', 'Unknown'),
-                        'error': 'Already saved to trip'
-                    })
-                else:
-                    errors.append({
-                        'place_name': place_data.get('name', 'Unknown'),
-                        'error': str(e)
-                    })
+            valid_rows.append((place_data, serializer.validated_data))
         else:
             errors.append({
                 'place_name': place_data.get('name', 'Unknown'),
                 'error': serializer.errors
             })
     
+    # Classify duplicates (already on the trip, or repeated in this request)
+    # with a single lookup instead of catching one IntegrityError per row
+    seen_place_ids = set(
+        trip.saved_places.filter(
+            place_id__in=[data['place_id'] for _, data in valid_rows]
+        ).values_list('place_id', flat=True)
+    )
+    new_places = []
+    for place_data, data in valid_rows:
+        if data['place_id'] in seen_place_ids:
+            errors.append({
+                'place_name': place_data.get('name', 'Unknown'),
+                'error': 'Already saved to trip'
+            })
+            continue
+        seen_place_ids.add(data['place_id'])
+        new_places.append(TripPlaces(trip=trip, **data))
+    
+    created_places = []
+    if new_places:
+        try:
+            with transaction.atomic():
+                TripPlaces.objects.bulk_create(new_places, batch_size=500)
+        except IntegrityError:
+            # A concurrent request saved one of these places first
+            return Response({
+                'error': 'Trip places changed while saving, please retry',
+                'code': 'CONCURRENT_UPDATE'
+            }, status=409)
+        
+        # bulk_create skips post_save signals
+        trips_cache.invalidate_trip(trip.id)
+        GeocodeCache.record_places(trip.user_id, new_places)
+        
+        # Not every backend returns primary keys from bulk_create, so re-read
+        # the new rows in one query and report them in request order
+        created_by_place_id = {
+            place.place_id: place
+            for place in trip.saved_places.filter(
+                place_id__in=[place.place_id for place in new_places]
+            )
+        }
+        created_places = TripPlacesSerializer(
+            [created_by_place_id[place.place_id] for place in new_places],
+            many=True,
+            context={'stop_names': trip.get_stop_names()}
+        ).data
+    
     return Response({
         'created_places': created_places,
         'errors': errors,
@@ -236,9 +421,21 @@ def trip_places_map_data(request, trip_id):
     except Trip.DoesNotExist:
         return Response({'error': 'Trip not found'}, status=404)
     
+    etag, last_modified = trip_places_validators(trip, request)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+    
+    data = trips_cache.get_or_build(
+        'map-data', lambda: _build_map_data(trip), trip_id=trip.id, parts=(etag,)
+    )
+    return set_validators(Response(data), etag, last_modified)
+
+def _build_map_data(trip):
+    """Format a trip's places for map markers"""
     places = trip.saved_places.all()
+    stop_names = trip.get_stop_names()
     
-    # Format data for map markers
     map_places = []
     for place in places:
         map_places.append({
@@ -253,20 +450,20 @@ def trip_places_map_data(request, trip_id):
             'rating': place.rating,
             'types': place.types,
             'stop_index': place.stop_index,
-            'stop_name': place.stop_name,
+            'stop_name': Trip.lookup_stop_name(stop_names, place.stop_index),
             'is_visited': place.is_visited,
             'user_rating': place.user_rating,
             'user_notes': place.user_notes
         })
     
-    return Response({
+    return {
         'trip': {
             'id': trip.id,
             'title': trip.title
         },
         'places': map_places,
         'places_by_stop': _group_places_by_stop(map_places)
-    })
+    }
 
 def _group_places_by_stop(places):
     """Helper function to group places by stop"""
@@ -279,11 +476,10 @@ def _group_places_by_stop(places):
     return grouped
 
 # Checklist endpoints
-@api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated])
-def checklist_templates(request):
-    """Get available checklist templates"""
-    templates = ChecklistService.get_default_checklist_templates()
+@lru_cache(maxsize=None)
+def _checklist_templates_payload():
+    """Build the static templates payload and its ETag once per process"""
+    templates = ChecklistService.get_shared_checklist_templates()
     categories = ChecklistService.get_checklist_categories()
     
     # Get trip type choices
@@ -292,11 +488,24 @@ def checklist_templates(request):
         for choice in Trip.TRIP_TYPES
     ]
     
-    return Response({
+    payload = {
         'trip_types': trip_types,
         'templates': templates,
         'categories': categories
-    })
+    }
+    return payload, content_etag(payload)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def checklist_templates(request):
+    """Get available checklist templates"""
+    payload, etag = _checklist_templates_payload()
+    
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+    
+    return set_validators(Response(payload), etag)
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -331,7 +540,7 @@ def update_trip_checklist(request, trip_id):
     serializer = ChecklistUpdateSerializer(data=request.data)
     if serializer.is_valid():
         trip.checklist_data = serializer.validated_data['checklist_data']
-        trip.save()
+        trip.save(update_fields=['checklist_data', 'updated_at'])
         
         # Return updated trip data
         trip_serializer = TripSerializer(trip, context={'request': request})
@@ -339,6 +548,84 @@ def update_trip_checklist(request, trip_id):
     
     return Response(serializer.errors, status=400)
 
+def _apply_checklist_operations(request, trip_id, operations):
+    """Apply checklist item operations atomically and respond with a small delta"""
+    with transaction.atomic():
+        try:
+            trip = Trip.objects.select_for_update().only(
+                'id', 'user_id', 'checklist_data', 'checklist_total',
+                'checklist_completed', 'checklist_next_id', 'updated_at'
+            ).get(id=trip_id, user=request.user)
+        except Trip.DoesNotExist:
+            return Response({'error': 'Trip not found'}, status=404)
+        
+        checklist = list(trip.checklist_data or [])
+        try:
+            changed_items, deleted_ids, next_id = ChecklistService.apply_item_operations(
+                checklist, operations, trip.checklist_next_id
+            )
+        except ChecklistItemNotFound as e:
+            return Response({'error': f'Checklist item {e.args[0]} not found'}, status=404)
+        
+        trip.checklist_data = checklist
+        trip.checklist_next_id = next_id
+        trip.save(update_fields=['checklist_data', 'updated_at'])
+    
+    return Response({
+        'items': changed_items,
+        'deleted_ids': deleted_ids,
+        'checklist_total': trip.checklist_total,
+        'checklist_completed': trip.checklist_completed,
+        'checklist_progress': trip.checklist_progress,
+        'updated_at': trip.updated_at
+    })
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def add_checklist_item(request, trip_id):
+    """Add a single checklist item"""
+    serializer = ChecklistItemSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+    if not serializer.validated_data.get('text'):
+        return Response({'text': ['This field is required.']}, status=400)
+    
+    response = _apply_checklist_operations(
+        request, trip_id, [dict(serializer.validated_data, op='add')]
+    )
+    if response.status_code == 200:
+        response.status_code = 201
+    return response
+
+@api_view(['PATCH', 'DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def checklist_item_detail(request, trip_id, item_id):
+    """Edit or delete a single checklist item"""
+    if request.method == 'DELETE':
+        return _apply_checklist_operations(request, trip_id, [{'op': 'delete', 'id': item_id}])
+    
+    serializer = ChecklistItemSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+    return _apply_checklist_operations(
+        request, trip_id, [dict(serializer.validated_data, op='update', id=item_id)]
+    )
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def toggle_checklist_item(request, trip_id, item_id):
+    """Flip the completed flag of a single checklist item"""
+    return _apply_checklist_operations(request, trip_id, [{'op': 'toggle', 'id': item_id}])
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def batch_checklist_items(request, trip_id):
+    """Apply several checklist item operations in one request"""
+    serializer = ChecklistBatchSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+    return _apply_checklist_operations(request, trip_id, serializer.validated_data['operations'])
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def regenerate_trip_checklist(request, trip_id):
@@ -396,10 +683,106 @@ def trip_timeline(request, trip_id):
     """Get trip timeline data for automated slideshow"""
     try:
         trip = Trip.objects.get(id=trip_id, user=request.user)
-        serializer = TripTimelineSerializer(trip, context={'request': request})
-        return Response(serializer.data)
     except Trip.DoesNotExist:
         return Response({'error': 'Trip not found'}, status=404)
+    
+    etag, last_modified = trip_media_validators(trip, request, signed_urls=True)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+    
+    # Media URLs are absolute and signed, so the cached payload is per scheme,
+    # host and signing epoch (the epoch is also part of the etag)
+    data = trips_cache.get_or_build(
+        'timeline',
+        lambda: TripTimelineSerializer(trip, context={'request': request}).data,
+        trip_id=trip.id,
+        parts=(request.scheme, request.get_host(), etag),
+    )
+    return set_validators(Response(data), etag, last_modified)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def trip_timeline_days(request, trip_id):
+    """Timeline header and per-day media counts, without the items"""
+    try:
+        trip = Trip.objects.get(id=trip_id, user=request.user)
+    except Trip.DoesNotExist:
+        return Response({'error': 'Trip not found'}, status=404)
+    
+    etag, last_modified = trip_media_validators(trip, request)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+    
+    data = trips_cache.get_or_build(
+        'timeline-days',
+        lambda: TripTimelineSummarySerializer(trip, context={'request': request}).data,
+        trip_id=trip.id,
+        parts=(etag,),
+    )
+    return set_validators(Response(data), etag, last_modified)
+
+def _parse_iso_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date().isoformat()
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def trip_timeline_items(request, trip_id):
+    """
+    Timeline items for a window of days.
+    
+    Either ?start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive), or ?cursor=<date>&days=N
+    to page through the days that have media; follow next_cursor until it is null.
+    """
+    try:
+        trip = Trip.objects.get(id=trip_id, user=request.user)
+    except Trip.DoesNotExist:
+        return Response({'error': 'Trip not found'}, status=404)
+    
+    try:
+        start = request.query_params.get('start')
+        end = request.query_params.get('end')
+        cursor = request.query_params.get('cursor')
+        start, end, cursor = (_parse_iso_date(value) if value else None for value in (start, end, cursor))
+        days = int(request.query_params.get('days', settings.TIMELINE_DAYS_PER_PAGE))
+    except ValueError:
+        return Response({'error': 'Dates must be YYYY-MM-DD and days a number'}, status=400)
+    days = max(1, min(days, settings.TIMELINE_MAX_DAYS_PER_PAGE))
+    
+    etag, last_modified = trip_media_validators(trip, request, signed_urls=True)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+    
+    def build():
+        next_cursor = None
+        window_start, window_end = start, end
+        if not (start or end):
+            summaries = TripTimelineService.day_summaries(trip)
+            window, next_cursor = TripTimelineService.window_after(summaries, cursor, days)
+            if not window:
+                return {'days': [], 'next_cursor': None}
+            window_start, window_end = window[0], window[-1]
+        media_items = TripTimelineService.media_between(
+            trip, window_start or '0001-01-01', window_end or '9999-12-30'
+        )
+        return {
+            'days': TripTimelineService.group_by_day(
+                media_items, lambda media: timeline_media_item(media, request)
+            ),
+            'next_cursor': next_cursor,
+        }
+    
+    # Media URLs are absolute and signed, so the cached payload is per scheme,
+    # host and signing epoch (the epoch is also part of the etag)
+    data = trips_cache.get_or_build(
+        'timeline-items',
+        build,
+        trip_id=trip.id,
+        parts=(request.scheme, request.get_host(), etag, start, end, cursor, days),
+    )
+    return set_validators(Response(data), etag, last_modified)
 
 # Media views (unchanged)
 @api_view(['GET', 'POST'])
@@ -429,6 +812,7 @@ def trip_media(request, trip_id):
         serializer = TripMediaCreateSerializer(data=request.data)
         if serializer.is_valid():
             media = serializer.save(trip=trip)
+            MediaJobQueue.enqueue('process_media', media=media)
             response_serializer = TripMediaSerializer(
                 media, 
                 context={'request': request}
@@ -440,14 +824,228 @@ def trip_media(request, trip_id):
 @permission_classes([permissions.IsAuthenticated])
 def delete_trip_media(request, trip_id, media_id):
     """Delete a specific media item"""
+    if not delete_media(TripMedia.objects.filter(id=media_id, trip_id=trip_id, trip__user=request.user)):
+        return Response({'error': 'Media not found'}, status=404)
+    return Response({'message': 'Media deleted successfully'})
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_delete_trip_media(request, trip_id):
+    """Delete many media items at once; files are removed in the background"""
     try:
         trip = Trip.objects.get(id=trip_id, user=request.user)
-        media = trip.media.get(id=media_id)
-        
-        if media.file:
-            default_storage.delete(media.file.name)
+    except Trip.DoesNotExist:
+        return Response({'error': 'Trip not found'}, status=404)
+    
+    serializer = MediaBulkDeleteSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+    
+    deleted = delete_media(trip.media.filter(id__in=serializer.validated_data['ids']))
+    return Response({'deleted': deleted})
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def serve_trip_media(request, trip_id, media_id):
+    """
+    Stream a media file (?rendition=original|thumbnail|screen) with Range support.
+    
+    Callers either authenticate as the trip owner or present the signed
+    token from the media payload's *_stream_url fields.
+    """
+    rendition = request.query_params.get('rendition', 'original')
+    if rendition not in RENDITION_FIELDS:
+        return Response({'error': 'Unknown rendition'}, status=400)
+    
+    media = TripMedia.objects.filter(id=media_id, trip_id=trip_id).select_related('trip').first()
+    token = request.query_params.get('token')
+    if media is None:
+        authorized = False
+    elif token:
+        authorized = check_media_signature(token, media.id, rendition)
+    else:
+        authorized = request.user.is_authenticated and media.trip.user_id == request.user.id
+    if not authorized:
+        return Response({'error': 'Media not found'}, status=404)
+    
+    field_file = getattr(media, RENDITION_FIELDS[rendition])
+    if not field_file:
+        return Response({'error': 'Media not found'}, status=404)
+    content_type = media.content_type if rendition == 'original' else None
+    try:
+        return media_file_response(request, field_file, content_type)
+    except OSError:
+        # The row outlived its file (removed from storage or not synced yet)
+        return Response({'error': 'Media not found'}, status=404)
+
+def _upload_payload(upload):
+    return {
+        'upload_id': str(upload.id),
+        'filename': upload.filename,
+        'total_size': upload.total_size,
+        'offset': upload.received_size,
+        'status': upload.status,
+        'max_chunk_size': settings.MEDIA_UPLOAD_MAX_CHUNK_SIZE,
+        'media_id': upload.media_id,
+    }
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def create_media_upload(request, trip_id):
+    """
+    Start a resumable upload.
+    
+    The client then PUTs the raw bytes in chunks to the returned upload with
+    ?offset=<bytes already sent>, and finally POSTs to .../complete/.
+    """
+    try:
+        trip = Trip.objects.get(id=trip_id, user=request.user)
+    except Trip.DoesNotExist:
+        return Response({'error': 'Trip not found'}, status=404)
+    
+    serializer = MediaUploadInitSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+    
+    sha256 = serializer.validated_data.get('sha256', '').lower()
+    total_size = serializer.validated_data['total_size']
+    if sha256:
+        # Content this user already stored (e.g. the same photo on another
+        # trip): no bytes need sending. Anyone else's blob must be uploaded in
+        # full and is only shared once complete verifies the checksum.
+        with transaction.atomic():
+            blob = MediaBlobStore.acquire(sha256, size=total_size, user=request.user)
+            if blob is not None:
+                media = serializer.create_from_blob(trip, blob)
+                upload = MediaUpload.objects.create(
+                    user=request.user,
+                    trip=trip,
+                    filename=serializer.validated_data['filename'],
+                    total_size=total_size,
+                    received_size=total_size,
+                    sha256=sha256,
+                    status='complete',
+                    media=media,
+                )
+                MediaJobQueue.enqueue('process_media', media=media)
+        if blob is not None:
+            return Response(_upload_payload(upload), status=201)
+    
+    upload = MediaUpload.objects.create(
+        user=request.user,
+        trip=trip,
+        filename=serializer.validated_data['filename'],
+        total_size=total_size,
+        sha256=sha256,
+        media_fields=serializer.get_media_fields(),
+    )
+    ChunkedUploadService.create_temp_file(upload)
+    return Response(_upload_payload(upload), status=201)
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def media_upload_detail(request, trip_id, upload_id):
+    """Report the current offset, receive the next chunk, or abort an upload"""
+    uploads = MediaUpload.objects.filter(trip_id=trip_id, user=request.user)
+    
+    if request.method == 'GET':
+        upload = uploads.filter(id=upload_id).first()
+        if upload is None:
+            return Response({'error': 'Upload not found'}, status=404)
+        return Response(_upload_payload(upload))
+    
+    if request.method == 'DELETE':
+        upload = uploads.filter(id=upload_id, status='uploading').first()
+        if upload is None:
+            return Response({'error': 'Upload not found'}, status=404)
+        ChunkedUploadService.discard(upload)
+        upload.delete()
+        return Response(status=204)
+    
+    # PUT: the body is the raw chunk, read straight from the request stream
+    try:
+        offset = int(request.query_params.get('offset', request.META.get('HTTP_UPLOAD_OFFSET', '')))
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return Response({'error': 'A numeric offset is required'}, status=400)
+    if length <= 0:
+        return Response({'error': 'Empty chunk'}, status=400)
+    if length > settings.MEDIA_UPLOAD_MAX_CHUNK_SIZE:
+        return Response(
+            {'error': f'Chunks may be at most {settings.MEDIA_UPLOAD_MAX_CHUNK_SIZE} bytes'},
+            status=413
+        )
+    
+    with transaction.atomic():
+        # The row lock serializes concurrent PUTs for the same upload
+        upload = uploads.select_for_update().filter(id=upload_id, status='uploading').first()
+        if upload is None:
+            return Response({'error': 'Upload not found'}, status=404)
+        try:
+            upload.received_size = ChunkedUploadService.write_chunk(upload, offset, request.stream, length)
+        except UploadOffsetMismatch:
+            return Response(
+                {'error': 'Offset does not match the bytes received', 'offset': upload.received_size},
+                status=409
+            )
+        except UploadTooLarge:
+            return Response({'error': 'Chunk extends past the declared file size'}, status=400)
+        upload.save(update_fields=['received_size', 'updated_at'])
+    
+    return Response(_upload_payload(upload))
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def complete_media_upload(request, trip_id, upload_id):
+    """Verify the assembled file and turn it into a TripMedia item"""
+    uploads = MediaUpload.objects.filter(id=upload_id, trip_id=trip_id, user=request.user, status='uploading')
+    upload = uploads.select_related('trip').first()
+    if upload is None:
+        return Response({'error': 'Upload not found'}, status=404)
+    if upload.received_size != upload.total_size:
+        return Response(
+            {'error': 'Upload is incomplete', 'offset': upload.received_size},
+            status=409
+        )
+    
+    expected = (request.data.get('sha256') or upload.sha256).lower()
+    if not expected:
+        return Response({'error': 'A sha256 checksum is required'}, status=400)
+    
+    # Hashing and copying a large file can take a while, so both happen
+    # without the row lock: once every byte is in, further PUTs are refused.
+    if ChunkedUploadService.checksum(upload) != expected:
+        # Start over rather than keep bytes we know are wrong
+        with transaction.atomic():
+            upload = uploads.select_for_update().filter(received_size=F('total_size')).first()
+            if upload is not None:
+                ChunkedUploadService.create_temp_file(upload)
+                upload.received_size = 0
+                upload.save(update_fields=['received_size', 'updated_at'])
+        return Response({'error': 'Checksum mismatch; the upload must be restarted', 'offset': 0}, status=400)
+    
+    with open(ChunkedUploadService.temp_path(upload), 'rb') as assembled:
+        serializer = TripMediaCreateSerializer(
+            data={**upload.media_fields, 'file': File(assembled, name=upload.filename)}
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        blob = MediaBlobStore.store(serializer.validated_data['file'], upload.filename, sha256=expected)
+    
+    # Lock only to claim the upload and create the media row
+    with transaction.atomic():
+        upload = uploads.select_for_update().filter(received_size=F('total_size')).select_related('trip').first()
+        if upload is None:
+            # Completed or restarted by a concurrent request in the meantime
+            MediaBlobStore.release(blob.id)
+            return Response({'error': 'Upload not found'}, status=404)
+        serializer.context['blob'] = blob
+        media = serializer.save(trip=upload.trip)
         
-        media.delete()
-        return Response({'message': 'Media deleted successfully'})
-    except (Trip.DoesNotExist, TripMedia.DoesNotExist):
-        return Response({'error': 'Media not found'}, status=404)
\ No newline at end of file
+        upload.status = 'complete'
+        upload.media = media
+        upload.save(update_fields=['status', 'media', 'updated_at'])
+        MediaJobQueue.enqueue('process_media', media=media)
+    
+    ChunkedUploadService.discard(upload)
+    return Response(TripMediaSerializer(media, context={'request': request}).data, status=201)